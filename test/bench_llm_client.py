@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+LLM HTTP client micro-benchmark
+比較「每次呼叫建立新的 httpx.AsyncClient」（舊做法）與共用連線池的單次呼叫額外開銷。
+
+使用本機 Ollama stub（零延遲、固定回應），量到的時間幾乎全是 client 建立、
+TCP 連線與請求處理的成本。
+
+用法：
+    python test/bench_llm_client.py [呼叫次數]
+"""
+import sys
+import time
+import asyncio
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+import httpx
+
+from backend.llm_client import llm_client_pool
+from ollama_stub import OllamaStub
+
+PAYLOAD = {"model": "gpt-oss:20b", "messages": [], "stream": False}
+
+
+async def _fresh_client_call(url: str):
+    async with httpx.AsyncClient(timeout=600.0) as client:
+        resp = await client.post(url, json=PAYLOAD)
+        resp.raise_for_status()
+
+
+async def _pooled_call(url: str):
+    resp = await llm_client_pool.get().post(url, json=PAYLOAD)
+    resp.raise_for_status()
+
+
+async def _measure(call, url: str, n: int) -> list[float]:
+    await call(url)  # warm-up
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await call(url)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("=" * 60)
+    print(f"LLM HTTP client benchmark（{n} 次呼叫）")
+    print("=" * 60)
+
+    results = {}
+    for name, call in (("fresh client", _fresh_client_call), ("pooled client", _pooled_call)):
+        with OllamaStub() as stub:
+            samples = asyncio.run(_run(call, f"{stub.url}/api/chat", n))
+            results[name] = (samples, stub.connections)
+
+    for name, (samples, connections) in results.items():
+        print(f"  {name:14s} mean={statistics.mean(samples):6.2f} ms  "
+              f"p50={statistics.median(samples):6.2f} ms  "
+              f"p95={sorted(samples)[int(len(samples) * 0.95) - 1]:6.2f} ms  "
+              f"connections={connections}")
+
+    saved = statistics.mean(results["fresh client"][0]) - statistics.mean(results["pooled client"][0])
+    print(f"\n  每次呼叫節省: {saved:.2f} ms")
+    return 0
+
+
+async def _run(call, url: str, n: int) -> list[float]:
+    try:
+        return await _measure(call, url, n)
+    finally:
+        await llm_client_pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Code-drawn 渲染引擎 benchmark
+比較 python-pptx 物件模型（pptx_generator）與直接輸出 XML（pptx_generator_xml）產生同一份簡報的耗時。
+
+大綱使用 demo mode 產生的版面組合（每頁重複多次以放大差異），
+量到的時間為 generate_pptx() 的完整耗時（建構投影片 + 寫出 zip）。
+
+用法：
+    python test/bench_pptx_engines.py [次數] [頁數]
+"""
+import sys
+import time
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend import pptx_generator, pptx_generator_xml
+from backend.llm_service import generate_outline_demo
+from backend.models import GenerateRequest, PresentationOutline
+
+
+def _outline(num_slides: int) -> PresentationOutline:
+    demo = generate_outline_demo(GenerateRequest(
+        text="離散數學。集合論與函數。圖論與樹。組合與計數。", num_slides=min(num_slides, 20)
+    ))
+    slides = [demo.slides[i % len(demo.slides)] for i in range(num_slides)]
+    return PresentationOutline(title=demo.title, subtitle=demo.subtitle, slides=slides)
+
+
+def _measure(generate, outline: PresentationOutline, n: int) -> tuple[list[float], int]:
+    size = len(generate(outline))  # warm-up（含 XML engine 讀取 default.pptx）
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        generate(outline)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    num_slides = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    outline = _outline(num_slides)
+    print("=" * 60)
+    print(f"Code-drawn 渲染引擎 benchmark（{num_slides} 頁 × {n} 次）")
+    print("=" * 60)
+
+    results = {}
+    for name, generate in (("python-pptx", pptx_generator.generate_pptx),
+                           ("direct XML", pptx_generator_xml.generate_pptx)):
+        results[name] = _measure(generate, outline, n)
+
+    for name, (samples, size) in results.items():
+        print(f"  {name:12s} mean={statistics.mean(samples):7.2f} ms  "
+              f"p50={statistics.median(samples):7.2f} ms  "
+              f"p95={sorted(samples)[int(len(samples) * 0.95) - 1]:7.2f} ms  "
+              f"size={size / 1024:.0f} KB")
+
+    speedup = statistics.mean(results["python-pptx"][0]) / statistics.mean(results["direct XML"][0])
+    print(f"\n  加速倍數: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+模板載入 benchmark
+對 txt2pptx/templates 內每個模板，比較每次請求重新讀檔並清除 slides（舊做法）
+與複製記憶體內已清除的模板原型（new_presentation 的快取）的耗時。
+
+用法：
+    python test/bench_template_load.py [次數]
+"""
+import sys
+import time
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from pptx import Presentation
+
+from backend.pptx_generator_template import TEMPLATES_DIR, new_presentation, _clean_template_slides
+
+
+def _uncached_load(template_id: str):
+    prs = Presentation(str(TEMPLATES_DIR / f"{template_id}.pptx"))
+    _clean_template_slides(prs)
+    return prs
+
+
+def _measure(load, template_id: str, n: int) -> list[float]:
+    load(template_id)  # warm-up（快取版本於此建立快取）
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        load(template_id)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print("=" * 60)
+    print(f"模板載入 benchmark（每個模板 {n} 次）")
+    print("=" * 60)
+    print(f"  {'template':22s} {'size':>8s} {'uncached':>10s} {'cached':>10s} {'speedup':>8s}")
+
+    for path in sorted(TEMPLATES_DIR.glob("*.pptx")):
+        uncached = statistics.mean(_measure(_uncached_load, path.stem, n))
+        cached = statistics.mean(_measure(new_presentation, path.stem, n))
+        print(f"  {path.stem:22s} {path.stat().st_size / 1024:6.0f}KB "
+              f"{uncached:8.2f}ms {cached:8.2f}ms {uncached / cached:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
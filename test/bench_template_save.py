@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+模板簡報存檔 benchmark
+對 txt2pptx/templates 內每個模板，比較 python-pptx 的 prs.save()（所有 part 重新序列化、重新 deflate）
+與 save_presentation()（未變動的 part 直接複製模板 zip 內的原始壓縮 bytes）的耗時與輸出大小。
+
+用法：
+    python test/bench_template_save.py [次數]
+"""
+import io
+import sys
+import time
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.pptx_generator_template import TEMPLATES_DIR, new_presentation, add_slide, save_presentation
+from backend.llm_service import generate_outline_demo
+from backend.models import GenerateRequest
+
+OUTLINE = generate_outline_demo(GenerateRequest(
+    text="離散數學。集合論與函數。圖論與樹。組合與計數。", num_slides=10
+))
+
+
+def _python_pptx_save(prs) -> bytes:
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def _measure(save, template_id: str, n: int) -> tuple[list[float], int]:
+    prs = new_presentation(template_id)
+    for idx, slide_data in enumerate(OUTLINE.slides, 1):
+        add_slide(prs, slide_data, idx, len(OUTLINE.slides))
+    size = len(save(prs))  # warm-up
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        save(prs)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print("=" * 60)
+    print(f"模板簡報存檔 benchmark（{len(OUTLINE.slides)} 頁 × {n} 次）")
+    print("=" * 60)
+    print(f"  {'template':22s} {'prs.save':>10s} {'passthrough':>12s} {'speedup':>8s} {'size':>16s}")
+
+    for path in sorted(TEMPLATES_DIR.glob("*.pptx")):
+        full, full_size = _measure(_python_pptx_save, path.stem, n)
+        raw, raw_size = _measure(save_presentation, path.stem, n)
+        print(f"  {path.stem:22s} {statistics.mean(full):8.2f}ms {statistics.mean(raw):10.2f}ms "
+              f"{statistics.mean(full) / statistics.mean(raw):7.1f}x "
+              f"{full_size / 1024:6.0f}KB→{raw_size / 1024:.0f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+pytest 共用設定
+LLM 大綱快取與 map 段落快取改寫到暫存目錄：測試以 stub 產生的大綱以真實模型名稱與 prompt 指紋為 key，
+寫進 txt2pptx/cache 後，開發者之後對相同內容的真實請求會直接拿到 stub 的簡報。
+需在 backend 被 import 前設定（快取目錄於 import 時讀取）。
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+_CACHE_ROOT = Path(tempfile.mkdtemp(prefix="txt2pptx-test-cache-"))
+os.environ["LLM_CACHE_DIR"] = str(_CACHE_ROOT / "llm")
+os.environ["LLM_CHUNK_CACHE_DIR"] = str(_CACHE_ROOT / "chunks")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_CACHE_ROOT, ignore_errors=True)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+本機 Ollama stub server（測試 / benchmark 用）
+
+模擬 /api/chat（串流與非串流）與 /api/tags，回傳固定且可通過驗證的大綱，
+並記錄請求次數與同時進行中的最大請求數。
+
+用法：
+    with OllamaStub(delay=0.3) as stub:
+        os.environ["OLLAMA_URL"] = stub.url
+        ...
+        print(stub.calls, stub.max_active, stub.connections)
+"""
+import sys
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import GenerateRequest
+from backend.llm_service import generate_outline_demo
+
+STUB_NOTES = "本頁說明主題的核心概念與應用情境，包含背景脈絡、延伸解釋與實例，最後提出一個引導討論的問題。" * 2
+
+
+def stub_outline_json(num_slides: int = 4) -> str:
+    """產生一份可通過 PresentationOutline 驗證的大綱 JSON。"""
+    outline = generate_outline_demo(GenerateRequest(text="離散數學。集合論。圖論。", num_slides=num_slides))
+    for slide in outline.slides:
+        slide.speaker_notes = STUB_NOTES
+    return outline.model_dump_json()
+
+
+class OllamaStub:
+    """在背景 thread 執行的 stub server。"""
+
+    def __init__(self, delay: float = 0.0, content: str = None, status: int = 200,
+                 models=("gpt-oss:20b",), chunk_size: int = 0, chunk_delay: float = 0.0):
+        self.delay = delay
+        self.content = content if content is not None else stub_outline_json()
+        self.status = status
+        self.models = list(models)
+        self.chunk_size = chunk_size  # 串流時每個 chunk 的字元數（0 = 一次送完）
+        self.chunk_delay = chunk_delay  # 串流時 chunk 之間的間隔秒數（模擬逐 token 生成）
+        self.calls = 0
+        self.connections = 0  # 建立過的 TCP 連線數（用於驗證 keep-alive 連線重用）
+        self.active = 0
+        self.max_active = 0
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def content_for(self, body: dict) -> str:
+        """content 可為字串，或依請求內容決定回應的 callable(body) -> str。"""
+        return self.content(body) if callable(self.content) else self.content
+
+    def timings(self) -> dict:
+        """模擬 Ollama 在最後一個 chunk 回報的耗時欄位（奈秒）。"""
+        total = int(self.delay * 1e9)
+        return {"total_duration": total, "load_duration": 0,
+                "prompt_eval_duration": total // 4, "eval_duration": total - total // 4}
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # header 與 body 分開寫出，關閉 Nagle 以免每個回應多等一次 delayed ACK
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def _send(self, status, payload: bytes, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("content-type", content_type)
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    body = {"models": [{"name": name} for name in stub.models]}
+                    self._send(200, json.dumps(body).encode())
+                else:
+                    self._send(404, b"{}")
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+                with stub._lock:
+                    stub.calls += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    stub.requests.append(body)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if stub.status != 200:
+                        self._send(stub.status, json.dumps({"error": "stub error"}).encode())
+                    elif body.get("stream"):
+                        self._send_stream(self._ndjson(stub.content_for(body)))
+                    else:
+                        done = {"message": {"content": stub.content_for(body)}, "done": True,
+                                "eval_count": 42, **stub.timings()}
+                        self._send(200, json.dumps(done).encode())
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def _send_stream(self, payload: bytes):
+                if not stub.chunk_delay:
+                    self._send(200, payload, "application/x-ndjson")
+                    return
+                self.send_response(200)
+                self.send_header("content-type", "application/x-ndjson")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                for line in payload.splitlines(keepends=True):
+                    time.sleep(stub.chunk_delay)
+                    self.wfile.write(line)
+                    self.wfile.flush()
+
+            @staticmethod
+            def _ndjson(content: str) -> bytes:
+                size = stub.chunk_size or len(content) or 1
+                lines = [
+                    json.dumps({"message": {"content": content[i:i + size]}, "done": False})
+                    for i in range(0, len(content), size)
+                ]
+                lines.append(json.dumps({"message": {"content": ""}, "done": True,
+                                         "eval_count": len(lines), **stub.timings()}))
+                return ("\n".join(lines) + "\n").encode()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # 手動啟動：python ollama_stub.py [delay]
+    with OllamaStub(delay=float(sys.argv[1]) if len(sys.argv) > 1 else 0.0) as s:
+        print(f"Ollama stub listening on {s.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
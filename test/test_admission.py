@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+LLM 背壓（admission control）測試
+驗證全域並行上限、有界佇列滿時回 503 + Retry-After、check() 為尚未排隊的請求與批次項目保留位置，
+以及 /api/health 的佇列統計。
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend import pipeline
+from backend.main import app, GENERATED_DIR
+from backend.models import GenerateRequest
+from backend.admission import AdmissionController, AdmissionRejected, llm_admission, reservation_scope
+from ollama_stub import OllamaStub
+
+
+def test_controller_queue_and_retry_after():
+    """並行上限 1、佇列上限 1：第三個請求被拒絕，Retry-After 依服務時間估算"""
+    controller = AdmissionController(max_concurrency=1, max_queue=1, service_time_estimate=10)
+
+    async def hold(seconds):
+        async with controller.slot():
+            await asyncio.sleep(seconds)
+
+    async def scenario():
+        events = []
+        first = asyncio.create_task(hold(0.2))
+        await asyncio.sleep(0.05)
+
+        async def queued():
+            async with controller.slot(lambda e, d: events.append((e, d))):
+                pass
+        second = asyncio.create_task(queued())
+        await asyncio.sleep(0.05)
+        assert controller.snapshot()["in_flight"] == 1
+        assert controller.snapshot()["queue_depth"] == 1
+        assert events == [("queued", {"position": 1, "in_flight": 1})]
+
+        try:
+            controller.check()
+            raise AssertionError("expected AdmissionRejected")
+        except AdmissionRejected as e:
+            assert e.retry_after == 20  # (1 排隊 + 自己) × 10 秒 ÷ 並行 1
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+    snapshot = controller.snapshot()
+    assert snapshot["in_flight"] == 0 and snapshot["queue_depth"] == 0
+    assert snapshot["admitted"] == 2 and snapshot["rejected"] == 1
+    # 服務時間 EWMA 朝實際觀察值移動
+    assert snapshot["service_time_s"] < 10
+    controller.check()
+
+
+def test_check_reserves_queue_positions():
+    """check() 通過即保留位置：尚未進入 slot() 的同時湧入請求也計入佇列上限，批次項目逐一計入"""
+    controller = AdmissionController(max_concurrency=1, max_queue=1)
+    first, second = controller.check(), controller.check()
+    assert controller.snapshot()["reserved"] == 2
+    try:
+        controller.check()
+        raise AssertionError("expected AdmissionRejected")
+    except AdmissionRejected as e:
+        assert e.queue_depth == 2
+    # 批次放不下時整批拒絕，不保留任何位置
+    first[0].release()
+    first[0].release()  # 重複釋放不影響計數
+    try:
+        controller.check(2)
+        raise AssertionError("expected AdmissionRejected")
+    except AdmissionRejected:
+        assert controller.reserved == 1
+    assert controller.check(0) == []
+
+    async def scenario():
+        # 進入 slot() 後保留的位置轉為 in_flight；區塊結束時未用到的保留一併釋放
+        with reservation_scope(second[0]):
+            async with controller.slot():
+                assert controller.reserved == 0 and controller.in_flight == 1
+        unused = controller.check()[0]
+        with reservation_scope(unused):
+            assert controller.reserved == 1
+        assert controller.reserved == 0
+
+    asyncio.run(scenario())
+    assert controller.snapshot()["admitted"] == 1
+
+
+def test_cache_checks_run_off_the_event_loop():
+    """check_admission 的快取查詢（含第一次的目錄掃描）在 thread 中執行，不阻塞 event loop"""
+    threads = []
+    original = (pipeline.result_cache.contains, pipeline.llm_cache.contains)
+
+    def record(key):
+        threads.append(threading.get_ident())
+        return False
+
+    pipeline.result_cache.contains = pipeline.llm_cache.contains = record
+
+    async def scenario():
+        reservations = await pipeline.check_admission(GenerateRequest(text="背壓測試：快取查詢"))
+        for reservation in reservations:
+            reservation.release()
+        return threading.get_ident()
+
+    try:
+        loop_thread = asyncio.run(scenario())
+    finally:
+        pipeline.result_cache.contains, pipeline.llm_cache.contains = original
+    assert len(threads) == 2 and loop_thread not in threads
+
+
+def test_batch_items_count_against_queue():
+    saved = (llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore)
+    llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore = 1, 1, None
+    old_url = os.environ.get("OLLAMA_URL")
+    try:
+        with OllamaStub(delay=0.2) as stub, TestClient(app) as client:
+            os.environ["OLLAMA_URL"] = stub.url
+            items = [{"text": f"背壓批次測試 {i}", "num_slides": 4, "force_regenerate": True} for i in range(3)]
+            resp = client.post("/api/batch", json={"items": items})
+            assert resp.status_code == 503 and llm_admission.reserved == 0
+
+            created = client.post("/api/batch", json={"items": items[:2]})
+            assert created.status_code == 202
+            # 兩個項目都已保留位置：再來的單一請求放不下
+            assert client.post("/api/jobs", json={"text": "背壓批次測試：第三個"}).status_code == 503
+
+            deadline = time.time() + 10
+            batch_url = created.json()["status_url"]
+            while client.get(batch_url).json()["status"] not in ("succeeded", "failed") and time.time() < deadline:
+                time.sleep(0.05)
+            for item in client.get(batch_url).json()["items"]:
+                if item.get("filename"):
+                    (GENERATED_DIR / item["filename"]).unlink(missing_ok=True)
+                    (GENERATED_DIR / item["filename"]).with_suffix(".outline.json").unlink(missing_ok=True)
+            assert llm_admission.reserved == 0 and llm_admission.in_flight == 0
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+        llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore = saved
+
+
+def test_fan_out_borrows_only_idle_slots():
+    """fan_out 只借用閒置名額（計入 in_flight）、不排隊，離開後歸還"""
+    controller = AdmissionController(max_concurrency=3, max_queue=2)
+
+    async def scenario():
+        other = asyncio.Event()
+
+        async def hold():
+            async with controller.slot():
+                await other.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        async with controller.slot():
+            # 另一個請求佔一個名額：5 路 fan-out 只能借到剩下的 1 個
+            async with controller.fan_out(5) as limiter:
+                assert limiter._value == 2 and controller.in_flight == 3
+                assert controller._semaphore.locked()
+            assert controller.in_flight == 2
+            other.set()
+            await holder
+            async with controller.fan_out(5) as limiter:
+                assert limiter._value == 3 and controller.in_flight == 3
+            async with controller.fan_out(1) as limiter:
+                assert limiter._value == 1 and controller.in_flight == 1
+        assert controller.in_flight == 0 and not controller._semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_api_returns_503_when_full():
+    saved = (llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore)
+    llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore = 1, 0, None
+    old_url = os.environ.get("OLLAMA_URL")
+    try:
+        with OllamaStub(delay=1.0) as stub, TestClient(app) as client:
+            os.environ["OLLAMA_URL"] = stub.url
+            job = client.post("/api/jobs", json={
+                "text": "背壓測試：佔用唯一的 LLM 名額", "num_slides": 4, "force_regenerate": True,
+            }).json()
+            deadline = time.time() + 5
+            while llm_admission.in_flight == 0 and time.time() < deadline:
+                time.sleep(0.02)
+
+            resp = client.post("/api/generate", json={"text": "背壓測試：第二個請求", "num_slides": 4})
+            assert resp.status_code == 503
+            assert int(resp.headers["Retry-After"]) >= 1
+            assert resp.json()["in_flight"] == 1
+            assert client.post("/api/jobs", json={"text": "背壓測試：第三個請求"}).status_code == 503
+
+            health = client.get("/api/health").json()["llm_admission"]
+            assert health["in_flight"] == 1 and health["rejected"] >= 2
+
+            client.delete(f"/api/jobs/{job['job_id']}")
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+        llm_admission.max_concurrency, llm_admission.max_queue, llm_admission._semaphore = saved
+
+
+def main():
+    print("=" * 60)
+    print("LLM 背壓測試")
+    print("=" * 60)
+    for test in (test_controller_queue_and_retry_after, test_check_reserves_queue_positions,
+                 test_cache_checks_run_off_the_event_loop, test_batch_items_count_against_queue,
+                 test_fan_out_borrows_only_idle_slots,
+                 test_api_returns_503_when_full):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print(f"\n  統計: {llm_admission.snapshot()}")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+多 Ollama backend 分派測試
+驗證請求依進行中請求數分散到各 backend、健康檢查失敗或沒有該模型的 backend 會被略過、
+模型不存在（404）時改送另一個 backend，以及 hedged request 由較快的 backend 勝出。
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.backends import BackendPool
+from backend.llm_client import llm_client_pool
+from ollama_stub import OllamaStub
+
+MODEL = "gpt-oss:20b"
+DEAD_URL = "http://127.0.0.1:9"
+
+
+async def _chat(url: str) -> str:
+    resp = await llm_client_pool.get().post(
+        f"{url}/api/chat", json={"model": MODEL, "messages": [], "stream": False}
+    )
+    resp.raise_for_status()
+    return url
+
+
+def _with_urls(urls: list[str], coro_fn):
+    old = os.environ.get("OLLAMA_URLS")
+    os.environ["OLLAMA_URLS"] = ",".join(urls)
+    try:
+        return asyncio.run(coro_fn())
+    finally:
+        if old is None:
+            os.environ.pop("OLLAMA_URLS", None)
+        else:
+            os.environ["OLLAMA_URLS"] = old
+
+
+def test_least_outstanding_spreads_load():
+    pool = BackendPool()
+    with OllamaStub(delay=0.2) as a, OllamaStub(delay=0.2) as b:
+        async def run():
+            return await asyncio.gather(*(pool.call(MODEL, _chat) for _ in range(6)))
+
+        used = _with_urls([a.url, b.url], run)
+    assert (a.calls, b.calls) == (3, 3)
+    assert set(used) == {a.url, b.url}
+    assert all(backend.outstanding == 0 for backend in pool._backends.values())
+
+
+def test_unhealthy_backend_is_skipped():
+    pool = BackendPool()
+    with OllamaStub() as stub:
+        async def run():
+            await pool.probe_all()
+            return [await pool.call(MODEL, _chat) for _ in range(3)]
+
+        used = _with_urls([DEAD_URL, stub.url], run)
+    assert used == [stub.url] * 3
+    dead = pool._backends[DEAD_URL]
+    assert not dead.healthy and dead.last_error and dead.requests == 0
+
+
+def test_backend_without_model_is_skipped():
+    pool = BackendPool()
+    with OllamaStub(models=("llama3",)) as other, OllamaStub() as stub:
+        async def run():
+            await pool.probe_all()
+            return [await pool.call(MODEL, _chat) for _ in range(3)]
+
+        used = _with_urls([other.url, stub.url], run)
+    assert used == [stub.url] * 3 and other.calls == 0
+    assert pool._backends[other.url].models == {"llama3:latest"}
+
+
+def test_missing_model_fails_over():
+    pool = BackendPool()
+    with OllamaStub(status=404) as missing, OllamaStub() as stub:
+        async def run():
+            return [await pool.call(MODEL, _chat) for _ in range(3)]
+
+        used = _with_urls([missing.url, stub.url], run)
+    # 第一次 404 後記下模型缺席，之後不再送往該 backend
+    assert used == [stub.url] * 3 and missing.calls == 1
+    assert pool._backends[missing.url].missing == {MODEL}
+
+
+def test_hedge_wins_on_faster_backend():
+    pool = BackendPool()
+    with OllamaStub(delay=1.0) as slow, OllamaStub() as fast:
+        async def run():
+            busy = pool.backends()[1]
+            busy.outstanding += 1  # 讓主要請求落在較慢的 backend
+            try:
+                start = time.perf_counter()
+                result = await pool.call(MODEL, _chat, hedge_after=0.1)
+                return result, time.perf_counter() - start
+            finally:
+                busy.outstanding -= 1
+
+        result, elapsed = _with_urls([slow.url, fast.url], run)
+    assert result == fast.url
+    assert elapsed < 0.8
+    assert pool.hedges == 1 and (slow.calls, fast.calls) == (1, 1)
+
+
+def test_no_hedge_when_primary_is_fast():
+    pool = BackendPool()
+    with OllamaStub() as a, OllamaStub() as b:
+        async def run():
+            return await pool.call(MODEL, _chat, hedge_after=1.0)
+
+        _with_urls([a.url, b.url], run)
+    assert pool.hedges == 0 and a.calls + b.calls == 1
+
+
+def main():
+    print("=" * 60)
+    print("多 Ollama backend 分派測試")
+    print("=" * 60)
+    for test in (test_least_outstanding_spreads_load, test_unhealthy_backend_is_skipped,
+                 test_backend_without_model_is_skipped, test_missing_model_fails_over,
+                 test_hedge_wins_on_faster_backend, test_no_hedge_when_primary_is_fast):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
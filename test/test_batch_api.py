@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+批次生成 API 測試
+驗證 POST /api/batch 回傳 manifest，且同時呼叫 LLM 的數量不超過 BATCH_LLM_CONCURRENCY。
+
+使用本機 stub server 模擬 Ollama，不需要真正的 LLM。
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app, GENERATED_DIR
+from backend.jobs import BATCH_LLM_CONCURRENCY
+from ollama_stub import OllamaStub
+
+_max_active = 0
+
+
+def test_batch_manifest_and_concurrency():
+    """5 份請求：全部成功、manifest 含檔名，且 LLM 並行數受限"""
+    global _max_active
+    old_url = os.environ.get("OLLAMA_URL")
+    with OllamaStub(delay=0.3) as stub, TestClient(app) as client:
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            items = [
+                {"text": f"第 {i} 講：離散數學", "num_slides": 4,
+                 "template": "code_drawn" if i % 2 else "ocean_gradient",
+                 "force_regenerate": True}
+                for i in range(5)
+            ]
+            resp = client.post("/api/batch", json={"items": items})
+            assert resp.status_code == 202
+            created = resp.json()
+            assert created["total"] == 5
+
+            deadline = time.time() + 60
+            while time.time() < deadline:
+                manifest = client.get(created["status_url"]).json()
+                if manifest["finished_at"] is not None:
+                    break
+                time.sleep(0.1)
+
+            assert manifest["status"] == "succeeded", manifest
+            assert manifest["succeeded"] == 5
+            assert [item["index"] for item in manifest["items"]] == list(range(5))
+            for item in manifest["items"]:
+                assert item["download_url"] == f"/api/download/{item['filename']}"
+                (GENERATED_DIR / item["filename"]).unlink()
+                (GENERATED_DIR / item["filename"]).with_suffix(".outline.json").unlink()
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+
+    _max_active = stub.max_active
+    assert 1 <= stub.max_active <= BATCH_LLM_CONCURRENCY
+
+
+def test_batch_validation():
+    with TestClient(app) as client:
+        assert client.post("/api/batch", json={"items": []}).status_code == 422
+        assert client.get("/api/batch/does-not-exist").status_code == 404
+
+
+def main():
+    print("=" * 60)
+    print("批次生成 API 測試")
+    print("=" * 60)
+    for test in (test_batch_manifest_and_concurrency, test_batch_validation):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print(f"\n  LLM 最大並行數: {_max_active} (上限 {BATCH_LLM_CONCURRENCY})")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+客戶端斷線 / Job 取消測試
+驗證 /api/generate 的客戶端在完成前斷線時，進行中的 LLM 呼叫（httpx 請求與重試迴圈）被取消、
+釋放 LLM 名額且不產生檔案；DELETE /api/jobs/{id} 同樣取消上游工作，兩者都計入 metrics。
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend import llm_service
+from backend.admission import llm_admission
+from backend.main import app, GENERATED_DIR, _cancel_on_disconnect
+from backend.models import GenerateRequest
+from backend.pipeline import run_generation
+from ollama_stub import OllamaStub
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class FakeHTTPRequest:
+    """只提供 receive()：disconnect_after 秒後回報 http.disconnect（None = 不斷線）。"""
+
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+
+    async def receive(self):
+        if self.disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.disconnect_after)
+        return {"type": "http.disconnect"}
+
+
+def _run(stub: OllamaStub, http_request: FakeHTTPRequest, text: str):
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = stub.url
+    request = GenerateRequest(text=text, num_slides=4, template="code_drawn", force_regenerate=True)
+    try:
+        return asyncio.run(_cancel_on_disconnect(http_request, run_generation(request)))
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+
+
+def test_disconnect_cancels_llm_call():
+    disconnects = _value("txt2pptx_cancellations_total", source="client_disconnect")
+    cancelled = _value("txt2pptx_llm_cancelled_total")
+    files = set(GENERATED_DIR.glob("*.pptx"))
+    with OllamaStub(delay=3.0) as stub:
+        start = time.perf_counter()
+        try:
+            _run(stub, FakeHTTPRequest(disconnect_after=0.3), "取消測試：客戶端斷線")
+            raise AssertionError("expected CancelledError")
+        except asyncio.CancelledError:
+            pass
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.5  # 未等待 Ollama 回應
+    assert stub.calls == 1
+    assert _value("txt2pptx_cancellations_total", source="client_disconnect") == disconnects + 1
+    assert _value("txt2pptx_llm_cancelled_total") == cancelled + 1
+    assert llm_admission.snapshot()["in_flight"] == 0
+    assert not llm_service._inflight
+    assert set(GENERATED_DIR.glob("*.pptx")) == files
+
+
+def test_connected_client_gets_result():
+    with OllamaStub() as stub:
+        result = _run(stub, FakeHTTPRequest(), "取消測試：正常完成")
+    assert result.success
+    for suffix in (".pptx", ".outline.json"):
+        (GENERATED_DIR / Path(result.filename).with_suffix(suffix)).unlink(missing_ok=True)
+
+
+def test_job_cancel_cancels_llm_call():
+    job_cancels = _value("txt2pptx_cancellations_total", source="job_cancel")
+    cancelled = _value("txt2pptx_llm_cancelled_total")
+    old_url = os.environ.get("OLLAMA_URL")
+    with OllamaStub(delay=3.0) as stub, TestClient(app) as client:
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            job = client.post("/api/jobs", json={"text": "取消測試：Job", "num_slides": 4,
+                                                 "force_regenerate": True}).json()
+            while stub.calls == 0:
+                time.sleep(0.02)
+            info = client.delete(job["status_url"]).json()
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+    assert info["status"] == "cancelled"
+    assert _value("txt2pptx_cancellations_total", source="job_cancel") == job_cancels + 1
+    assert _value("txt2pptx_llm_cancelled_total") == cancelled + 1
+
+
+def main():
+    print("=" * 60)
+    print("客戶端斷線 / Job 取消測試")
+    print("=" * 60)
+    for test in (test_disconnect_cancels_llm_call, test_connected_client_gets_result,
+                 test_job_cancel_cancels_llm_call):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
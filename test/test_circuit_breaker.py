@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker 測試
+驗證失敗比例達門檻時轉為 open、open 時請求不呼叫 Ollama 直接 fallback、
+經過 cooldown 或健康檢查成功後以單一試探請求轉回 closed，以及 JSON 錯誤不影響 breaker。
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import GenerateRequest
+from backend.llm_service import generate_outline, MAX_RETRIES
+from backend.backends import backend_pool
+from backend.circuit_breaker import CircuitBreaker, CircuitState, LLM_BREAKER_MIN_CALLS
+from ollama_stub import OllamaStub
+
+
+def _generate(stub: OllamaStub, text: str):
+    events = []
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = stub.url
+    try:
+        start = time.perf_counter()
+        asyncio.run(generate_outline(
+            GenerateRequest(text=text, num_slides=4, force_regenerate=True), on_event=lambda e, d: events.append((e, d))
+        ))
+        return events, time.perf_counter() - start
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+
+
+def test_opens_on_failure_rate():
+    breaker = CircuitBreaker("test", window=10, min_calls=4, failure_rate=0.5, cooldown=60)
+    for failed in (False, True, False):
+        breaker.record(failed)
+    assert breaker.state is CircuitState.CLOSED  # 呼叫次數未達 min_calls
+    breaker.record(True)
+    assert breaker.state is CircuitState.OPEN and not breaker.available()
+
+
+def test_half_open_allows_single_trial():
+    breaker = CircuitBreaker("test", window=10, min_calls=2, failure_rate=0.5, cooldown=0.05)
+    breaker.record(True)
+    breaker.record(True)
+    assert not breaker.available()
+    time.sleep(0.1)
+    assert breaker.state is CircuitState.HALF_OPEN and breaker.available()
+
+    breaker.begin()
+    assert not breaker.available()  # 試探請求進行中
+    breaker.record(None)            # 被取消：釋放名額
+    assert breaker.available()
+
+    breaker.begin()
+    breaker.record(True)
+    assert breaker.state is CircuitState.OPEN and breaker.opened == 2
+
+    breaker.probe_succeeded()
+    breaker.begin()
+    breaker.record(False)
+    assert breaker.state is CircuitState.CLOSED and breaker.snapshot()["recent_calls"] == 0
+
+
+def test_open_circuit_falls_back_instantly_and_recovers():
+    with OllamaStub(status=500) as stub:
+        for i in range(2):
+            events, _ = _generate(stub, f"Circuit 測試：失敗 {i}")
+        backend = backend_pool._backends[stub.url]
+        assert backend.breaker.state is CircuitState.OPEN
+        assert stub.calls == LLM_BREAKER_MIN_CALLS
+        assert dict(events)["fallback"]["reason"] == "circuit open"
+
+        # open 時不呼叫 Ollama，也不等待 timeout 或退避
+        events, elapsed = _generate(stub, "Circuit 測試：open")
+        assert stub.calls == LLM_BREAKER_MIN_CALLS
+        assert "llm_attempt" not in [name for name, _ in events]
+        assert dict(events)["fallback"]["reason"] == "circuit open"
+        assert elapsed < 0.5
+        assert backend.snapshot()["circuit"]["state"] == "open"
+
+        # Ollama 恢復：健康檢查成功 → half-open → 試探請求成功 → closed
+        stub.status = 200
+        old_url = os.environ.get("OLLAMA_URL")
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            asyncio.run(backend_pool.probe_all())
+            assert backend_pool.circuit_state() is CircuitState.HALF_OPEN
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+        events, _ = _generate(stub, "Circuit 測試：恢復")
+    assert "fallback" not in [name for name, _ in events]
+    assert backend.breaker.state is CircuitState.CLOSED
+
+
+def test_invalid_json_does_not_open_circuit():
+    with OllamaStub(content="這不是 JSON") as stub:
+        for i in range(2):
+            events, _ = _generate(stub, f"Circuit 測試：JSON 錯誤 {i}")
+        backend = backend_pool._backends[stub.url]
+    assert stub.calls == 2 * MAX_RETRIES
+    assert backend.breaker.state is CircuitState.CLOSED
+    assert dict(events)["fallback"]["reason"] == f"{MAX_RETRIES} attempts failed"
+
+
+def main():
+    print("=" * 60)
+    print("Circuit breaker 測試")
+    print("=" * 60)
+    for test in (test_opens_on_failure_rate, test_half_open_allows_single_trial,
+                 test_open_circuit_falls_back_instantly_and_recovers, test_invalid_json_does_not_open_circuit):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
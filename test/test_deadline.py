@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+端到端 deadline 測試
+驗證 LLM 嘗試的 timeout 受剩餘預算限制、預算容不下下一次嘗試（或退避）時立即 fallback、
+各階段用掉的預算記入 trace，以及 X-Deadline header 在預算用完時回傳 504。
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend import deadline as deadline_module
+from backend.deadline import Deadline
+from backend.main import app, GENERATED_DIR
+from backend.retry_policy import ErrorClass, RetryRule, llm_retry_policy
+from ollama_stub import OllamaStub
+
+
+def _generate(client, stub, payload, headers=None):
+    """以較小的預留時間送出請求，回傳 (response, 耗時秒數)。"""
+    old_url = os.environ.get("OLLAMA_URL")
+    old_reserve, old_min = deadline_module.DEADLINE_RENDER_RESERVE, deadline_module.DEADLINE_MIN_ATTEMPT
+    os.environ["OLLAMA_URL"] = stub.url
+    deadline_module.DEADLINE_RENDER_RESERVE = 1.0
+    deadline_module.DEADLINE_MIN_ATTEMPT = 0.5
+    try:
+        start = time.perf_counter()
+        resp = client.post("/api/generate", json=payload, headers=headers or {})
+        return resp, time.perf_counter() - start
+    finally:
+        deadline_module.DEADLINE_RENDER_RESERVE, deadline_module.DEADLINE_MIN_ATTEMPT = old_reserve, old_min
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+        if resp.status_code == 200:
+            for suffix in (".pptx", ".outline.json"):
+                (GENERATED_DIR / Path(resp.json()["filename"]).with_suffix(suffix)).unlink(missing_ok=True)
+
+
+def _find(node, name):
+    if node["name"] == name:
+        return [node]
+    return [found for child in node.get("children", []) for found in _find(child, name)]
+
+
+def _payload(text: str, **extra) -> dict:
+    return {"text": text, "num_slides": 4, "template": "code_drawn", "force_regenerate": True,
+            "debug": True, **extra}
+
+
+def test_budget_accounting():
+    deadline = Deadline(30)
+    assert 29.9 < deadline.remaining() <= 30
+    assert abs(deadline.llm_budget() + deadline_module.DEADLINE_RENDER_RESERVE - deadline.remaining()) < 0.01
+    assert deadline.can_attempt() and not deadline.can_attempt(delay=20)
+    deadline.charge("outline")
+    deadline.charge("render")
+    assert list(deadline.summary()["stages_s"]) == ["outline", "render"]
+
+
+def test_slow_llm_falls_back_within_deadline():
+    with OllamaStub(delay=4.0) as stub, TestClient(app) as client:
+        resp, elapsed = _generate(client, stub, _payload("Deadline 測試：LLM 太慢", deadline_s=2.5))
+    assert resp.status_code == 200
+    assert elapsed < 3.0  # 未等到 stub 回應（4 秒），也未超過預算太多
+    assert stub.calls == 1
+
+    root = resp.json()["trace"]["root"]
+    assert _find(root, "outline")[0]["attrs"]["fallback"] is True
+    usage = root["attrs"]["deadline"]
+    assert usage["budget_s"] == 2.5
+    assert set(usage["stages_s"]) == {"outline", "render", "save"}
+    attempt = _find(root, "llm_attempt")[0]
+    assert attempt["attrs"]["timeout_s"] <= 1.5  # 預算扣掉渲染預留時間
+
+
+def test_backoff_longer_than_budget_gives_up():
+    original = llm_retry_policy.rules[ErrorClass.HTTP_5XX]
+    llm_retry_policy.rules[ErrorClass.HTTP_5XX] = RetryRule(retry=True, base_delay=5.0)
+    try:
+        with OllamaStub(status=500) as stub, TestClient(app) as client:
+            resp, elapsed = _generate(client, stub, _payload("Deadline 測試：退避超過預算", deadline_s=3.0))
+    finally:
+        llm_retry_policy.rules[ErrorClass.HTTP_5XX] = original
+    assert resp.status_code == 200
+    assert stub.calls == 1 and elapsed < 2.0
+
+
+def test_header_deadline_exhausted_returns_504():
+    with OllamaStub() as stub, TestClient(app) as client:
+        resp, _ = _generate(client, stub, _payload("Deadline 測試：預算用完"), headers={"X-Deadline": "0.001"})
+    assert resp.status_code == 504
+    assert stub.calls == 0
+
+
+def main():
+    print("=" * 60)
+    print("端到端 deadline 測試")
+    print("=" * 60)
+    for test in (test_budget_accounting, test_slow_llm_falls_back_within_deadline,
+                 test_backoff_longer_than_budget_gives_up, test_header_deadline_exhausted_returns_504):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+串流提前渲染測試
+驗證 slides 陣列的增量解析、串流中逐頁驗證與渲染（渲染與 LLM 生成重疊），
+以及實際頁數與請求頁數不同時的頁碼修正；模板簡報提前渲染後同樣沿用模板 zip 的原始 entry 存檔；
+code-drawn 提前渲染與 render pool 使用同一個 engine；
+多份 deck 共用有上限的 thread pool 且各自依序建立，建立失敗的 deck 交回 render pool。
+"""
+import io
+import os
+import sys
+import json
+import asyncio
+import logging
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+from pptx import Presentation
+from prometheus_client import REGISTRY
+
+from backend.main import app, GENERATED_DIR
+from backend.outline_stream import SlideStreamParser
+from backend import early_render, render_pool
+from backend.early_render import IncrementalDeck
+from backend.models import PresentationOutline
+from backend.events import emit_event
+from backend import pptx_generator_template as template_engine
+from ollama_stub import OllamaStub, stub_outline_json
+from test_template_cache import _raw_entry
+
+
+def _find(node, name):
+    if node["name"] == name:
+        return [node]
+    return [found for child in node.get("children", []) for found in _find(child, name)]
+
+
+def _generate(payload: dict) -> tuple[dict, bytes]:
+    """以 Ollama stub 呼叫 /api/generate，回傳 (回應 JSON, PPTX bytes) 並清除產生的檔案。"""
+    old_url = os.environ.get("OLLAMA_URL")
+    with OllamaStub(chunk_size=40, chunk_delay=0.005) as stub, TestClient(app) as client:
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            result = client.post("/api/generate", json=payload).json()
+            pptx_bytes = client.get(f"/api/download/{result['filename']}").content
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+    for suffix in (".pptx", ".outline.json"):
+        (GENERATED_DIR / Path(result["filename"]).with_suffix(suffix)).unlink(missing_ok=True)
+    return result, pptx_bytes
+
+
+@contextmanager
+def _captured_logs():
+    """收集 backend.* logger 的紀錄。"""
+    records: list[logging.LogRecord] = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    backend_logger = logging.getLogger("backend")
+    backend_logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        backend_logger.removeHandler(handler)
+
+
+def test_parser_yields_slides_as_they_complete():
+    outline = json.loads(stub_outline_json(5))
+    # 字串中的括號、引號與 "slides" 字樣不影響解析
+    outline["title"] = 'A "slides": [{tricky}] \\ title'
+    outline["slides"][1]["bullets"] = ['含 } 與 ] 的 "項目"', "第二點"]
+    text = "```json\n" + json.dumps(outline, ensure_ascii=False) + "\n```"
+
+    parser = SlideStreamParser()
+    seen = []
+    for i in range(0, len(text), 7):
+        for index, slide in parser.feed(text[i:i + 7]):
+            seen.append((index, slide))
+            # 第 index 頁在其後的內容出現前就已取出
+            assert len(seen) == index
+    assert [slide for _, slide in seen] == outline["slides"]
+
+
+def test_streaming_overlaps_rendering_and_fixes_slide_numbers():
+    """stub 回傳 4 頁、請求 6 頁：提前渲染被採用，且頁碼改寫為「i / 4」"""
+    used_before = REGISTRY.get_sample_value("txt2pptx_early_renders_total", {"outcome": "used"}) or 0
+    payload = {"text": "提前渲染測試：拓撲排序", "num_slides": 6, "template": "code_drawn",
+               "force_regenerate": True, "debug": True}
+    result, pptx_bytes = _generate(payload)
+
+    assert REGISTRY.get_sample_value("txt2pptx_early_renders_total", {"outcome": "used"}) == used_before + 1
+
+    root = result["trace"]["root"]
+    outline_span = _find(root, "outline")[0]
+    render_span = _find(root, "render")[0]
+    assert render_span["attrs"]["early"] is True
+    builds = _find(render_span, "build_slide")
+    assert [b["attrs"]["index"] for b in builds] == [1, 2, 3, 4]
+    # 第一頁在 LLM 串流結束前就已建立完成
+    outline_end = outline_span["start_ms"] + outline_span["duration_ms"]
+    assert builds[0]["start_ms"] + builds[0]["duration_ms"] < outline_end
+
+    prs = Presentation(io.BytesIO(pptx_bytes))
+    assert len(prs.slides) == 4
+    texts = [run.text for slide in prs.slides for shape in slide.shapes if shape.has_text_frame
+             for p in shape.text_frame.paragraphs for run in p.runs]
+    assert "2 / 4" in texts and not any(t.endswith(" / 6") for t in texts)
+
+
+def test_template_deck_saved_with_passthrough():
+    outline = PresentationOutline.model_validate(json.loads(stub_outline_json(5)))
+
+    async def _early_render() -> tuple[bytes, object]:
+        deck = IncrementalDeck("College_Elegance", len(outline.slides))
+        try:
+            for index, slide in enumerate(outline.slides[:3], 1):
+                deck.add(index, slide)
+            return await deck.finish(outline), deck._prs.part.package
+        finally:
+            deck.close()
+
+    pptx_bytes, package = asyncio.run(_early_render())
+    assert pptx_bytes is not None
+    assert package in template_engine._PASSTHROUGH
+    with zipfile.ZipFile(template_engine.TEMPLATES_DIR / "College_Elegance.pptx") as src, \
+            zipfile.ZipFile(io.BytesIO(pptx_bytes)) as out:
+        untouched = [name for name in out.namelist()
+                     if name.startswith(("ppt/media/", "ppt/slideMasters/", "ppt/slideLayouts/", "ppt/theme/"))]
+        assert untouched
+        for name in untouched:
+            assert _raw_entry(out, name) == _raw_entry(src, name), name
+    assert len(Presentation(io.BytesIO(pptx_bytes)).slides) == len(outline.slides)
+
+
+def test_code_drawn_uses_pool_engine():
+    """code-drawn 提前渲染與 render pool 使用同一個 CODE_DRAWN_ENGINE，產生相同的投影片"""
+    outline = PresentationOutline.model_validate(json.loads(stub_outline_json(4)))
+
+    async def _render() -> bytes:
+        deck = IncrementalDeck("code_drawn", 6)  # 請求 6 頁、實際 4 頁：頁碼需改寫
+        try:
+            for index, slide in enumerate(outline.slides, 1):
+                deck.add(index, slide)
+            return await deck.finish(outline)
+        finally:
+            deck.close()
+
+    def _parts(pptx_bytes: bytes) -> dict:
+        with zipfile.ZipFile(io.BytesIO(pptx_bytes)) as zf:
+            return {name: zf.read(name) for name in zf.namelist()}
+
+    saved = render_pool.CODE_DRAWN_ENGINE
+    try:
+        for engine in ("xml", "pptx"):
+            render_pool.CODE_DRAWN_ENGINE = engine
+            early, pooled = asyncio.run(_render()), render_pool.render_pptx(outline, "code_drawn")
+            if engine == "xml":
+                assert _parts(early) == _parts(pooled)
+            else:
+                assert [slide.part.blob for slide in Presentation(io.BytesIO(early)).slides] == \
+                    [slide.part.blob for slide in Presentation(io.BytesIO(pooled)).slides]
+    finally:
+        render_pool.CODE_DRAWN_ENGINE = saved
+
+
+def test_decks_share_bounded_pool_in_order():
+    outline = PresentationOutline.model_validate(json.loads(stub_outline_json(5)))
+
+    async def _render_all(n: int) -> list[bytes]:
+        decks = [IncrementalDeck("code_drawn", len(outline.slides)) for _ in range(n)]
+        try:
+            for index, slide in enumerate(outline.slides, 1):
+                for deck in decks:
+                    deck.add(index, slide)
+            return await asyncio.gather(*(deck.finish(outline) for deck in decks))
+        finally:
+            for deck in decks:
+                deck.close()
+
+    results = asyncio.run(_render_all(early_render.EARLY_RENDER_WORKERS * 3))
+    assert len(early_render._early_render_pool._threads) <= early_render.EARLY_RENDER_WORKERS
+    for pptx_bytes in results:
+        slides = Presentation(io.BytesIO(pptx_bytes)).slides
+        assert len(slides) == len(outline.slides)
+        for slide, slide_data in zip(slides, outline.slides):
+            assert slide_data.title in [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+
+
+def test_failed_build_falls_back():
+    outline = PresentationOutline.model_validate(json.loads(stub_outline_json(4)))
+    built = []
+
+    def add_slide(prs, slide, index, total):
+        if index == 2:
+            raise RuntimeError("boom")
+        built.append(index)
+
+    async def _render() -> Optional[bytes]:
+        deck = IncrementalDeck("code_drawn", len(outline.slides))
+        deck._add_slide = add_slide
+        try:
+            for index, slide in enumerate(outline.slides, 1):
+                deck.add(index, slide)
+            result = await deck.finish(outline)
+            assert deck.broken
+            return result
+        finally:
+            deck.close()
+
+    assert asyncio.run(_render()) is None
+    assert built == [1]
+
+
+def test_broken_early_deck_falls_back_to_pool():
+    """排入提前渲染時拋出例外：錯誤被記錄、slide 事件照常轉送，最終由 render pool 完整渲染。"""
+    discarded_before = REGISTRY.get_sample_value("txt2pptx_early_renders_total", {"outcome": "discarded"}) or 0
+    original_add = IncrementalDeck.add
+
+    def failing_add(self, index, slide):
+        if index == 2:
+            raise RuntimeError("queue failure")
+        original_add(self, index, slide)
+
+    IncrementalDeck.add = failing_add
+    try:
+        with _captured_logs() as records:
+            result, pptx_bytes = _generate({"text": "提前渲染失敗測試", "num_slides": 4, "template": "code_drawn",
+                                            "force_regenerate": True, "debug": True})
+    finally:
+        IncrementalDeck.add = original_add
+
+    assert result["success"]
+    assert REGISTRY.get_sample_value("txt2pptx_early_renders_total", {"outcome": "discarded"}) == \
+        discarded_before + 1
+    assert _find(result["trace"]["root"], "render")[0]["attrs"]["early"] is False
+    assert len(Presentation(io.BytesIO(pptx_bytes)).slides) == 4
+    assert any("could not be queued" in record.getMessage() and record.exc_info for record in records)
+
+
+def test_emit_event_logs_callback_errors():
+    def callback(event, data):
+        raise ValueError("bad callback")
+
+    with _captured_logs() as records:
+        emit_event(callback, "slide", index=1)
+    assert any("'slide'" in record.getMessage() and record.exc_info for record in records)
+
+
+def main():
+    print("=" * 60)
+    print("串流提前渲染測試")
+    print("=" * 60)
+    for test in (test_parser_yields_slides_as_they_complete,
+                 test_streaming_overlaps_rendering_and_fixes_slide_numbers,
+                 test_template_deck_saved_with_passthrough, test_code_drawn_uses_pool_engine,
+                 test_decks_share_bounded_pool_in_order,
+                 test_failed_build_falls_back, test_broken_early_deck_falls_back_to_pool,
+                 test_emit_event_logs_callback_errors):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+非同步 Job API 測試
+驗證 POST /api/jobs 立即回傳 job id，GET /api/jobs/{id} 回報階段與計時，
+完成後的結果可透過既有的下載端點取得。
+
+不需要 Ollama：指向無法連線的位址，流程會走 demo fallback。
+"""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+os.environ.setdefault("OLLAMA_URL", "http://127.0.0.1:9")
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app, GENERATED_DIR
+
+REQUEST = {
+    "text": "圖論是組合數學分支。圖由頂點與邊構成，用來描述事物之間的關係。",
+    "num_slides": 4,
+    "template": "code_drawn",
+}
+
+
+def _wait_for_job(client, status_url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get(status_url).json()
+        if info["status"] in ("succeeded", "failed"):
+            return info
+        time.sleep(0.1)
+    raise TimeoutError(f"Job did not finish within {timeout}s")
+
+
+def test_job_lifecycle():
+    """建立 Job → 輪詢至完成 → 檢查階段計時與下載連結"""
+    with TestClient(app) as client:
+        resp = client.post("/api/jobs", json=REQUEST)
+        assert resp.status_code == 202
+        created = resp.json()
+        assert created["status_url"] == f"/api/jobs/{created['job_id']}"
+
+        info = _wait_for_job(client, created["status_url"])
+        assert info["status"] == "succeeded", info.get("error")
+
+        stage_names = [s["name"] for s in info["stages"]]
+        assert stage_names[0] == "outline"
+        assert stage_names[-2:] == ["render", "save"]
+        assert all(s["duration_ms"] is not None for s in info["stages"])
+
+        filename = info["result"]["filename"]
+        assert info["download_url"] == f"/api/download/{filename}"
+        download = client.get(info["download_url"])
+        assert download.status_code == 200
+        assert download.content[:2] == b"PK"
+        (GENERATED_DIR / filename).unlink()
+
+
+def _read_sse(client, url):
+    """讀取 SSE 串流直到結束，回傳 [(event, data), ...]"""
+    events = []
+    event_name = None
+    with client.stream("GET", url) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        for line in resp.iter_lines():
+            if line.startswith("event: "):
+                event_name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event_name, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_job_event_stream():
+    """SSE 串流依序推送 LLM 嘗試、重試、fallback、渲染與存檔事件"""
+    with TestClient(app) as client:
+        created = client.post("/api/jobs", json=REQUEST).json()
+        events = _read_sse(client, f"{created['status_url']}/events")
+
+        names = [name for name, _ in events]
+        assert names[0] == "stage" and events[0][1] == {"stage": "outline"}
+        assert "llm_attempt" in names and "retry" in names and "fallback" in names
+        assert names.index("fallback") < names.index("saved") < names.index("done")
+        assert names[-1] == "done"
+
+        result = events[-1][1]["result"]
+        assert events[names.index("saved")][1]["filename"] == result["filename"]
+        (GENERATED_DIR / result["filename"]).unlink()
+
+
+class _SlowOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        time.sleep(5)
+        self.send_response(500)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_job_cancel():
+    """取消執行中的 Job：立即中止等待中的 LLM 呼叫"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    old_url = os.environ["OLLAMA_URL"]
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with TestClient(app) as client:
+            created = client.post("/api/jobs", json=REQUEST).json()
+            time.sleep(0.3)
+
+            start = time.time()
+            info = client.delete(created["status_url"]).json()
+            assert time.time() - start < 2
+            assert info["status"] == "cancelled"
+
+            events = _read_sse(client, f"{created['status_url']}/events")
+            assert events[-1][0] == "cancelled"
+    finally:
+        os.environ["OLLAMA_URL"] = old_url
+        server.shutdown()
+
+
+def test_unknown_job():
+    with TestClient(app) as client:
+        assert client.get("/api/jobs/does-not-exist").status_code == 404
+
+
+def main():
+    print("=" * 60)
+    print("Job API 測試")
+    print("=" * 60)
+    for test in (test_job_lifecycle, test_job_event_stream, test_job_cancel, test_unknown_job):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
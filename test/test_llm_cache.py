@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+LLM 大綱持久快取測試
+驗證命中 / 未命中、TTL 過期、依大小上限的 LRU 淘汰、重啟後（新 instance）仍可命中，
+prompt 版本改變時 key 自動失效，以及相同請求第二次不呼叫 Ollama。
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend import llm_service
+from backend.models import GenerateRequest, PresentationOutline
+from backend.llm_cache import LLMResponseCache
+from backend.llm_service import generate_outline, llm_cache, prompt_fingerprint
+from ollama_stub import OllamaStub, stub_outline_json
+
+OUTLINE = PresentationOutline.model_validate_json(stub_outline_json())
+
+
+def _put(cache: LLMResponseCache, key: str):
+    cache.put(key, OUTLINE, model="stub", prompt_version="v1")
+
+
+def test_hit_miss_and_persistence():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(Path(tmp), max_bytes=10 ** 6, ttl=0)
+        assert cache.get("a") is None
+        _put(cache, "a")
+        assert cache.get("a") == OUTLINE
+
+        restarted = LLMResponseCache(Path(tmp), max_bytes=10 ** 6, ttl=0)
+        assert restarted.contains("a")
+        assert restarted.get("a") == OUTLINE
+        assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(Path(tmp), max_bytes=10 ** 6, ttl=0.05)
+        _put(cache, "a")
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert not (Path(tmp) / "a.json").exists()
+
+
+def test_lru_eviction_by_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(Path(tmp), max_bytes=10 ** 6, ttl=0)
+        _put(cache, "a")
+        entry_size = cache.snapshot()["bytes"]
+        cache.max_bytes = entry_size * 2 + entry_size // 2
+
+        _put(cache, "b")
+        cache.get("a")  # a 成為最近使用
+        _put(cache, "c")
+        assert cache.contains("a") and cache.contains("c")
+        assert not cache.contains("b")
+        assert cache.evictions == 1
+        assert cache.snapshot()["bytes"] <= cache.max_bytes
+
+
+def test_prompt_change_invalidates_key():
+    request = GenerateRequest(text="快取測試：prompt 版本", num_slides=4)
+    key = prompt_fingerprint(request)
+    original = llm_service.PROMPT_VERSION
+    llm_service.PROMPT_VERSION = "edited-prompt"
+    try:
+        assert prompt_fingerprint(request) != key
+    finally:
+        llm_service.PROMPT_VERSION = original
+    assert prompt_fingerprint(request) == key
+    assert prompt_fingerprint(request.model_copy(update={"num_slides": 5})) != key
+
+
+def test_second_run_skips_ollama():
+    request = GenerateRequest(text="快取測試：同一份講義重跑", num_slides=4)
+    key = prompt_fingerprint(request)
+    llm_cache.discard(key)
+    events = []
+    old_url = os.environ.get("OLLAMA_URL")
+    try:
+        with OllamaStub() as stub:
+            os.environ["OLLAMA_URL"] = stub.url
+            first = asyncio.run(generate_outline(request))
+            second = asyncio.run(generate_outline(request, on_event=lambda e, d: events.append((e, d))))
+            forced = asyncio.run(generate_outline(request.model_copy(update={"force_regenerate": True})))
+    finally:
+        llm_cache.discard(key)
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+
+    assert stub.calls == 2  # 第一次與 force_regenerate
+    assert second == first == forced
+    names = [name for name, _ in events]
+    assert names[0] == "llm_cache_hit"
+    assert names.count("slide") == len(first.slides)
+
+
+def test_fallback_not_cached():
+    request = GenerateRequest(text="快取測試：fallback", num_slides=4)
+    key = prompt_fingerprint(request)
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = "http://127.0.0.1:9"
+    try:
+        asyncio.run(generate_outline(request))
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+    assert not llm_cache.contains(key)
+
+
+def main():
+    print("=" * 60)
+    print("LLM 大綱持久快取測試")
+    print("=" * 60)
+    for test in (test_hit_miss_and_persistence, test_ttl_expiry, test_lru_eviction_by_size,
+                 test_prompt_change_invalidates_key, test_second_run_skips_ollama, test_fallback_not_cached):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print(f"\n  快取統計: {llm_cache.snapshot()}")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
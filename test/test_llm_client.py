@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+共用 LLM HTTP client 測試
+驗證連續的 LLM 呼叫（含重試）重用同一條 keep-alive 連線，且 app lifespan 會建立 / 關閉 client。
+"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.models import GenerateRequest
+from backend.llm_service import generate_outline_with_llm
+from backend.llm_client import llm_client_pool
+from ollama_stub import OllamaStub
+
+REQUEST = GenerateRequest(text="連線重用測試：歐拉路徑", num_slides=4)
+
+
+def test_sequential_calls_reuse_connection():
+    async def scenario(url):
+        os.environ["OLLAMA_URL"] = url
+        for _ in range(3):
+            await generate_outline_with_llm(REQUEST)
+        await generate_outline_with_llm(REQUEST, on_event=lambda e, d: None)  # 串流模式也共用
+        await llm_client_pool.close()
+
+    old_url = os.environ.get("OLLAMA_URL")
+    try:
+        with OllamaStub() as stub:
+            asyncio.run(scenario(stub.url))
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+    assert stub.calls == 4
+    assert stub.connections == 1
+
+
+def test_lifespan_opens_and_closes_client():
+    with TestClient(app) as client:
+        assert client.get("/api/health").json()["llm_client"]["open"] is True
+    assert llm_client_pool.snapshot()["open"] is False
+
+
+def main():
+    print("=" * 60)
+    print("共用 LLM HTTP client 測試")
+    print("=" * 60)
+    for test in (test_sequential_calls_reuse_connection, test_lifespan_opens_and_closes_client):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+LLM 請求合併（single-flight）測試
+驗證同時送出的相同請求只呼叫一次 Ollama，且取消部分等待者不影響其他人。
+"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import GenerateRequest
+from backend.llm_service import generate_outline, coalescing_stats
+from ollama_stub import OllamaStub
+
+# force_regenerate：略過 LLM 快取，每次都實際呼叫 stub
+REQUEST = GenerateRequest(text="合併測試：同一份講義同時被多位學生送出。", num_slides=4, force_regenerate=True)
+
+
+def _run_with_stub(coro_factory, **stub_kwargs):
+    with OllamaStub(**stub_kwargs) as stub:
+        old_url = os.environ.get("OLLAMA_URL")
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            result = asyncio.run(coro_factory())
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+    return stub, result
+
+
+def test_identical_requests_share_one_call():
+    """5 個相同請求 + 1 個不同請求 → Ollama 只收到 2 次呼叫"""
+    before = coalescing_stats.snapshot()
+    events = []
+
+    async def scenario():
+        other = REQUEST.model_copy(update={"num_slides": 5})
+        return await asyncio.gather(
+            *[generate_outline(REQUEST, on_event=lambda e, d: events.append(e)) for _ in range(5)],
+            generate_outline(other),
+        )
+
+    stub, outlines = _run_with_stub(scenario, delay=0.3)
+    assert stub.calls == 2
+    assert all(o == outlines[0] for o in outlines[:5])
+    assert outlines[0] is not outlines[1]  # 每個等待者拿到獨立副本
+
+    after = coalescing_stats.snapshot()
+    assert after["llm_calls"] - before["llm_calls"] == 2
+    assert after["coalesced"] - before["coalesced"] == 4
+    assert after["in_flight"] == 0
+    # 後加入的等待者也收到共用呼叫的進度事件
+    assert events.count("coalesced") == 4
+    assert events.count("llm_attempt") == 5
+
+
+def test_cancelling_one_waiter_keeps_shared_call():
+    async def scenario():
+        first = asyncio.create_task(generate_outline(REQUEST))
+        second = asyncio.create_task(generate_outline(REQUEST))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        outline = await second
+        assert first.cancelled()
+        return outline
+
+    stub, outline = _run_with_stub(scenario, delay=0.3)
+    assert stub.calls == 1
+    assert len(outline.slides) == 4
+
+
+def test_cancelling_all_waiters_cancels_call():
+    async def scenario():
+        waiters = [asyncio.create_task(generate_outline(REQUEST)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return coalescing_stats.snapshot()["in_flight"]
+
+    _, in_flight = _run_with_stub(scenario, delay=1.0)
+    assert in_flight == 0
+
+
+def main():
+    print("=" * 60)
+    print("LLM 請求合併測試")
+    print("=" * 60)
+    for test in (test_identical_requests_share_one_call,
+                 test_cancelling_one_waiter_keeps_shared_call,
+                 test_cancelling_all_waiters_cancels_call):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print(f"\n  統計: {coalescing_stats.snapshot()}")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+長文 map-reduce 測試
+驗證語意切段、段落修改時斷點的局部性、各段重點的並行擷取（受並行上限限制）、
+reduce 呼叫只收到濃縮後的筆記，以及修改單一節時只重跑該段。
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend import map_reduce
+from backend.map_reduce import ChunkCache, MAP_SYSTEM_PROMPT, split_into_chunks
+from backend.models import GenerateRequest, ChunkKeyPoints
+from backend.llm_service import generate_outline
+from backend.admission import llm_admission
+from backend.retry_policy import RetryPolicy
+from ollama_stub import OllamaStub, stub_outline_json
+
+OUTLINE_JSON = stub_outline_json()
+
+
+def _lecture(sections: int = 8, edit_section: int = None) -> str:
+    parts = []
+    for s in range(1, sections + 1):
+        parts.append(f"# 第 {s} 節：圖論主題 {s}")
+        for p in range(1, 7):
+            marker = "（已修訂）" if s == edit_section and p == 3 else ""
+            parts.append(f"第 {s} 節第 {p} 段{marker}：" + f"說明主題 {s} 的概念 {p} 與其應用情境。" * 8)
+    return "\n".join(parts)
+
+
+def _stub_content(body: dict) -> str:
+    if body["messages"][0]["content"] == MAP_SYSTEM_PROMPT:
+        chunk = body["messages"][1]["content"].split("---\n")[1]
+        first = chunk.splitlines()[0]
+        return json.dumps({"section_title": first[:20], "key_points": [first[:60]], "data_points": []},
+                          ensure_ascii=False)
+    return OUTLINE_JSON
+
+
+def test_split_on_semantic_boundaries():
+    text = _lecture()
+    chunks = split_into_chunks(text, target_chars=1500)
+    assert "\n".join(chunks) == "\n".join(line for line in text.splitlines() if line.strip())
+    assert all(len(chunk) <= 1500 * 3 // 2 + 200 for chunk in chunks)
+    # 標題行只出現在段首
+    for chunk in chunks:
+        assert all(not line.startswith("# ") for line in chunk.splitlines()[1:])
+
+    # 修改其中一段只影響少數幾個段，其餘段內容不變
+    edited = split_into_chunks(_lecture(edit_section=4), target_chars=1500)
+    changed = set(edited) - set(chunks)
+    assert 1 <= len(changed) <= 2
+
+
+def test_map_reduce_with_chunk_cache():
+    saved = (map_reduce.LLM_CHUNK_THRESHOLD, map_reduce.LLM_CHUNK_TARGET_CHARS, map_reduce.chunk_cache)
+    old_url = os.environ.get("OLLAMA_URL")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        map_reduce.LLM_CHUNK_THRESHOLD = 4000
+        map_reduce.LLM_CHUNK_TARGET_CHARS = 1500
+        map_reduce.chunk_cache = ChunkCache(Path(cache_dir))
+        try:
+            with OllamaStub(delay=0.05, content=_stub_content) as stub:
+                os.environ["OLLAMA_URL"] = stub.url
+
+                def run(text):
+                    events = []
+                    request = GenerateRequest(text=text, num_slides=4, force_regenerate=True)
+                    outline = asyncio.run(generate_outline(request, on_event=lambda e, d: events.append((e, d))))
+                    reduce_calls = [r for r in stub.requests
+                                    if r["messages"][0]["content"] != MAP_SYSTEM_PROMPT]
+                    map_calls = len(stub.requests) - len(reduce_calls)
+                    stub.requests.clear()
+                    return outline, events, map_calls, reduce_calls
+
+                text = _lecture()
+                n_chunks = len(split_into_chunks(text, 1500))
+                outline, events, map_calls, reduce_calls = run(text)
+                assert len(outline.slides) == 4
+                assert map_calls == n_chunks
+                assert stub.max_active <= map_reduce.LLM_CHUNK_CONCURRENCY
+                # map 呼叫借用的是 admission 名額：整體並行不超過全域上限
+                assert stub.max_active <= llm_admission.max_concurrency
+                assert ("stage", {"stage": "map"}) in events
+                assert [d["done"] for e, d in events if e == "chunk"] == list(range(1, n_chunks + 1))
+                # reduce 呼叫收到的是各段重點，而非整份原文
+                reduce_message = reduce_calls[0]["messages"][1]["content"]
+                assert "各段重點" in reduce_message and len(reduce_message) < len(text) / 2
+
+                # 只修改第 4 節：其他段直接命中快取
+                _, _, map_calls, _ = run(_lecture(edit_section=4))
+                assert 1 <= map_calls <= 2
+        finally:
+            map_reduce.LLM_CHUNK_THRESHOLD, map_reduce.LLM_CHUNK_TARGET_CHARS, map_reduce.chunk_cache = saved
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+
+
+def test_map_chunk_uses_adaptive_timeout():
+    """卡住的 map 呼叫在 timeout_for() 的時間內放棄，以原文前段代替而不拖住整個請求"""
+    saved = (map_reduce.llm_retry_policy, map_reduce.LLM_CHUNK_MAX_RETRIES, map_reduce.chunk_cache)
+    old_url = os.environ.get("OLLAMA_URL")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        map_reduce.llm_retry_policy = RetryPolicy(min_timeout=0.2, max_timeout=0.2)
+        map_reduce.LLM_CHUNK_MAX_RETRIES = 1
+        map_reduce.chunk_cache = ChunkCache(Path(cache_dir))
+        try:
+            with OllamaStub(delay=2.0, content=_stub_content) as stub:
+                os.environ["OLLAMA_URL"] = stub.url
+                failed = map_reduce.CHUNK_MAPS.labels(result="failed")._value.get()
+                request = GenerateRequest(text=_lecture(sections=2), num_slides=4)
+                started = time.perf_counter()
+                condensed = asyncio.run(map_reduce.condense_long_text(request, "gpt-oss:20b"))
+                assert time.perf_counter() - started < 1.5
+                n_chunks = len(split_into_chunks(request.text))
+                assert map_reduce.CHUNK_MAPS.labels(result="failed")._value.get() - failed == n_chunks
+                assert "第 1 節" in condensed.text
+        finally:
+            map_reduce.llm_retry_policy, map_reduce.LLM_CHUNK_MAX_RETRIES, map_reduce.chunk_cache = saved
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+
+
+def test_chunk_cache_writes_never_fail_the_map():
+    """同一段同時寫入不互相干擾；快取寫入失敗時只記錄警告，map 結果照常使用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ChunkCache(Path(tmp))
+        points = ChunkKeyPoints(section_title="段", key_points=["重點"])
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda _: [cache.put("k", points) for _ in range(100)], range(4)))
+        assert cache.get("k") == points
+        assert [path.name for path in Path(tmp).iterdir()] == ["k.json"]
+
+        saved = (map_reduce.chunk_cache, map_reduce.LLM_CHUNK_TARGET_CHARS)
+        old_url = os.environ.get("OLLAMA_URL")
+        blocker = Path(tmp) / "not_a_dir"
+        blocker.write_text("")
+        map_reduce.chunk_cache = ChunkCache(blocker)
+        map_reduce.LLM_CHUNK_TARGET_CHARS = 1500
+        try:
+            with OllamaStub(content=_stub_content) as stub:
+                os.environ["OLLAMA_URL"] = stub.url
+                request = GenerateRequest(text=_lecture(sections=2), num_slides=4)
+                condensed = asyncio.run(map_reduce.condense_long_text(request, "gpt-oss:20b"))
+            assert stub.calls == len(split_into_chunks(request.text, 1500))
+            assert "第 2 節" in condensed.text
+        finally:
+            map_reduce.chunk_cache, map_reduce.LLM_CHUNK_TARGET_CHARS = saved
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+
+
+def main():
+    print("=" * 60)
+    print("長文 map-reduce 測試")
+    print("=" * 60)
+    for test in (test_split_on_semantic_boundaries, test_map_reduce_with_chunk_cache,
+                 test_map_chunk_uses_adaptive_timeout, test_chunk_cache_writes_never_fail_the_map):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
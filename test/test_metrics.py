@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Prometheus /metrics 測試
+驗證一次生成後，各階段延遲 histogram、重試 / fallback 計數與輸出大小皆出現在 /metrics。
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend.main import app, GENERATED_DIR
+from ollama_stub import OllamaStub
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _generate(client, ollama_url, payload):
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = ollama_url
+    try:
+        result = client.post("/api/generate", json=payload).json()
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+    for suffix in (".pptx", ".outline.json"):
+        (GENERATED_DIR / Path(result["filename"]).with_suffix(suffix)).unlink(missing_ok=True)
+    return result
+
+
+def test_successful_generation_metrics():
+    payload = {"text": "Metrics 測試：樹與生成樹", "num_slides": 4,
+               "template": "code_drawn", "force_regenerate": True}
+    before = {
+        "llm": _value("txt2pptx_llm_call_seconds_count", outcome="ok"),
+        "validate": _value("txt2pptx_outline_validation_seconds_count", outcome="ok"),
+        "render": _value("txt2pptx_render_seconds_count", engine="code_drawn", template="code_drawn")
+                  + _value("txt2pptx_early_renders_total", outcome="used"),
+        "write": _value("txt2pptx_file_write_seconds_count"),
+        "bytes": _value("txt2pptx_pptx_bytes_count", engine="code_drawn"),
+        "ok": _value("txt2pptx_generations_total", outcome="succeeded"),
+    }
+    with OllamaStub() as stub, TestClient(app) as client:
+        _generate(client, stub.url, payload)
+        text = client.get("/metrics").text
+
+    assert _value("txt2pptx_llm_call_seconds_count", outcome="ok") == before["llm"] + 1
+    assert _value("txt2pptx_outline_validation_seconds_count", outcome="ok") == before["validate"] + 1
+    # 串流時提前渲染完成的 deck 不經過 render pool
+    assert _value("txt2pptx_render_seconds_count", engine="code_drawn", template="code_drawn") \
+        + _value("txt2pptx_early_renders_total", outcome="used") == before["render"] + 1
+    assert _value("txt2pptx_file_write_seconds_count") == before["write"] + 1
+    assert _value("txt2pptx_pptx_bytes_count", engine="code_drawn") == before["bytes"] + 1
+    assert _value("txt2pptx_generations_total", outcome="succeeded") == before["ok"] + 1
+    assert _value("txt2pptx_generations_in_flight") == 0
+    assert "txt2pptx_llm_queue_depth" in text
+    assert "txt2pptx_render_in_flight" in text
+
+
+def test_retry_and_fallback_counters():
+    """Ollama 一直回 500：每次失敗都計數，最後 fallback 計數 +1"""
+    payload = {"text": "Metrics 測試：fallback", "num_slides": 4,
+               "template": "code_drawn", "force_regenerate": True}
+    retries = _value("txt2pptx_llm_retries_total")
+    exhausted = _value("txt2pptx_llm_all_retries_failed_total")
+    fallbacks = _value("txt2pptx_demo_fallbacks_total")
+    errors = _value("txt2pptx_llm_call_seconds_count", outcome="error")
+    with OllamaStub(status=500) as stub, TestClient(app) as client:
+        _generate(client, stub.url, payload)
+        attempts = stub.calls
+
+    assert _value("txt2pptx_llm_retries_total") == retries + attempts - 1
+    assert _value("txt2pptx_llm_all_retries_failed_total") == exhausted + 1
+    assert _value("txt2pptx_demo_fallbacks_total") == fallbacks + 1
+    assert _value("txt2pptx_llm_call_seconds_count", outcome="error") == errors + attempts
+
+
+def main():
+    print("=" * 60)
+    print("Prometheus /metrics 測試")
+    print("=" * 60)
+    for test in (test_successful_generation_metrics, test_retry_and_fallback_counters):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+大綱逐頁修補測試
+驗證 markdown fence / 多餘逗號 / layout 寫法等問題在本地修正（不呼叫 LLM），
+單頁 speaker_notes 過短時只重新請求該頁，其餘頁面保留原樣；壞掉的頁面過多時整份重新生成。
+"""
+import os
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import GenerateRequest, SlideData
+from backend.llm_service import generate_outline, MAX_RETRIES
+from backend import outline_repair
+from backend.admission import llm_admission
+from backend.outline_repair import REPAIR_SYSTEM_PROMPT, repair_json_text, fix_slide_locally
+from ollama_stub import OllamaStub, stub_outline_json, STUB_NOTES
+
+REPAIRED_NOTES = "這是修補後的講者備註，補充本頁的背景脈絡與延伸說明，並提供實例應用與一個引導討論的問題，讓內容更完整。"
+
+
+def _is_repair(body: dict) -> bool:
+    return body["messages"][0]["content"] == REPAIR_SYSTEM_PROMPT
+
+
+def _broken_outline(broken_indices=(), layout=None, num_slides: int = 4) -> str:
+    """回傳以 markdown fence 包住、帶多餘逗號的大綱；指定頁的 speaker_notes 過短。"""
+    outline = json.loads(stub_outline_json(num_slides))
+    for i in broken_indices:
+        outline["slides"][i - 1]["speaker_notes"] = "太短"
+    if layout:
+        outline["slides"][1]["layout"] = layout
+    text = json.dumps(outline, ensure_ascii=False, indent=2)
+    text = text.replace("\n    }\n  ]\n}", "\n    },\n  ],\n}")
+    return f"以下是大綱：\n```json\n{text}\n```"
+
+
+def _repair_response(body: dict) -> str:
+    current = json.loads(body["messages"][1]["content"].split("目前的 JSON：\n", 1)[1].split("\n\n驗證錯誤", 1)[0])
+    current["speaker_notes"] = REPAIRED_NOTES
+    return json.dumps(current, ensure_ascii=False)
+
+
+def _generate(stub: OllamaStub, text: str):
+    events = []
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = stub.url
+    try:
+        outline = asyncio.run(generate_outline(
+            GenerateRequest(text=text, num_slides=4, force_regenerate=True), on_event=lambda e, d: events.append((e, d))
+        ))
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+    return outline, events
+
+
+def test_repair_json_text():
+    assert json.loads(repair_json_text('```json\n{"a": [1, 2,], "b": "x,]",}\n```')) == {"a": [1, 2], "b": "x,]"}
+    assert json.loads(repair_json_text('好的，以下是 JSON：{"a": 1}\n希望有幫助')) == {"a": 1}
+    assert repair_json_text('{"a": 1}') == '{"a": 1}'
+
+
+def test_fix_slide_locally():
+    fixed = fix_slide_locally({"layout": "Two-Column", "title": "t", "speaker_notes": "說明。" * 80})
+    assert fixed["layout"] == "two_column"
+    assert len(fixed["speaker_notes"]) <= 200 and fixed["speaker_notes"].endswith("。")
+    assert fix_slide_locally({"layout": "stats"})["layout"] == "key_stats"
+    SlideData.model_validate(fixed)
+
+
+def test_local_fixes_need_no_llm_call():
+    with OllamaStub(content=_broken_outline(layout="Bullets")) as stub:
+        outline, events = _generate(stub, "修補測試：本地修正")
+    assert stub.calls == 1
+    assert "repair" not in [name for name, _ in events]
+    assert outline.slides[1].layout.value == "bullets"
+
+
+def test_only_broken_slide_is_rerequested():
+    content = lambda body: _repair_response(body) if _is_repair(body) else _broken_outline(broken_indices=(3,))
+    with OllamaStub(content=content) as stub:
+        outline, events = _generate(stub, "修補測試：單頁重新請求")
+
+    repair_requests = [body for body in stub.requests if _is_repair(body)]
+    assert stub.calls == 2 and len(repair_requests) == 1
+    assert "← 需要修正" in repair_requests[0]["messages"][1]["content"]  # 附上整份簡報的脈絡
+    assert dict(events)["repair"] == {"indices": [3], "total": 4}
+    assert "retry" not in [name for name, _ in events]
+    assert outline.slides[2].speaker_notes == REPAIRED_NOTES
+    assert all(slide.speaker_notes == STUB_NOTES for i, slide in enumerate(outline.slides) if i != 2)
+    # 修補後的頁面也會送出 slide 事件
+    assert [d["index"] for name, d in events if name == "slide"] == [1, 2, 4, 3]
+
+
+def test_repairs_are_bounded():
+    """多頁同時壞掉時修補呼叫並行受 LLM_REPAIR_CONCURRENCY 與 admission 名額限制"""
+    broken = (2, 3, 5, 6)
+    content = lambda body: _repair_response(body) if _is_repair(body) \
+        else _broken_outline(broken_indices=broken, num_slides=8)
+    with OllamaStub(delay=0.1, content=content) as stub:
+        outline, _ = _generate(stub, "修補測試：多頁並行修補")
+
+    assert stub.calls == 1 + len(broken)
+    assert stub.max_active <= min(outline_repair.LLM_REPAIR_CONCURRENCY, llm_admission.max_concurrency)
+    assert [outline.slides[i - 1].speaker_notes for i in broken] == [REPAIRED_NOTES] * len(broken)
+    assert llm_admission.in_flight == 0
+
+
+def test_too_many_broken_slides_regenerates():
+    with OllamaStub(content=_broken_outline(broken_indices=(1, 2, 3))) as stub:
+        _, events = _generate(stub, "修補測試：整份重新生成")
+    assert stub.calls == MAX_RETRIES
+    assert not any(_is_repair(body) for body in stub.requests)
+    assert {d["error_class"] for name, d in events if name == "retry"} == {"validation"}
+
+
+def main():
+    print("=" * 60)
+    print("大綱逐頁修補測試")
+    print("=" * 60)
+    for test in (test_repair_json_text, test_fix_slide_locally, test_local_fixes_need_no_llm_call,
+                 test_only_broken_slide_is_rerequested, test_repairs_are_bounded,
+                 test_too_many_broken_slides_regenerates):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Direct-XML engine 對照測試
+以 python-pptx 開啟兩個 engine 產生的簡報，逐頁逐 shape 比對類型、名稱、位置大小、填色、框線與文字格式，
+並確認 XML engine 產生的套件可被 python-pptx 重新開啟與存檔。
+"""
+import io
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from pptx import Presentation
+from pptx.enum.dml import MSO_FILL
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from backend import pptx_generator, pptx_generator_xml
+from backend.models import PresentationOutline, SlideData, SlideLayout, StatItem
+from backend.render_pool import render_pptx
+
+OUTLINE = PresentationOutline(
+    title="離散數學 & <圖論>",
+    slides=[
+        SlideData(layout=SlideLayout.TITLE, title="離散數學 & <圖論>", subtitle="第一講：集合"),
+        SlideData(layout=SlideLayout.TITLE, title="沒有副標題"),
+        SlideData(layout=SlideLayout.SECTION, title="第一章", subtitle="集合論"),
+        SlideData(layout=SlideLayout.BULLETS, title="重點", image_prompt="venn diagram",
+                  bullets=["A ∪ B", "A ∩ B", "第一行\n第二行", "\"引號\" 與 'apostrophe'", "x < y && y > z", "第六點"]),
+        SlideData(layout=SlideLayout.BULLETS, title="單一重點", bullets=["只有一點"]),
+        SlideData(layout=SlideLayout.TWO_COLUMN, title="比較", left_title="左", left_column=["a", "b"],
+                  right_title="右", right_column=["c\td", "e\x07f"]),
+        SlideData(layout=SlideLayout.TWO_COLUMN, title="空欄位"),
+        SlideData(layout=SlideLayout.IMAGE_LEFT, title="圖左", bullets=["一", "二"], image_prompt="tree"),
+        SlideData(layout=SlideLayout.IMAGE_RIGHT, title="圖右", bullets=["三"]),
+        SlideData(layout=SlideLayout.KEY_STATS, title="數據", stats=[StatItem(value=str(v), label=f"指標 {v}")
+                                                                   for v in range(5)]),
+        SlideData(layout=SlideLayout.KEY_STATS, title="一項數據", stats=[StatItem(value="99%", label="正確率")]),
+        SlideData(layout=SlideLayout.KEY_STATS, title="沒有數據"),
+        SlideData(layout=SlideLayout.COMPARISON, title="A vs B", left_title="A", left_column=["快"],
+                  right_title="B", right_column=["穩", "慢"]),
+        SlideData(layout=SlideLayout.CONCLUSION, title="總結", bullets=["回顧", "作業"]),
+    ],
+)
+
+
+def _fill(fill):
+    return str(fill.fore_color.rgb) if fill.type == MSO_FILL.SOLID else fill.type
+
+
+def _shape_signature(shape) -> dict:
+    sig = {
+        "shape_id": shape.shape_id, "name": shape.name, "type": shape.shape_type,
+        "geometry": (shape.left, shape.top, shape.width, shape.height),
+    }
+    if shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
+        sig["auto_shape_type"] = shape.auto_shape_type
+        sig["fill"] = _fill(shape.fill)
+        sig["line"] = (shape.line.width, _fill(shape.line.fill))
+    else:
+        sig["word_wrap"] = shape.text_frame.word_wrap
+        sig["paragraphs"] = [
+            (p.text, p.alignment, p.space_after, p.level, p.font.size, p.font.name, p.font.bold, p.font.italic,
+             str(p.font.color.rgb), p._pPr.find("{http://schemas.openxmlformats.org/drawingml/2006/main}buChar")
+             is not None)
+            for p in shape.text_frame.paragraphs
+        ]
+    return sig
+
+
+def test_shape_parity():
+    expected = Presentation(io.BytesIO(pptx_generator.generate_pptx(OUTLINE)))
+    actual = Presentation(io.BytesIO(pptx_generator_xml.generate_pptx(OUTLINE)))
+
+    assert (actual.slide_width, actual.slide_height) == (expected.slide_width, expected.slide_height)
+    assert len(actual.slides) == len(expected.slides) == len(OUTLINE.slides)
+    for i, (want, got) in enumerate(zip(expected.slides, actual.slides), 1):
+        assert got.slide_layout.name == want.slide_layout.name
+        assert str(got.background.fill.fore_color.rgb) == str(want.background.fill.fore_color.rgb)
+        want_shapes = [_shape_signature(shape) for shape in want.shapes]
+        got_shapes = [_shape_signature(shape) for shape in got.shapes]
+        assert len(got_shapes) == len(want_shapes), f"slide {i}: shape count"
+        for want_shape, got_shape in zip(want_shapes, got_shapes):
+            assert got_shape == want_shape, f"slide {i}: {got_shape['name']}"
+
+
+def test_slide_xml_identical():
+    """python-pptx 的 slide XML 與 XML engine 的輸出逐字相同。"""
+    expected = Presentation(io.BytesIO(pptx_generator.generate_pptx(OUTLINE)))
+    actual = Presentation(io.BytesIO(pptx_generator_xml.generate_pptx(OUTLINE)))
+    for want, got in zip(expected.slides, actual.slides):
+        assert got.part.blob == want.part.blob
+
+
+def test_package_roundtrip():
+    prs = Presentation(io.BytesIO(render_pptx(OUTLINE, "code_drawn")))
+    prs.slides.add_slide(prs.slide_layouts[6])
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    assert len(Presentation(io.BytesIO(buffer.getvalue())).slides) == len(OUTLINE.slides) + 1
+
+
+def main():
+    print("=" * 60)
+    print("Direct-XML engine 對照測試")
+    print("=" * 60)
+    for test in (test_shape_parity, test_slide_xml_identical, test_package_roundtrip):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
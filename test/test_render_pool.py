@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Render pool 測試
+驗證渲染在 process pool 中執行、不阻塞 event loop，並正確回報排隊與渲染時間。
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import GenerateRequest
+from backend.llm_service import generate_outline_demo
+from backend.render_pool import RenderExecutor
+
+OUTLINE = generate_outline_demo(GenerateRequest(
+    text="圖論是組合數學分支。圖由頂點與邊構成，用來描述事物之間的關係。",
+    num_slides=10,
+))
+
+
+async def _render_concurrently(executor, n):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    tick_task = asyncio.create_task(ticker())
+    try:
+        results = await asyncio.gather(*[
+            executor.render(OUTLINE, template)
+            for template in ["code_drawn", "ocean_gradient"] * (n // 2)
+        ])
+    finally:
+        tick_task.cancel()
+    return results, ticks
+
+
+def test_process_pool_render():
+    """1 個 worker、每渲染一次即回收：結果正確且 event loop 持續運作"""
+    executor = RenderExecutor(workers=1, max_tasks_per_worker=1)
+    try:
+        results, ticks = asyncio.run(_render_concurrently(executor, 4))
+    finally:
+        executor.shutdown()
+
+    assert all(r.pptx_bytes[:2] == b"PK" for r in results)
+    assert ticks > 0, "event loop was blocked during rendering"
+
+    stats = executor.stats.snapshot()
+    assert stats["completed"] == 4
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+    # 單一 worker：後面的渲染必須排隊
+    assert max(r.queue_wait_ms for r in results) > 0
+
+
+def test_thread_fallback_render():
+    """RENDER_WORKERS=0 時改以 thread 執行"""
+    executor = RenderExecutor(workers=0)
+    results, _ = asyncio.run(_render_concurrently(executor, 2))
+    assert all(r.pptx_bytes[:2] == b"PK" for r in results)
+    assert executor.stats.snapshot()["completed"] == 2
+
+
+def main():
+    print("=" * 60)
+    print("Render pool 測試")
+    print("=" * 60)
+    for test in (test_process_pool_render, test_thread_fallback_render):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
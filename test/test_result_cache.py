@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+結果快取測試
+驗證相同請求第二次直接回傳快取檔案（不呼叫 LLM），force_regenerate 可強制重新生成，
+demo fallback 的結果不會寫入快取。
+"""
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app, GENERATED_DIR
+from backend.models import GenerateRequest, PresentationOutline
+from backend.pipeline import result_cache
+from backend.llm_service import llm_cache, prompt_fingerprint
+from backend.result_cache import ResultCache, result_key
+from ollama_stub import OllamaStub, stub_outline_json
+
+REQUEST = {
+    "text": "結果快取測試：集合論與圖論的基本概念。",
+    "num_slides": 4,
+    "template": "code_drawn",
+}
+
+
+def _cleanup(key):
+    for suffix in (".pptx", ".outline.json"):
+        (GENERATED_DIR / f"{key}{suffix}").unlink(missing_ok=True)
+    llm_cache.discard(prompt_fingerprint(GenerateRequest(**REQUEST)))
+
+
+def _with_ollama(url):
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = url
+    return old_url
+
+
+def _restore_ollama(old_url):
+    if old_url is None:
+        os.environ.pop("OLLAMA_URL", None)
+    else:
+        os.environ["OLLAMA_URL"] = old_url
+
+
+def test_result_key():
+    """key 隨任何生成參數改變，檔名即為 key"""
+    base = GenerateRequest(**REQUEST)
+    assert result_key(base) == result_key(GenerateRequest(**REQUEST))
+    assert result_key(base) != result_key(GenerateRequest(**{**REQUEST, "num_slides": 5}))
+    assert result_key(base) != result_key(GenerateRequest(**{**REQUEST, "template": "ocean_gradient"}))
+    # force_regenerate 不影響 key
+    assert result_key(base) == result_key(GenerateRequest(**REQUEST, force_regenerate=True))
+
+
+def test_cache_hit_skips_llm():
+    key = result_key(GenerateRequest(**REQUEST))
+    _cleanup(key)
+    with OllamaStub() as stub, TestClient(app) as client:
+        old_url = _with_ollama(stub.url)
+        try:
+            first = client.post("/api/generate", json=REQUEST).json()
+            assert first["filename"] == f"{key}.pptx" and first["cached"] is False
+            assert stub.calls == 1
+
+            hits_before = result_cache.hits
+            second = client.post("/api/generate", json=REQUEST).json()
+            assert second["cached"] is True
+            assert second["filename"] == first["filename"]
+            assert second["outline"] == first["outline"]
+            assert stub.calls == 1
+            assert result_cache.hits == hits_before + 1
+
+            forced = client.post("/api/generate", json={**REQUEST, "force_regenerate": True}).json()
+            assert forced["cached"] is False
+            assert stub.calls == 2
+        finally:
+            _restore_ollama(old_url)
+            _cleanup(key)
+
+
+def test_fallback_not_cached():
+    key = result_key(GenerateRequest(**REQUEST))
+    _cleanup(key)
+    with TestClient(app) as client:
+        old_url = _with_ollama("http://127.0.0.1:9")
+        try:
+            result = client.post("/api/generate", json=REQUEST).json()
+            assert result["filename"] != f"{key}.pptx"
+            assert not (GENERATED_DIR / f"{key}.pptx").exists()
+            (GENERATED_DIR / result["filename"]).unlink()
+        finally:
+            _restore_ollama(old_url)
+
+
+def test_concurrent_store_same_key():
+    """合併的相同請求會同時寫入同一個 key：各自的暫存檔不互相覆蓋或刪除"""
+    outline = PresentationOutline.model_validate_json(stub_outline_json())
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp))
+        barrier = threading.Barrier(2)
+
+        def store(payload: bytes):
+            barrier.wait()
+            for _ in range(200):
+                cache.store("k", payload, outline)
+
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(store, [b"a" * 4096, b"b" * 4096]))
+        assert cache.lookup("k") == ("k.pptx", outline)
+        assert (Path(tmp) / "k.pptx").read_bytes() in (b"a" * 4096, b"b" * 4096)
+        assert sorted(path.name for path in Path(tmp).iterdir()) == ["k.outline.json", "k.pptx"]
+
+
+def main():
+    print("=" * 60)
+    print("結果快取測試")
+    print("=" * 60)
+    for test in (test_result_key, test_cache_hit_skips_llm, test_fallback_not_cached,
+                 test_concurrent_store_same_key):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print(f"\n  快取統計: {result_cache.snapshot()}")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
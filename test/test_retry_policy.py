@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+錯誤分類重試策略測試
+驗證錯誤分類、各類別的退避與 jitter、依延遲推算的 timeout，
+以及 404（模型不存在）不重試、JSON 錯誤會重試、timeout 後下一次嘗試放寬 timeout。
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+import httpx
+from pydantic import ValidationError
+
+from backend import llm_service
+from backend.models import GenerateRequest, PresentationOutline
+from backend.llm_service import generate_outline, MAX_RETRIES
+from backend.retry_policy import ErrorClass, RetryPolicy, RetryRule, classify_error
+from ollama_stub import OllamaStub
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://127.0.0.1/api/chat")
+    return httpx.HTTPStatusError("stub", request=request, response=httpx.Response(status, request=request))
+
+
+def _generate(url: str, text: str):
+    """以 stub 生成大綱，回傳 (outline, 事件列表)。"""
+    events = []
+    old_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = url
+    try:
+        outline = asyncio.run(generate_outline(
+            GenerateRequest(text=text, num_slides=4, force_regenerate=True), on_event=lambda e, d: events.append((e, d))
+        ))
+    finally:
+        if old_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = old_url
+    return outline, events
+
+
+def test_classify_errors():
+    try:
+        json.loads("{")
+    except json.JSONDecodeError as e:
+        decode_error = e
+    try:
+        PresentationOutline.model_validate({})
+    except ValidationError as e:
+        validation_error = e
+
+    assert classify_error(_status_error(404)) is ErrorClass.HTTP_4XX
+    assert classify_error(_status_error(429)) is ErrorClass.THROTTLED
+    assert classify_error(_status_error(503)) is ErrorClass.HTTP_5XX
+    assert classify_error(httpx.ConnectError("refused")) is ErrorClass.CONNECT
+    assert classify_error(ConnectionRefusedError()) is ErrorClass.CONNECT
+    assert classify_error(httpx.ReadTimeout("slow")) is ErrorClass.TIMEOUT
+    assert classify_error(TimeoutError()) is ErrorClass.TIMEOUT
+    assert classify_error(decode_error) is ErrorClass.JSON_DECODE
+    assert classify_error(validation_error) is ErrorClass.VALIDATION
+    assert classify_error(RuntimeError("Ollama error")) is ErrorClass.OTHER
+
+
+def test_backoff_with_jitter_and_cap():
+    rules = {ErrorClass.CONNECT: RetryRule(retry=True, base_delay=1.0, max_delay=4.0)}
+    policy = RetryPolicy(rules=rules, rng=random.Random(1))
+    for failures, cap in enumerate((1.0, 2.0, 4.0, 4.0, 4.0), 1):
+        delay = policy.backoff(ErrorClass.CONNECT, failures)
+        assert cap / 2 <= delay <= cap
+
+    samples = {round(policy.backoff(ErrorClass.CONNECT, 3), 6) for _ in range(20)}
+    assert len(samples) > 1  # jitter
+    assert policy.backoff(ErrorClass.HTTP_4XX, 1) is None
+    assert not policy.should_retry(ErrorClass.HTTP_4XX)
+
+
+def test_adaptive_timeout():
+    policy = RetryPolicy(min_timeout=1.0, max_timeout=600.0, min_samples=3,
+                         timeout_percentile=95, timeout_multiplier=3, timeout_backoff=2)
+    assert policy.timeout_for(4) == 600.0  # 樣本不足
+
+    for _ in range(20):
+        policy.record_latency(2.0, slides=4)  # 每頁 0.5 秒
+    assert policy.timeout_for(4) == 6.0
+    assert policy.timeout_for(8) == 12.0
+    assert policy.timeout_for(4, timeouts=1) == 12.0
+    assert policy.timeout_for(1000) == 600.0
+    assert policy.timeout_for(0) == 1.0
+
+    policy.record_latency(40.0, slides=4)  # 單一極端值不影響 p95
+    assert policy.timeout_for(4) == 6.0
+
+
+def test_model_missing_is_not_retried():
+    """404 不重試，直接 fallback"""
+    with OllamaStub(status=404) as stub:
+        outline, events = _generate(stub.url, "重試策略測試：模型不存在")
+    names = [name for name, _ in events]
+    assert stub.calls == 1
+    assert "retry" not in names
+    assert "not retryable" in dict(events)["fallback"]["reason"]
+    assert outline.slides
+
+
+def test_invalid_json_is_retried():
+    with OllamaStub(content="這不是 JSON") as stub:
+        _, events = _generate(stub.url, "重試策略測試：JSON 錯誤")
+    retries = [data for name, data in events if name == "retry"]
+    assert stub.calls == MAX_RETRIES
+    assert {data["error_class"] for data in retries} == {"json_decode"}
+
+
+def test_timeout_is_relaxed_after_timeout():
+    """依延遲推算的 timeout 太短時，下一次嘗試放寬 timeout 後成功"""
+    policy = RetryPolicy(min_timeout=0.2, min_samples=1, timeout_multiplier=1, timeout_backoff=5)
+    policy.record_latency(0.01, slides=4)
+    original = llm_service.llm_retry_policy
+    llm_service.llm_retry_policy = policy
+    try:
+        with OllamaStub(delay=0.4) as stub:
+            outline, events = _generate(stub.url, "重試策略測試：timeout")
+    finally:
+        llm_service.llm_retry_policy = original
+
+    names = [name for name, _ in events]
+    assert stub.calls == 2
+    assert dict(events)["retry"]["error_class"] == "timeout"
+    assert "fallback" not in names
+    assert len(policy.latency) == 2  # 成功的呼叫記入延遲樣本
+
+
+def main():
+    print("=" * 60)
+    print("錯誤分類重試策略測試")
+    print("=" * 60)
+    for test in (test_classify_errors, test_backoff_with_jitter_and_cap, test_adaptive_timeout,
+                 test_model_missing_is_not_retried, test_invalid_json_is_retried,
+                 test_timeout_is_relaxed_after_timeout):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+版面骨架快取測試
+驗證 code-drawn engine 的靜態裝飾（背景、accent bar、頁尾、卡片框）每個 (theme, layout) 只建立一次、
+以 deepcopy 複製後修改投影片不影響快取，以及不同 theme 各自有獨立的骨架。
+"""
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+
+from backend import pptx_generator
+from backend.pptx_generator import Theme, new_presentation, add_slide, _skeleton, _new_slide, _stamp
+from backend.models import PresentationOutline, SlideData, SlideLayout
+
+OUTLINE = PresentationOutline(
+    title="骨架",
+    slides=[
+        SlideData(layout=SlideLayout.TITLE, title="骨架", subtitle="快取"),
+        SlideData(layout=SlideLayout.TWO_COLUMN, title="兩欄", left_title="左", left_column=["a"],
+                  right_title="右", right_column=["b"]),
+        SlideData(layout=SlideLayout.COMPARISON, title="比較", left_column=["a"], right_column=["b"]),
+        SlideData(layout=SlideLayout.CONCLUSION, title="總結", bullets=["完"]),
+    ],
+)
+
+
+class NightTheme(Theme):
+    DARK = RGBColor(0x00, 0x00, 0x00)
+    ACCENT = RGBColor(0xFF, 0x00, 0x00)
+
+
+def _slides_equal(a: bytes, b: bytes) -> bool:
+    return [s.part.blob for s in Presentation(io.BytesIO(a)).slides] == \
+        [s.part.blob for s in Presentation(io.BytesIO(b)).slides]
+
+
+def test_skeleton_built_once_per_layout():
+    pptx_generator.generate_pptx(OUTLINE)
+    cached = dict(pptx_generator._SKELETONS)
+    first = pptx_generator.generate_pptx(OUTLINE)
+    assert pptx_generator._SKELETONS == cached
+    assert all(cached[key] is pptx_generator._SKELETONS[key] for key in cached)
+
+    # 修改複製出來的 shape 與背景不影響快取，之後的輸出不變
+    prs = new_presentation()
+    add_slide(prs, OUTLINE.slides[0], 1, 1)
+    prs.slides[0].shapes[0].fill.fore_color.rgb = RGBColor(0x12, 0x34, 0x56)
+    prs.slides[0].background.fill.fore_color.rgb = RGBColor(0x12, 0x34, 0x56)
+    assert _slides_equal(first, pptx_generator.generate_pptx(OUTLINE))
+
+
+def test_stamped_shapes_are_independent_and_renumbered():
+    prs = new_presentation()
+    add_slide(prs, OUTLINE.slides[1], 1, 1)
+    slide = prs.slides[0]
+    card = slide.shapes[2]
+    assert (card.shape_id, card.name) == (4, "Rectangle 3")
+    card.fill.fore_color.rgb = RGBColor(0x12, 0x34, 0x56)
+
+    cached = _skeleton(SlideLayout.TWO_COLUMN).groups["left_card"][0]
+    assert cached.xpath(".//a:srgbClr/@val")[0] == str(Theme.CARD_BG)
+    ids = [shape.shape_id for shape in slide.shapes]
+    assert ids == list(range(2, len(ids) + 2))
+
+
+def test_skeleton_keyed_by_theme():
+    prs = new_presentation()
+    slide = _new_slide(prs, SlideLayout.TITLE, NightTheme)
+    _stamp(slide, SlideLayout.TITLE, "left_bar", NightTheme)
+    assert str(slide.background.fill.fore_color.rgb) == "000000"
+    assert str(slide.shapes[0].fill.fore_color.rgb) == "FF0000"
+    assert _skeleton(SlideLayout.TITLE, NightTheme) is not _skeleton(SlideLayout.TITLE)
+    assert str(_skeleton(SlideLayout.TITLE).bg.xpath(".//a:srgbClr/@val")[0]) == str(Theme.DARK)
+
+
+def test_skeleton_built_once_under_concurrency():
+    """多個 render thread 同時第一次用到同一版面時只建一次骨架"""
+    class ConcurrentTheme(Theme):
+        pass
+
+    threads = 8
+    barrier = threading.Barrier(threads)
+
+    def build(layout):
+        barrier.wait()
+        return _skeleton(layout, ConcurrentTheme)
+
+    _skeleton(SlideLayout.TITLE)  # 確保 _scratch_prs 已建立
+    before = len(pptx_generator._scratch_prs.slides)
+    with ThreadPoolExecutor(threads) as pool:
+        for layout in SlideLayout:
+            results = list(pool.map(build, [layout] * threads))
+            assert all(result is results[0] for result in results)
+            assert pptx_generator._SKELETONS[(ConcurrentTheme, layout)] is results[0]
+    assert len(pptx_generator._scratch_prs.slides) - before == len(SlideLayout)
+
+
+def main():
+    print("=" * 60)
+    print("版面骨架快取測試")
+    print("=" * 60)
+    for test in (test_skeleton_built_once_per_layout, test_stamped_shapes_are_independent_and_renumbered,
+                 test_skeleton_keyed_by_theme, test_skeleton_built_once_under_concurrency):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
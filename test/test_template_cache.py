@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+模板原型快取測試
+驗證從快取原型複製出的簡報與每次重新讀檔、清除 slides 的結果逐 part 相同，
+產生簡報不會修改原型、模板檔案變更時快取自動失效，
+以及存檔時未變動的 part 直接沿用模板 zip 內已壓縮的原始 entry（寫出的 zip 可完整讀回，
+原樣寫入失敗時改用 prs.save）。
+"""
+import io
+import sys
+import shutil
+import zipfile
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from lxml import etree
+from pptx import Presentation
+from pptx.oxml import parse_xml
+
+from backend import pptx_generator_template as template_engine
+from backend.models import PresentationOutline, SlideData, SlideLayout, StatItem
+
+OUTLINE = PresentationOutline(
+    title="快取測試",
+    slides=[
+        SlideData(layout=SlideLayout.TITLE, title="快取測試", subtitle="原型"),
+        SlideData(layout=SlideLayout.BULLETS, title="重點", bullets=["一", "二"]),
+        SlideData(layout=SlideLayout.TWO_COLUMN, title="兩欄", left_title="左", left_column=["a"],
+                  right_title="右", right_column=["b"]),
+        SlideData(layout=SlideLayout.KEY_STATS, title="數據", stats=[StatItem(value="1", label="一")]),
+        SlideData(layout=SlideLayout.CONCLUSION, title="總結", bullets=["完"]),
+    ],
+)
+
+
+def _render(prs) -> bytes:
+    for idx, slide_data in enumerate(OUTLINE.slides, 1):
+        template_engine.add_slide(prs, slide_data, idx, len(OUTLINE.slides))
+    return template_engine.save_presentation(prs)
+
+
+def _parts(pptx_bytes: bytes) -> dict[str, bytes]:
+    """part 名稱 → 內容；XML 以 python-pptx 的 parser 重新序列化（不受 XML 宣告與縮排影響），
+    relationship 依 Id 排序。"""
+    parts = {}
+    with zipfile.ZipFile(io.BytesIO(pptx_bytes)) as zf:
+        assert zf.testzip() is None
+        for name in zf.namelist():
+            data = zf.read(name)
+            if name.endswith(".rels"):
+                data = sorted(tuple(sorted(rel.attrib.items())) for rel in etree.fromstring(data))
+            elif name.endswith(".xml"):
+                data = etree.tostring(parse_xml(data))
+            parts[name] = data
+    return parts
+
+
+def test_clone_matches_fresh_load():
+    for path in sorted(template_engine.TEMPLATES_DIR.glob("*.pptx")):
+        fresh = Presentation(str(path))
+        template_engine._clean_template_slides(fresh)
+        assert _parts(_render(template_engine.new_presentation(path.stem))) == _parts(_render(fresh)), path.stem
+
+
+def test_prototype_not_modified():
+    first = template_engine.generate_pptx(OUTLINE, template_id="Zen_Serenity")
+    second = template_engine.generate_pptx(OUTLINE, template_id="Zen_Serenity")
+    assert _parts(first) == _parts(second)
+    prototype = template_engine._TEMPLATE_CACHE[template_engine.TEMPLATES_DIR / "Zen_Serenity.pptx"].prototype
+    assert len(prototype.slides) == 0
+    assert len(Presentation(io.BytesIO(second)).slides) == len(OUTLINE.slides)
+
+
+def test_cache_invalidated_on_file_change():
+    original_dir = template_engine.TEMPLATES_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        template_engine.TEMPLATES_DIR = Path(tmp)
+        target = Path(tmp) / "custom.pptx"
+        try:
+            shutil.copy(original_dir / "ocean_gradient.pptx", target)
+            ocean = template_engine.generate_pptx(OUTLINE, template_id="custom")
+            prototype = template_engine._TEMPLATE_CACHE[target].prototype
+            template_engine.generate_pptx(OUTLINE, template_id="custom")
+            assert template_engine._TEMPLATE_CACHE[target].prototype is prototype
+
+            shutil.copy(original_dir / "Data_Centric.pptx", target)
+            data_centric = template_engine.generate_pptx(OUTLINE, template_id="custom")
+            assert template_engine._TEMPLATE_CACHE[target].prototype is not prototype
+            assert _parts(data_centric)["ppt/theme/theme1.xml"] != _parts(ocean)["ppt/theme/theme1.xml"]
+        finally:
+            template_engine.TEMPLATES_DIR = original_dir
+            template_engine._TEMPLATE_CACHE.pop(target, None)
+
+
+def _raw_entry(zf: zipfile.ZipFile, name: str) -> tuple[int, int, bytes]:
+    info = zf.getinfo(name)
+    with zf.open(info) as f:
+        f.read()  # 驗證 CRC
+    zf.fp.seek(info.header_offset + 26)
+    name_len, extra_len = int.from_bytes(zf.fp.read(2), "little"), int.from_bytes(zf.fp.read(2), "little")
+    zf.fp.seek(info.header_offset + 30 + name_len + extra_len)
+    return info.compress_type, info.CRC, zf.fp.read(info.compress_size)
+
+
+def test_unchanged_parts_copied_raw():
+    template_path = template_engine.TEMPLATES_DIR / "College_Elegance.pptx"
+    deck = template_engine.generate_pptx(OUTLINE, template_id="College_Elegance")
+    with zipfile.ZipFile(template_path) as src, zipfile.ZipFile(io.BytesIO(deck)) as out:
+        names = out.namelist()
+        media = [name for name in names if name.startswith("ppt/media/")]
+        assert media
+        for name in media + ["ppt/slideMasters/slideMaster1.xml", "ppt/theme/theme1.xml"]:
+            assert _raw_entry(out, name) == _raw_entry(src, name), name
+
+        presentation = out.read("ppt/presentation.xml")
+        assert presentation != src.read("ppt/presentation.xml")
+        assert presentation.count(b"<p:sldId ") == len(OUTLINE.slides)
+        assert [name for name in names if name.startswith("ppt/slides/slide")] == \
+            [f"ppt/slides/slide{i}.xml" for i in range(1, len(OUTLINE.slides) + 1)]
+
+
+def _assert_valid_deck(deck: bytes):
+    with zipfile.ZipFile(io.BytesIO(deck)) as zf:
+        assert zf.testzip() is None
+    prs = Presentation(io.BytesIO(deck))
+    assert len(prs.slides) == len(OUTLINE.slides)
+    assert prs.slides[0].shapes.title.text == OUTLINE.slides[0].title
+
+
+def test_raw_saved_decks_are_valid_zips():
+    assert template_engine.PASSTHROUGH_SAVE  # 測試環境的 Python 版本在啟用範圍內
+    for path in sorted(template_engine.TEMPLATES_DIR.glob("*.pptx")):
+        _assert_valid_deck(template_engine.generate_pptx(OUTLINE, template_id=path.stem))
+
+
+def test_raw_save_falls_back_to_prs_save():
+    """zipfile 內部實作改變導致原樣寫入失敗或寫出不一致的 zip 時，改以 prs.save 存檔"""
+    original = template_engine._write_raw_entry
+
+    def misplaced_header(zf, entry):
+        original(zf, entry)
+        zf.filelist[-1].header_offset += 1  # 模擬 central directory 記錄的位置錯誤
+
+    def missing_internals(zf, entry):
+        raise AttributeError("'ZipFile' object has no attribute 'start_dir'")
+
+    try:
+        for broken in (misplaced_header, missing_internals):
+            template_engine._write_raw_entry = broken
+            deck = template_engine.generate_pptx(OUTLINE, template_id="College_Elegance")
+            _assert_valid_deck(deck)
+    finally:
+        template_engine._write_raw_entry = original
+
+    template_engine.PASSTHROUGH_SAVE = False
+    try:
+        _assert_valid_deck(template_engine.generate_pptx(OUTLINE, template_id="College_Elegance"))
+    finally:
+        template_engine.PASSTHROUGH_SAVE = True
+
+
+def main():
+    print("=" * 60)
+    print("模板原型快取測試")
+    print("=" * 60)
+    for test in (test_clone_matches_fresh_load, test_prototype_not_modified, test_cache_invalidated_on_file_change,
+                 test_unchanged_parts_copied_raw, test_raw_saved_decks_are_valid_zips,
+                 test_raw_save_falls_back_to_prs_save):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+模板目錄快取測試
+驗證 /api/templates 的 catalog 只在模板變更時重新解析，並支援 ETag / 304。
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.template_catalog import TemplateCatalog, TEMPLATES_DIR
+
+
+def _ids(catalog):
+    return [t["id"] for t in json.loads(catalog.body)["templates"]]
+
+
+def test_catalog_invalidation():
+    """新增、內容不變的 touch、內容變更、刪除模板時的 catalog 行為"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        shutil.copy(TEMPLATES_DIR / "ocean_gradient.pptx", tmp_dir)
+        catalog = TemplateCatalog(tmp_dir, recheck_seconds=0)
+
+        assert catalog.refresh() is True
+        assert _ids(catalog) == ["code_drawn", "ocean_gradient"]
+        info = catalog.get("ocean_gradient")
+        assert info["available"] and info["size_bytes"] > 0
+        assert len(info["layouts"]) >= 9
+        first_etag = catalog.etag
+
+        # 沒有變動：不重新解析，ETag 不變
+        assert catalog.refresh() is False
+        assert catalog.etag == first_etag
+
+        # 只改 mtime：內容 hash 相同，沿用解析結果
+        path = tmp_dir / "ocean_gradient.pptx"
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+        assert catalog.refresh() is False
+        assert catalog.etag == first_etag
+
+        # 新增模板 / 壞掉的模板
+        shutil.copy(TEMPLATES_DIR / "Modernist.pptx", tmp_dir)
+        (tmp_dir / "broken.pptx").write_bytes(b"not a zip")
+        assert catalog.refresh() is True
+        assert catalog.etag != first_etag
+        assert catalog.get("Modernist")["available"] is True
+        assert catalog.get("broken")["available"] is False
+
+        # 刪除模板
+        (tmp_dir / "broken.pptx").unlink()
+        assert catalog.refresh() is True
+        assert catalog.get("broken") is None
+
+
+def test_templates_endpoint_etag():
+    """第二次請求帶 If-None-Match 時回傳 304"""
+    with TestClient(app) as client:
+        first = client.get("/api/templates")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        templates = first.json()["templates"]
+        assert templates[0]["id"] == "code_drawn"
+        assert {t["id"] for t in templates if t["is_template"]} >= {"ocean_gradient", "College_Elegance"}
+
+        second = client.get("/api/templates", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+
+
+def main():
+    print("=" * 60)
+    print("模板目錄快取測試")
+    print("=" * 60)
+    for test in (test_catalog_invalidation, test_templates_endpoint_etag):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+模板編譯工具測試
+於暫存目錄編譯模板副本，驗證 layouts/母片/孤立 part 的修剪、IMAGE 形狀轉換為 Picture Placeholder、
+16:9 縮放、圖片縮小、輸出可重現（再編譯一次 bytes 不變）、manifest 跳過未變更的模板，
+以及 template engine 可直接使用編譯後的模板。
+"""
+import io
+import sys
+import shutil
+import zipfile
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Emu
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.parts.image import ImagePart
+
+from utils.compile_templates import CompileOptions, compile_template, compile_templates, IMAGE_LAYOUT_INDICES
+from utils.fix_for_pptx_format import PIC_PH_IDX
+from backend import pptx_generator_template as template_engine
+from backend.models import PresentationOutline, SlideData, SlideLayout
+
+TEMPLATES_DIR = template_engine.TEMPLATES_DIR
+
+OUTLINE = PresentationOutline(
+    title="編譯",
+    slides=[SlideData(layout=layout, title=layout.value, bullets=["一"]) for layout in SlideLayout],
+)
+
+
+def _legacy_template(path: Path):
+    """以 ocean_gradient 為底，做出未補強的 4:3 模板：Picture PH 換回 IMAGE 文字方塊，並加入一張 slide。"""
+    prs = Presentation(str(TEMPLATES_DIR / "ocean_gradient.pptx"))
+    layout = prs.slide_layouts[IMAGE_LAYOUT_INDICES[0]]
+    pic = next(ph for ph in layout.placeholders if ph.placeholder_format.idx == PIC_PH_IDX)
+    geometry = (pic.left, pic.top, pic.width, pic.height)
+    sp_tree = pic._element.getparent()
+    sp_tree.remove(pic._element)
+    textbox = prs.slides.add_slide(prs.slide_layouts[0]).shapes.add_textbox(*geometry)
+    textbox.text_frame.text = "IMAGE"
+    sp_tree.append(textbox._element)
+    prs.slide_width = Emu(9144000)
+    prs.save(str(path))
+    return geometry
+
+
+def test_prunes_layouts_and_orphaned_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "College_Elegance.pptx"
+        entry = compile_template(TEMPLATES_DIR / "College_Elegance.pptx", target, CompileOptions())
+
+        prs = Presentation(str(target))
+        assert len(prs.slide_masters) == 1
+        assert len(prs.slide_layouts) == max(template_engine.LAYOUT_MAP.values()) + 1
+        original = Presentation(str(TEMPLATES_DIR / "College_Elegance.pptx"))
+        assert [layout.name for layout in prs.slide_layouts] == \
+            [layout.name for layout in original.slide_layouts][:len(prs.slide_layouts)]
+
+        with zipfile.ZipFile(target) as zf:
+            names = zf.namelist()
+            rels = b"".join(zf.read(name) for name in names if name.endswith(".rels"))
+        assert all(f"/{name}" not in names for name in entry["pruned_parts"])
+        assert all(name.split("/")[-1].encode() in rels for name in names if name.startswith("ppt/media/"))
+        assert entry["size_after"] < entry["size_before"] and entry["missing_layouts"] == 0
+
+
+def test_injects_picture_placeholder_and_scales():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = Path(tmp) / "legacy.pptx", Path(tmp) / "out" / "legacy.pptx"
+        x, y, cx, cy = _legacy_template(source)
+        target.parent.mkdir()
+        entry = compile_template(source, target, CompileOptions())
+
+        assert entry["dropped_slides"] == 1 and entry["scaled"]
+        assert entry["picture_placeholders"] == [IMAGE_LAYOUT_INDICES[0]]
+        prs = Presentation(str(target))
+        assert len(prs.slides) == 0
+        assert abs(prs.slide_width / prs.slide_height - 16 / 9) < 1e-3
+        pic = next(ph for ph in prs.slide_layouts[IMAGE_LAYOUT_INDICES[0]].placeholders
+                   if ph.placeholder_format.idx == PIC_PH_IDX)
+        sx = prs.slide_width / 9144000
+        assert (pic.left, pic.top, pic.height) == (int(x * sx), y, cy)
+        assert pic.width == int(cx * sx)
+
+
+def test_downscales_oversized_images():
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "Zen_Serenity.pptx"
+        entry = compile_template(TEMPLATES_DIR / "Zen_Serenity.pptx", target, CompileOptions(max_image_px=1000))
+        assert entry["images"]
+        with zipfile.ZipFile(target) as zf:
+            for image in entry["images"]:
+                with Image.open(io.BytesIO(zf.read(image["part"].lstrip("/")))) as im:
+                    assert list(im.size) == image["to"] and max(im.size) == 1000
+                assert image["bytes_after"] < image["bytes_before"]
+
+
+def test_skips_vector_and_unreadable_images():
+    """SVG / EMF 與無法辨識的圖片原樣保留，不中斷編譯；其他點陣圖照常縮小"""
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg" width="4000" height="4000"/>'
+    emf = b"\x01\x00\x00\x00" + bytes(84)
+    broken_png = b"\x89PNG\r\n\x1a\n" + bytes(32)
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = Path(tmp) / "vector.pptx", Path(tmp) / "out" / "vector.pptx"
+        prs = Presentation(str(TEMPLATES_DIR / "Zen_Serenity.pptx"))
+        package, master = prs.part.package, prs.slide_masters[0].part
+        for ext, content_type, blob in (("svg", "image/svg+xml", svg), ("emf", "image/x-emf", emf),
+                                        ("png", "image/png", broken_png)):
+            part = ImagePart(package.next_image_partname(ext), content_type, package, blob)
+            master.relate_to(part, RT.IMAGE)
+        prs.save(str(source))
+        target.parent.mkdir()
+        entry = compile_template(source, target, CompileOptions(max_image_px=1000))
+
+        assert entry["images"]
+        with zipfile.ZipFile(target) as zf:
+            blobs = {zf.read(name) for name in zf.namelist() if name.startswith("ppt/media/")}
+        assert {svg, emf, broken_png} <= blobs
+
+
+def test_reproducible_and_manifest_skips_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir, out_dir, again_dir = Path(tmp) / "src", Path(tmp) / "out", Path(tmp) / "again"
+        src_dir.mkdir()
+        for name in ("Zen_Serenity.pptx", "High_Contrast.pptx", "ocean_gradient.pptx"):
+            shutil.copy(TEMPLATES_DIR / name, src_dir / name)
+        sources = sorted(src_dir.glob("*.pptx"))
+
+        first = compile_templates(sources, out_dir, jobs=2)
+        assert {e["status"] for e in first["templates"].values()} == {"compiled"}
+        second = compile_templates(sources, out_dir, jobs=2)
+        assert {e["status"] for e in second["templates"].values()} == {"unchanged"}
+
+        # 編譯結果是 fixed point：再編譯一次（原地）bytes 不變，manifest 也視為已是最新
+        compiled = sorted(out_dir.glob("*.pptx"))
+        compile_templates(compiled, again_dir)
+        for path in compiled:
+            assert (again_dir / path.name).read_bytes() == path.read_bytes(), path.name
+        in_place = compile_templates(compiled, out_dir)
+        assert {e["status"] for e in in_place["templates"].values()} == {"unchanged"}
+
+        # 設定改變或輸出被修改時重新編譯
+        assert compile_templates(sources[:1], out_dir, CompileOptions(max_image_px=800))["templates"][
+            sources[0].stem]["status"] == "compiled"
+        (out_dir / sources[1].name).write_bytes(b"corrupted")
+        assert compile_templates(sources[1:2], out_dir, CompileOptions(max_image_px=800))["templates"][
+            sources[1].stem]["status"] == "compiled"
+
+
+def test_template_engine_uses_compiled_templates():
+    original_dir = template_engine.TEMPLATES_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        compile_templates(sorted(original_dir.glob("*.pptx")), Path(tmp), jobs=2)
+        template_engine.TEMPLATES_DIR = Path(tmp)
+        try:
+            for path in sorted(Path(tmp).glob("*.pptx")):
+                deck = template_engine.generate_pptx(OUTLINE, template_id=path.stem)
+                prs = Presentation(io.BytesIO(deck))
+                assert len(prs.slides) == len(OUTLINE.slides)
+                assert prs.slides[0].shapes.title.text == SlideLayout.TITLE.value
+        finally:
+            template_engine.TEMPLATES_DIR = original_dir
+            for path in Path(tmp).glob("*.pptx"):
+                template_engine._TEMPLATE_CACHE.pop(path, None)
+
+
+def main():
+    print("=" * 60)
+    print("模板編譯工具測試")
+    print("=" * 60)
+    for test in (test_prunes_layouts_and_orphaned_parts, test_injects_picture_placeholder_and_scales,
+                 test_downscales_oversized_images, test_skips_vector_and_unreadable_images,
+                 test_reproducible_and_manifest_skips_unchanged,
+                 test_template_engine_uses_compiled_templates):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
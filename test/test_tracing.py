@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+單一請求 trace 測試
+驗證 /api/generate 回傳 Server-Timing header，debug=True 時附上 span 樹
+（LLM 嘗試含 Ollama 耗時、JSON 解析、Pydantic 驗證、逐頁 builder、prs.save、寫檔），
+並可由 /api/debug/traces 查回。
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("LLM_RETRY_DELAY", "0")
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from fastapi.testclient import TestClient
+
+from backend.main import app, GENERATED_DIR
+from backend.tracing import Trace, trace_request, span, attach
+from ollama_stub import OllamaStub
+
+
+def _find(node, name):
+    if node["name"] == name:
+        return [node]
+    return [found for child in node.get("children", []) for found in _find(child, name)]
+
+
+def test_span_tree_basics():
+    """沒有 trace 時 span 不做事；巢狀 span 與跨 process 接回的 span 正確掛載"""
+    with span("orphan") as orphan:
+        assert orphan is None
+
+    trace = Trace("unit")
+    with trace_request(trace, record=False):
+        with span("outer", k=1):
+            with span("inner"):
+                pass
+            attach([{"name": "remote", "start_ms": 0.0, "duration_ms": 2.0}], trace.started_at)
+    root = trace.to_dict()["root"]
+    outer = root["children"][0]
+    assert outer["attrs"] == {"k": 1}
+    assert [child["name"] for child in outer["children"]] == ["inner", "remote"]
+    assert trace.server_timing().startswith("outer;dur=")
+
+
+def test_generate_returns_trace():
+    payload = {"text": "Trace 測試：最短路徑演算法", "num_slides": 4, "template": "ocean_gradient",
+               "force_regenerate": True, "debug": True}
+    old_url = os.environ.get("OLLAMA_URL")
+    with OllamaStub(delay=0.05) as stub, TestClient(app) as client:
+        os.environ["OLLAMA_URL"] = stub.url
+        try:
+            resp = client.post("/api/generate", json=payload)
+            plain = client.post("/api/generate", json={**payload, "debug": False})
+        finally:
+            if old_url is None:
+                os.environ.pop("OLLAMA_URL", None)
+            else:
+                os.environ["OLLAMA_URL"] = old_url
+        result = resp.json()
+        traces = client.get("/api/debug/traces", params={"limit": 5}).json()["traces"]
+        fetched = client.get(f"/api/debug/traces/{result['trace_id']}")
+        missing = client.get("/api/debug/traces/does-not-exist")
+    for r in (result, plain.json()):
+        for suffix in (".pptx", ".outline.json"):
+            (GENERATED_DIR / Path(r["filename"]).with_suffix(suffix)).unlink(missing_ok=True)
+
+    timing = resp.headers["Server-Timing"]
+    for stage in ("outline", "render", "save", "total"):
+        assert f"{stage};dur=" in timing
+
+    root = result["trace"]["root"]
+    attempt = _find(root, "llm_attempt")[0]
+    chat = _find(attempt, "ollama_chat")[0]
+    assert chat["attrs"]["total_duration_ms"] == 50.0
+    assert {"load_duration_ms", "prompt_eval_duration_ms", "eval_duration_ms"} <= chat["attrs"].keys()
+    assert _find(attempt, "json_parse") and _find(attempt, "validate")
+
+    render = _find(root, "render")[0]
+    assert len(_find(render, "build_slide")) == 4
+    assert _find(render, "prs.save") and _find(render, "load_template")
+    assert _find(root, "save")[0]["attrs"]["bytes"] > 0
+
+    # 非 debug 請求不附 span 樹，但仍有 Server-Timing 與 trace_id
+    assert plain.json()["trace"] is None and "Server-Timing" in plain.headers
+    assert traces[0]["trace_id"] == plain.json()["trace_id"]
+    assert traces[1]["trace_id"] == result["trace_id"]
+    assert fetched.status_code == 200 and missing.status_code == 404
+
+
+def main():
+    print("=" * 60)
+    print("單一請求 trace 測試")
+    print("=" * 60)
+    for test in (test_span_tree_basics, test_generate_returns_trace):
+        print(f"  {test.__name__}...", end=" ")
+        test()
+        print("✅")
+    print("\n🎉 所有測試通過！")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
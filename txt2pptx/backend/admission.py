@@ -0,0 +1,202 @@
+# txt2pptx/backend/admission.py
+"""Admission control and backpressure for the Ollama backend.
+
+兩層保護：
+  1. 全域並行上限：同時對 Ollama 發出的呼叫最多 LLM_MAX_CONCURRENCY 個，其餘排隊等待
+  2. 有界等待佇列：佇列已有 LLM_MAX_QUEUE 個請求時，新請求在 API 入口即被拒絕
+     （HTTP 503 + Retry-After），而不是排隊直到 600 秒 timeout 觸發重試、讓情況更糟
+
+API 入口的 check() 通過時即為請求保留佇列位置（Reservation），直到請求在 slot() 開始排隊
+或不需要 LLM 就結束（快取命中、合併到進行中的請求、失敗）為止；同時湧入的請求因此不會都看到
+空佇列而一起進入。批次的每個項目各保留一個位置。
+
+Retry-After 以實際觀察到的服務時間（EWMA）估算：排在前面的請求數 ÷ 並行上限 × 平均服務時間。
+
+一個請求內需要並行的子呼叫（長文 map、逐頁修補）以 fan_out() 借用閒置名額，同樣計入並行上限。
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .models import EventCallback
+from .events import emit_event
+from .metrics import ADMISSION_REJECTED, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# ── Admission 配置 ──
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "8"))
+# 尚無觀察值時使用的服務時間估計（秒）
+LLM_SERVICE_TIME_ESTIMATE = float(os.environ.get("LLM_SERVICE_TIME_ESTIMATE", "60"))
+# 服務時間 EWMA 的平滑係數
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """LLM 佇列已滿，請求被拒絕。"""
+
+    def __init__(self, retry_after: int, queue_depth: int, in_flight: int):
+        super().__init__(f"LLM backend busy: {in_flight} in flight, {queue_depth} queued")
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+        self.in_flight = in_flight
+
+
+class Reservation:
+    """check() 通過後為一個請求保留的佇列位置；release() 可重複呼叫。"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._controller.reserved -= 1
+
+
+_reservation: ContextVar[Optional[Reservation]] = ContextVar("txt2pptx_admission_reservation", default=None)
+
+
+@contextmanager
+def reservation_scope(reservation: Optional[Reservation]):
+    """在此區塊內由 slot() 接手 reservation（開始排隊時釋放）；離開區塊時一定釋放。"""
+    if reservation is None:
+        yield
+        return
+    token = _reservation.set(reservation)
+    try:
+        yield
+    finally:
+        _reservation.reset(token)
+        reservation.release()
+
+
+class AdmissionController:
+    """LLM 呼叫的並行上限、有界佇列與服務時間統計。"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_queue: int = LLM_MAX_QUEUE,
+                 service_time_estimate: float = LLM_SERVICE_TIME_ESTIMATE):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.service_time_s = service_time_estimate
+        self.in_flight = 0
+        self.waiting = 0
+        self.reserved = 0  # 已通過 check()、尚未進入 slot() 的請求
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """排隊中與已保留位置的請求數。"""
+        return self.waiting + self.reserved
+
+    def has_room(self, count: int = 1) -> bool:
+        """再進入 count 個請求後，超出並行上限而必須排隊的數量是否仍在佇列上限內。"""
+        return self.in_flight + self.queue_depth + count - self.max_concurrency <= self.max_queue
+
+    @property
+    def is_full(self) -> bool:
+        return not self.has_room()
+
+    def retry_after(self, count: int = 1) -> int:
+        """估計佇列中出現 count 個空位所需的秒數。"""
+        ahead = self.queue_depth + count
+        return max(1, math.ceil(self.service_time_s * ahead / self.max_concurrency))
+
+    def check(self, count: int = 1) -> list[Reservation]:
+        """API 入口呼叫：為 count 個請求保留佇列位置；放不下時拋出 AdmissionRejected（不保留任何位置）。"""
+        if count <= 0:
+            return []
+        if not self.has_room(count):
+            self.rejected += 1
+            retry_after = self.retry_after(count)
+            logger.warning(
+                f"🚦 Rejecting {count} request(s): {self.in_flight} in flight, {self.waiting} queued, "
+                f"{self.reserved} reserved, retry after {retry_after}s"
+            )
+            ADMISSION_REJECTED.inc()
+            raise AdmissionRejected(retry_after, self.queue_depth, self.in_flight)
+        self.reserved += count
+        return [Reservation(self) for _ in range(count)]
+
+    @asynccontextmanager
+    async def slot(self, on_event: Optional[EventCallback] = None):
+        """取得一個 LLM 呼叫名額（必要時排隊），離開時更新服務時間統計。"""
+        # semaphore 綁定於 event loop；閒置時換了 loop（如測試、重啟 lifespan）就重建
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or (self._loop is not loop and not self.in_flight and not self.waiting):
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+
+        if self._semaphore.locked():
+            emit_event(on_event, "queued", position=self.waiting + 1, in_flight=self.in_flight)
+        self.waiting += 1
+        # 保留的位置轉為實際排隊
+        reservation = _reservation.get()
+        if reservation is not None:
+            reservation.release()
+        try:
+            with span("admission_wait", queue_depth=self.waiting):
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.service_time_s += SERVICE_TIME_ALPHA * (elapsed - self.service_time_s)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def fan_out(self, width: int):
+        """持有名額的請求要並行發出多個 LLM 呼叫（map、逐頁修補）時使用，回傳限制並行數的 semaphore。
+
+        請求本身持有的名額算一個，其餘只借用目前閒置的名額、不排隊等待
+        （持有名額時再排隊可能與其他請求互相等待而 deadlock），離開時歸還。
+        因此整體同時對 Ollama 發出的呼叫仍不超過 LLM_MAX_CONCURRENCY。
+        """
+        borrowed = 0
+        if self._semaphore is not None:
+            while borrowed < width - 1 and not self._semaphore.locked():
+                await self._semaphore.acquire()
+                borrowed += 1
+        self.in_flight += borrowed
+        try:
+            yield asyncio.Semaphore(1 + borrowed)
+        finally:
+            self.in_flight -= borrowed
+            for _ in range(borrowed):
+                self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "reserved": self.reserved,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "service_time_s": round(self.service_time_s, 2),
+        }
+
+
+llm_admission = AdmissionController()
+LLM_IN_FLIGHT.set_function(lambda: llm_admission.in_flight)
+LLM_QUEUE_DEPTH.set_function(lambda: llm_admission.waiting)
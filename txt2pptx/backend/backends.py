@@ -0,0 +1,288 @@
+# txt2pptx/backend/backends.py
+"""Multi-backend Ollama routing with health checks and hedged requests.
+
+OLLAMA_URL 只能指向單一 Ollama；實際上有好幾台 CPU / GPU 主機可以分擔負載。
+OLLAMA_URLS 設定以逗號分隔的多個 backend（未設定時沿用 OLLAMA_URL），所有 Ollama 呼叫經由
+backend_pool 分派：
+
+  - 路由：在健康且擁有該模型的 backend 中，選進行中請求數最少者（least outstanding），平手時輪流
+  - 健康檢查：app 執行期間每 OLLAMA_HEALTH_INTERVAL 秒對每個 backend 呼叫 /api/tags，
+    更新健康狀態與可用的模型清單；呼叫時連線失敗也會立即標記為不健康，直到下次檢查成功
+  - 模型可用性：某 backend 回 404（模型不存在）時記下該模型缺席，並改送另一個有該模型的 backend
+  - Circuit breaker：每個 backend 各有一個（見 circuit_breaker.py），open 的 backend 不會被選中；
+    全部 open 時 call() 立即拋出 CircuitOpenError，健康檢查成功時轉為 half-open 試探
+  - Hedged request（LLM_HEDGE=1）：主要請求超過近期延遲的 LLM_HEDGE_PERCENTILE 百分位仍未完成時，
+    另送一份到第二個 backend，採用先完成者並取消另一份
+
+backend 清單在每次呼叫時由環境變數讀取，測試可直接以多個本機 stub server 驗證。
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Optional, TypeVar
+
+import httpx
+
+from .llm_client import llm_client_pool
+from .retry_policy import ErrorClass, classify_error
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState, LLM_BREAKER_FAILURES
+from .tracing import span, annotate
+from .metrics import BACKEND_REQUESTS, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# ── Backend 配置 ──
+OLLAMA_DEFAULT_URL = "http://localhost:11434"
+OLLAMA_HEALTH_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", "15"))
+OLLAMA_HEALTH_TIMEOUT = float(os.environ.get("OLLAMA_HEALTH_TIMEOUT", "5"))
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "95"))
+
+
+def ollama_urls() -> list[str]:
+    """目前設定的 backend 清單（OLLAMA_URLS，否則 OLLAMA_URL）。"""
+    urls = os.environ.get("OLLAMA_URLS", "")
+    if urls.strip():
+        return [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+    return [os.environ.get("OLLAMA_URL", OLLAMA_DEFAULT_URL).rstrip("/")]
+
+
+def normalize_model(name: str) -> str:
+    """Ollama 的模型名稱未指定 tag 時即為 :latest。"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class Backend:
+    """單一 Ollama backend 的狀態。"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True             # 尚未檢查前視為健康
+        self.models: Optional[set[str]] = None  # None = 尚未取得模型清單
+        self.missing: set[str] = set()  # 呼叫時回 404 的模型，下次健康檢查成功時清除
+        self.requests = 0
+        self.failures = 0
+        self.last_probe: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.breaker = CircuitBreaker(url)
+
+    def has_model(self, model: str) -> bool:
+        model = normalize_model(model)
+        return model not in self.missing and (self.models is None or model in self.models)
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "models": sorted(self.models) if self.models is not None else None,
+            "missing_models": sorted(self.missing),
+            "last_probe": self.last_probe,
+            "last_error": self.last_error,
+            "circuit": self.breaker.snapshot(),
+        }
+
+
+class BackendPool:
+    """選擇 backend、追蹤進行中的請求數並定期健康檢查。"""
+
+    def __init__(self):
+        self._backends: dict[str, Backend] = {}
+        self._turn = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        self.hedges = 0
+
+    def backends(self) -> list[Backend]:
+        return [self._backends.setdefault(url, Backend(url)) for url in ollama_urls()]
+
+    def available(self, model: str) -> bool:
+        """是否有 breaker 未 open 的 backend 可處理該模型；否則呼叫端應直接 fallback。"""
+        return any(backend.breaker.available() and backend.has_model(model) for backend in self.backends())
+
+    def pick(self, model: str, exclude: Iterable[Backend] = ()) -> Optional[Backend]:
+        """Least outstanding：優先選健康且有該模型的 backend；都不符合時仍回傳其中之一讓呼叫端嘗試。
+
+        breaker 為 open 的 backend 不列入候選；沒有候選時回傳 None。
+        """
+        excluded = set(exclude)
+        candidates = [backend for backend in self.backends()
+                      if backend not in excluded and backend.breaker.available()]
+        if not candidates:
+            return None
+        preferred = ([b for b in candidates if b.healthy and b.has_model(model)]
+                     or [b for b in candidates if b.has_model(model)]
+                     or candidates)
+        least = min(backend.outstanding for backend in preferred)
+        tied = [backend for backend in preferred if backend.outstanding == least]
+        self._turn += 1
+        return tied[self._turn % len(tied)]
+
+    async def _call_once(self, backend: Backend, fn: Callable[[str], Awaitable[T]], hedge: bool,
+                         timeout: Optional[float]) -> T:
+        backend.outstanding += 1
+        backend.requests += 1
+        backend.breaker.begin()
+        try:
+            if hedge:
+                # hedge 的副本記在獨立的 span，不覆蓋主要請求的耗時屬性
+                with span("hedge", backend=backend.url):
+                    result = await asyncio.wait_for(fn(backend.url), timeout)
+            else:
+                annotate(backend=backend.url)
+                result = await asyncio.wait_for(fn(backend.url), timeout)
+        except asyncio.CancelledError:
+            # hedge 落敗或請求被取消：不代表 backend 有問題
+            backend.breaker.record(None)
+            raise
+        except Exception as e:
+            backend.failures += 1
+            outcome = classify_error(e)
+            BACKEND_REQUESTS.labels(backend=backend.url, outcome=outcome.value).inc()
+            backend.breaker.record(outcome.value in LLM_BREAKER_FAILURES)
+            if outcome is ErrorClass.CONNECT:
+                backend.healthy = False
+                backend.last_error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            backend.outstanding -= 1
+        backend.healthy = True
+        backend.breaker.record(False)
+        BACKEND_REQUESTS.labels(backend=backend.url, outcome="ok").inc()
+        return result
+
+    async def _run(self, backend: Backend, model: str, fn: Callable[[str], Awaitable[T]],
+                   timeout: Optional[float] = None, exclude: Iterable[Backend] = (), hedge: bool = False) -> T:
+        """在 backend 上呼叫；模型不存在（404）時改送另一個有該模型的 backend。"""
+        tried = set(exclude)
+        while True:
+            tried.add(backend)
+            try:
+                return await self._call_once(backend, fn, hedge, timeout)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+                backend.missing.add(normalize_model(model))
+                other = self.pick(model, exclude=tried)
+                if other is None or not other.has_model(model):
+                    raise
+                logger.warning(f"⚠️ Model {model} not found on {backend.url}, trying {other.url}")
+                backend = other
+
+    async def call(
+        self,
+        model: str,
+        fn: Callable[[str], Awaitable[T]],
+        hedge_after: Optional[float] = None,
+        hedge_fn: Optional[Callable[[str], Awaitable[T]]] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """以 fn(backend_url) 呼叫選定的 backend。
+
+        timeout 套用在每個 backend 的呼叫上，超時計入該 backend 的 circuit breaker。
+        hedge_after 不為 None 時，主要請求超過該秒數仍未完成就以 hedge_fn（預設 fn）
+        另送一份到第二個 backend，回傳先成功者的結果。
+        """
+        primary = self.pick(model)
+        if primary is None:
+            raise CircuitOpenError(f"circuit open for all Ollama backends ({', '.join(ollama_urls())})")
+        if hedge_after is None:
+            return await self._run(primary, model, fn, timeout)
+
+        first = asyncio.ensure_future(self._run(primary, model, fn, timeout))
+        second: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=hedge_after)
+            if done:
+                return first.result()
+            other = self.pick(model, exclude={primary})
+            if other is None:
+                return await first
+
+            self.hedges += 1
+            logger.info(f"🪃 {primary.url} slower than p{LLM_HEDGE_PERCENTILE:g} ({hedge_after:.1f}s), "
+                        f"hedging to {other.url}")
+            annotate(hedged=True)
+            second = asyncio.ensure_future(self._run(other, model, hedge_fn or fn, timeout, exclude={primary}, hedge=True))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGES.labels(winner="hedge" if task is second else "primary").inc()
+                        return task.result()
+            # 兩份都失敗：回報主要請求的錯誤
+            LLM_HEDGES.labels(winner="none").inc()
+            raise first.exception()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    # ── 健康檢查 ──
+
+    async def probe(self, backend: Backend):
+        """以 /api/tags 檢查 backend 是否可用並更新模型清單。"""
+        try:
+            resp = await llm_client_pool.get().get(f"{backend.url}/api/tags", timeout=OLLAMA_HEALTH_TIMEOUT)
+            resp.raise_for_status()
+            models = {normalize_model(model["name"]) for model in resp.json().get("models", [])}
+        except Exception as e:
+            if backend.healthy:
+                logger.warning(f"⚠️ Ollama backend {backend.url} unhealthy: {type(e).__name__}: {e}")
+            backend.healthy = False
+            backend.last_error = f"{type(e).__name__}: {e}"[:200]
+        else:
+            if not backend.healthy:
+                logger.info(f"✅ Ollama backend {backend.url} healthy again")
+            backend.healthy = True
+            backend.breaker.probe_succeeded()
+            backend.models = models
+            backend.missing.clear()
+            backend.last_error = None
+        backend.last_probe = time.time()
+
+    async def probe_all(self):
+        await asyncio.gather(*(self.probe(backend) for backend in self.backends()))
+
+    async def _probe_loop(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(OLLAMA_HEALTH_INTERVAL)
+
+    async def start(self):
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._probe_task = None
+
+    def circuit_state(self) -> CircuitState:
+        """整體狀態：任一 backend closed 即為 closed，全部 open 時為 open。"""
+        states = {backend.breaker.state for backend in self.backends() if backend.breaker.enabled}
+        for state in (CircuitState.CLOSED, CircuitState.HALF_OPEN, CircuitState.OPEN):
+            if state in states:
+                return state
+        return CircuitState.CLOSED
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit": self.circuit_state().value,
+            "backends": [backend.snapshot() for backend in self.backends()],
+            "hedging": LLM_HEDGE,
+            "hedges": self.hedges,
+        }
+
+
+backend_pool = BackendPool()
@@ -0,0 +1,130 @@
+# txt2pptx/backend/circuit_breaker.py
+"""Per-backend circuit breaker (closed / open / half-open).
+
+Ollama 停止或卡住時，每個請求仍會嘗試 MAX_RETRIES 次、每次可能等到 timeout，才 fallback 到 demo。
+每個 Ollama backend 各有一個 breaker，依最近的呼叫結果決定狀態：
+
+  closed      正常送出請求；最近 LLM_BREAKER_WINDOW 次呼叫中至少 LLM_BREAKER_MIN_CALLS 次，
+              且失敗比例達 LLM_BREAKER_FAILURE_RATE 時轉為 open
+  open        不送出請求；所有 backend 都 open 時直接走 demo fallback（毫秒級）。
+              健康檢查（backends.py 的 /api/tags probe）成功、或經過 LLM_BREAKER_COOLDOWN 秒後轉為 half-open
+  half-open   只放行一個試探請求：成功則回到 closed，失敗則再次 open
+
+只有代表 backend 本身有問題的錯誤（LLM_BREAKER_FAILURES，預設 connect / timeout / http_5xx）計為失敗；
+JSON 或 schema 錯誤是模型輸出的問題，不影響 breaker。
+"""
+import os
+import time
+import logging
+from collections import deque
+from enum import Enum
+from typing import Optional
+
+from .metrics import LLM_BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+# ── Circuit breaker 配置 ──
+LLM_BREAKER_ENABLED = os.environ.get("LLM_BREAKER", "1") == "1"
+LLM_BREAKER_WINDOW = int(os.environ.get("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_FAILURE_RATE = float(os.environ.get("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+LLM_BREAKER_FAILURES = {
+    name.strip() for name in os.environ.get("LLM_BREAKER_FAILURES", "connect,timeout,http_5xx").split(",")
+    if name.strip()
+}
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """所有可用的 backend 的 breaker 都是 open。"""
+
+
+class CircuitBreaker:
+    """以最近 window 次呼叫的失敗比例決定是否放行請求。"""
+
+    def __init__(self, name: str, window: int = LLM_BREAKER_WINDOW, min_calls: int = LLM_BREAKER_MIN_CALLS,
+                 failure_rate: float = LLM_BREAKER_FAILURE_RATE, cooldown: float = LLM_BREAKER_COOLDOWN,
+                 enabled: bool = LLM_BREAKER_ENABLED):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True = 失敗
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._trial = False  # half-open 時是否已有試探請求在進行
+        self.opened = 0      # 轉為 open 的次數
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._transition(CircuitState.HALF_OPEN, "cooldown elapsed")
+        return self._state
+
+    def _transition(self, state: CircuitState, why: str):
+        if state is self._state:
+            return
+        icon = {CircuitState.OPEN: "⚡", CircuitState.HALF_OPEN: "🔍", CircuitState.CLOSED: "✅"}[state]
+        logger.warning(f"{icon} Circuit for {self.name}: {self._state.value} → {state.value} ({why})")
+        LLM_BREAKER_TRANSITIONS.labels(backend=self.name, state=state.value).inc()
+        self._state = state
+        self._trial = False
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        elif state is CircuitState.CLOSED:
+            self._outcomes.clear()
+
+    def available(self) -> bool:
+        """是否可送出請求（不改變狀態）。"""
+        if not self.enabled:
+            return True
+        state = self.state
+        return state is CircuitState.CLOSED or (state is CircuitState.HALF_OPEN and not self._trial)
+
+    def begin(self):
+        """送出請求前呼叫；half-open 時佔用唯一的試探名額。"""
+        if self.enabled and self.state is CircuitState.HALF_OPEN:
+            self._trial = True
+
+    def record(self, failed: Optional[bool]):
+        """記錄一次呼叫結果；None 表示結果不明（例如被取消），只釋放試探名額。"""
+        if not self.enabled:
+            return
+        state = self.state
+        if failed is None:
+            self._trial = False
+            return
+        if state is CircuitState.HALF_OPEN:
+            if failed:
+                self._transition(CircuitState.OPEN, "trial request failed")
+            else:
+                self._transition(CircuitState.CLOSED, "trial request succeeded")
+            return
+        self._outcomes.append(failed)
+        if state is CircuitState.CLOSED and len(self._outcomes) >= self.min_calls:
+            rate = sum(self._outcomes) / len(self._outcomes)
+            if rate >= self.failure_rate:
+                self._transition(CircuitState.OPEN, f"failure rate {rate:.0%} over {len(self._outcomes)} calls")
+
+    def probe_succeeded(self):
+        """背景健康檢查成功：open 時不必等 cooldown，直接放行試探請求。"""
+        if self.enabled and self.state is CircuitState.OPEN:
+            self._transition(CircuitState.HALF_OPEN, "health probe succeeded")
+
+    def snapshot(self) -> dict:
+        failures = sum(self._outcomes)
+        return {
+            "state": self.state.value if self.enabled else "disabled",
+            "recent_calls": len(self._outcomes),
+            "recent_failures": failures,
+            "opened": self.opened,
+        }
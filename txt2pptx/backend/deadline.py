@@ -0,0 +1,91 @@
+# txt2pptx/backend/deadline.py
+"""End-to-end deadline budget for one generation.
+
+原本 LLM 每次嘗試各自有 timeout（最長 600 秒）、重試之間各自退避，整個請求可能遠超過呼叫端願意等待的時間。
+呼叫端可以 GenerateRequest.deadline_s 或 X-Deadline header 指定整個請求的時間預算（秒），
+pipeline 以 deadline_scope() 建立 Deadline，並以 contextvar 傳遞給各階段：
+
+  outline   每次 LLM 嘗試的 timeout 不超過剩餘預算扣掉 DEADLINE_RENDER_RESERVE（留給渲染與存檔）；
+            剩餘預算不足 DEADLINE_MIN_ATTEMPT 秒、或退避後將不足時，不再嘗試而直接 fallback；
+            等待共用的 LLM 呼叫（coalescing）與 map 階段也受同一預算限制
+  render    等待渲染結果最多到 deadline，超過時拋出 DeadlineExceeded（API 回傳 504）
+
+各階段結束時以 charge() 記錄用掉的預算，請求結束時寫入 log 與 trace。
+未指定 deadline 時 current_deadline() 為 None，行為與原本相同。
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# ── Deadline 配置 ──
+DEADLINE_RENDER_RESERVE = float(os.environ.get("DEADLINE_RENDER_RESERVE", "5"))
+DEADLINE_MIN_ATTEMPT = float(os.environ.get("DEADLINE_MIN_ATTEMPT", "10"))
+
+
+class DeadlineExceeded(Exception):
+    """請求的時間預算已用完。"""
+
+
+class Deadline:
+    """以 monotonic clock 計算的剩餘預算，並記錄各階段用掉的秒數。"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget
+        self.stages: dict[str, float] = {}
+        self._checkpoint = self.started
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def llm_budget(self) -> float:
+        """LLM 階段可用的秒數（保留渲染與存檔所需的時間）。"""
+        return max(self.remaining() - DEADLINE_RENDER_RESERVE, 0.0)
+
+    def can_attempt(self, delay: float = 0.0) -> bool:
+        """等待 delay 秒後是否還容得下一次 LLM 嘗試。"""
+        return self.llm_budget() - delay >= DEADLINE_MIN_ATTEMPT
+
+    def charge(self, stage: str):
+        """記錄自上一個階段結束以來用掉的預算。"""
+        now = time.monotonic()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._checkpoint
+        self._checkpoint = now
+
+    def summary(self) -> dict:
+        return {
+            "budget_s": self.budget,
+            "remaining_s": round(self.remaining(), 2),
+            "stages_s": {stage: round(seconds, 2) for stage, seconds in self.stages.items()},
+        }
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("txt2pptx_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """目前請求的 Deadline；未指定預算時為 None。"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(budget: Optional[float]):
+    """在此區塊內以 budget 秒建立 Deadline；budget 為 None 時不做任何事。"""
+    if budget is None:
+        yield None
+        return
+    deadline = Deadline(budget)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+        used = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in deadline.stages.items())
+        logger.info(f"⏱️ Deadline budget {budget:.1f}s: {used or 'no stage finished'} "
+                    f"({deadline.remaining():.1f}s left)")
@@ -0,0 +1,180 @@
+# txt2pptx/backend/early_render.py
+"""Early slide rendering while the LLM is still streaming.
+
+串流模式下 llm_service 每驗證完一頁就送出 slide 事件；IncrementalDeck 收到後立即在
+背景 thread 中以對應 generator 的 builder 建立該頁，渲染與 LLM 生成因此重疊進行：
+
+  - 刻意在 server process 內執行、不經過 render pool：逐頁建立的簡報狀態必須跨多個 slide 事件保留，
+    無法拆成送往 worker process 的單次工作；代價是沒有 RENDER_MAX_TASKS_PER_WORKER 的 worker 回收
+  - engine 與 render pool 一致：code-drawn 依 render_pool.CODE_DRAWN_ENGINE（預設 xml，逐頁累積
+    slide XML，不建立 python-pptx 物件），模板簡報使用 pptx_generator_template
+  - 所有 deck 共用一個 EARLY_RENDER_WORKERS（預設同 RENDER_WORKERS）個 thread 的 pool，
+    同時進行的提前渲染數與 render pool 一樣有上限，不會隨同時串流的請求數無限增加
+  - 同一份 deck 的工作串接執行（前一頁完成才排入下一頁），依頁碼順序建立投影片
+    （python-pptx 物件不可跨 thread 並行修改）
+  - 任何一頁建立失敗即標記 broken，之後的頁面不再建立，最終改走 render pool
+  - 頁碼以請求的頁數（num_slides）先行寫入「i / N」；最終頁數不同時於存檔前改寫
+  - 最終大綱確定後，只有已建立的頁面與最終大綱前綴完全一致時才採用（剩餘頁面補建後存檔），
+    否則（重試、中途加入合併請求、驗證失敗、demo fallback）丟棄，改走 render pool 完整渲染
+
+EARLY_RENDER=0 可停用，一律使用 render pool。
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from . import pptx_generator, pptx_generator_template, pptx_generator_xml, render_pool
+from .models import PresentationOutline, SlideData
+from .render_pool import RENDER_WORKERS
+from .tracing import Trace, trace_request, attach, span
+
+logger = logging.getLogger(__name__)
+
+# ── Early render 配置 ──
+EARLY_RENDER = os.environ.get("EARLY_RENDER", "1") == "1"
+EARLY_RENDER_WORKERS = int(os.environ.get("EARLY_RENDER_WORKERS", str(max(RENDER_WORKERS, 1))))
+
+_early_render_pool = ThreadPoolExecutor(max_workers=max(EARLY_RENDER_WORKERS, 1), thread_name_prefix="early-render")
+
+
+def _engine(template: str):
+    """回傳 (new_presentation, add_slide, save_presentation)。
+
+    code-drawn 與 render pool 使用相同的 CODE_DRAWN_ENGINE，無論走哪條路徑產生的簡報都相同。
+    模板簡報須以 pptx_generator_template.save_presentation 存檔，未變動的 part 才能直接沿用模板 zip 的原始資料。
+    """
+    if template == "code_drawn":
+        if render_pool.CODE_DRAWN_ENGINE == "pptx":
+            return pptx_generator.new_presentation, pptx_generator.add_slide, pptx_generator.save_presentation
+        return pptx_generator_xml.new_presentation, pptx_generator_xml.add_slide, pptx_generator_xml.save_presentation
+    return (partial(pptx_generator_template.new_presentation, template),
+            pptx_generator_template.add_slide, pptx_generator_template.save_presentation)
+
+
+def fix_slide_numbers(prs, expected_total: int, actual_total: int):
+    """Builder 以預期頁數寫入「i / N」頁碼；實際頁數不同時改寫為正確的總頁數。
+
+    prs 為 python-pptx Presentation，或 xml engine 累積的 slide XML list。
+    """
+    if expected_total == actual_total:
+        return
+    if isinstance(prs, list):
+        for idx, slide_xml in enumerate(prs, 1):
+            prs[idx - 1] = slide_xml.replace(f"<a:t>{idx} / {expected_total}</a:t>",
+                                             f"<a:t>{idx} / {actual_total}</a:t>")
+        return
+    for idx, slide in enumerate(prs.slides, 1):
+        old, new = f"{idx} / {expected_total}", f"{idx} / {actual_total}"
+        for shape in slide.shapes:
+            if not shape.has_text_frame:
+                continue
+            for paragraph in shape.text_frame.paragraphs:
+                for run in paragraph.runs:
+                    if run.text == old:
+                        run.text = new
+
+
+class IncrementalDeck:
+    """隨 slide 事件逐頁建立的簡報。"""
+
+    def __init__(self, template: str, expected_total: int):
+        self.template = template
+        self.expected_total = expected_total
+        self.slides: list[SlideData] = []
+        self.broken = False
+        self.first_slide_at: Optional[float] = None  # perf_counter，第一頁建立完成的時間
+        self._new_presentation, self._add_slide, self._save_presentation = _engine(template)
+        self._prs = None
+        self._trace = Trace("early_render")
+        self._lock = threading.Lock()
+        self._tail: Optional[Future] = None
+        self._closed = False
+        self._futures: list[Future] = []
+
+    def _submit(self, fn, *args) -> Future:
+        """排入共用 pool；同一份 deck 的工作等前一個完成後才送出，確保依序執行。"""
+        future: Future = Future()
+
+        def run():
+            if self._closed:
+                future.cancel()
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        def schedule(_=None):
+            try:
+                _early_render_pool.submit(run)
+            except RuntimeError as e:  # pool 已關閉（程序結束中）
+                future.set_exception(e)
+
+        with self._lock:
+            previous, self._tail = self._tail, future
+        if previous is None:
+            schedule()
+        else:
+            previous.add_done_callback(schedule)
+        return future
+
+    def add(self, index: int, slide: SlideData):
+        """排入一頁（由 event loop 呼叫，不阻塞）；頁碼不連續時放棄提前渲染。"""
+        if self.broken:
+            return
+        if index != len(self.slides) + 1:
+            self.broken = True
+            return
+        self.slides.append(slide)
+        self._futures.append(self._submit(self._build, index, slide))
+
+    def _build(self, index: int, slide: SlideData):
+        if self.broken:
+            return
+        try:
+            with trace_request(self._trace, record=False):
+                if self._prs is None:
+                    self._prs = self._new_presentation()
+                self._add_slide(self._prs, slide, index, self.expected_total)
+        except Exception:
+            logger.exception(f"⚠️ Early render of slide {index} failed, deck will be rendered in the pool")
+            self.broken = True
+            return
+        if self.first_slide_at is None:
+            self.first_slide_at = time.perf_counter()
+
+    def _finalize(self, outline: PresentationOutline) -> bytes:
+        total = len(outline.slides)
+        with trace_request(self._trace, record=False):
+            for index in range(len(self.slides) + 1, total + 1):
+                self._add_slide(self._prs, outline.slides[index - 1], index, self.expected_total)
+            with span("fix_slide_numbers", expected=self.expected_total, actual=total):
+                fix_slide_numbers(self._prs, self.expected_total, total)
+            return self._save_presentation(self._prs)
+
+    async def finish(self, outline: PresentationOutline) -> Optional[bytes]:
+        """已建立的頁面與最終大綱一致時補完並回傳 PPTX bytes，否則回傳 None。"""
+        if self.broken or not self.slides or outline.slides[:len(self.slides)] != self.slides:
+            return None
+        try:
+            for future in self._futures:
+                await asyncio.wrap_future(future)
+            if self.broken:
+                return None
+            pptx_bytes = await asyncio.wrap_future(self._submit(self._finalize, outline))
+        except Exception as e:
+            logger.warning(f"⚠️ Early render failed, falling back to full render: {type(e).__name__}: {e}")
+            return None
+        attach([child.to_dict() for child in self._trace.root.children], self._trace.started_at)
+        logger.info(f"⚡ Early render used: {len(self.slides)}/{len(outline.slides)} slides built while streaming")
+        return pptx_bytes
+
+    def close(self):
+        """放棄尚未開始的工作（進行中的頁面會建立完再結束）。"""
+        self._closed = True
@@ -0,0 +1,46 @@
+# txt2pptx/backend/events.py
+"""Generation progress events and Server-Sent Events formatting.
+
+事件名稱一覽（data 皆為 dict）：
+  stage        {"stage": "map" | "outline" | "validate" | "render" | "save"}
+  cache_hit    {"filename"}                        成品簡報取自結果快取，略過 LLM 與渲染（見 result_cache.py）
+  coalesced    {"waiters"}                         併入進行中的相同 LLM 請求，共用其大綱與後續事件（見 llm_service.py）
+  queued       {"position", "in_flight"}           等待 LLM 名額（見 admission.py）
+  chunk        {"done", "total", "index"}           長文分段重點擷取進度（見 map_reduce.py）
+  llm_cache_hit {"slides"}                         大綱取自 LLM 快取，略過 Ollama（見 llm_cache.py）
+  llm_attempt  {"attempt", "max_attempts"}
+  tokens       {"tokens", "chars"}                 串流接收中的 token 累計
+  slide        {"index", "layout", "title", "slide"}  每驗證完一頁投影片（串流中即送出，slide 為完整內容）
+  repair       {"indices", "total"}                 只重新請求這些無效的頁面（見 outline_repair.py）
+  retry        {"attempt", "error_class", "error", "delay_s"}   error_class 見 retry_policy.ErrorClass
+  fallback     {"reason"}                          改用 demo mode
+  saved        {"filename", "bytes"}
+  done / failed / cancelled                        Job 結束（僅 job 事件串流）
+"""
+import json
+import logging
+from typing import Optional
+
+from .models import EventCallback
+
+logger = logging.getLogger(__name__)
+
+
+def emit_event(on_event: Optional[EventCallback], event: str, **data):
+    """若有註冊回呼則送出事件；回呼本身的例外記錄後忽略，不影響生成流程。"""
+    if on_event is None:
+        return
+    try:
+        on_event(event, data)
+    except Exception:
+        logger.exception(f"Event callback failed for {event!r} event")
+
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """將事件格式化為 text/event-stream 的一筆訊息。"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,255 @@
+# txt2pptx/backend/jobs.py
+"""In-memory job store for asynchronous presentation generation."""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from .models import (
+    GenerateRequest, GenerateResponse, JobInfo, JobStatus, StageTiming,
+    BatchInfo, BatchItemStatus,
+)
+from .pipeline import run_generation
+from .admission import Reservation
+
+logger = logging.getLogger(__name__)
+
+# ── Job 保存設定 ──
+# 完成後保留 JOB_TTL_SECONDS 秒供查詢；最多保留 JOB_MAX_ENTRIES 筆（先進先出淘汰）
+JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", "3600"))
+JOB_MAX_ENTRIES = int(os.environ.get("JOB_MAX_ENTRIES", "200"))
+
+# ── 批次生成設定 ──
+# 同一批次內同時呼叫 LLM 的上限；其餘項目排隊，渲染與存檔則與後續 LLM 呼叫重疊進行
+BATCH_LLM_CONCURRENCY = int(os.environ.get("BATCH_LLM_CONCURRENCY", "2"))
+
+
+class Job:
+    """單一生成任務的狀態與各階段計時。"""
+
+    def __init__(self, request: GenerateRequest):
+        self.job_id = uuid.uuid4().hex
+        self.request = request
+        self.status = JobStatus.QUEUED
+        self.stages: list[StageTiming] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[GenerateResponse] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.events: list[dict] = []
+        self._subscribers: list[asyncio.Queue] = []
+        self._created_perf = time.perf_counter()
+        self._stage_perf: Optional[float] = None
+
+    @property
+    def stage(self) -> Optional[str]:
+        return self.stages[-1].name if self.stages else None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def on_event(self, event: str, data: dict):
+        """pipeline / llm_service 的事件回呼：記錄事件並推送給所有訂閱者。"""
+        if event == "stage":
+            # 第一個階段開始時才算執行中（批次項目可能仍在等待 LLM 名額）
+            if self.status == JobStatus.QUEUED:
+                self.status = JobStatus.RUNNING
+            self._enter_stage(data["stage"])
+        record = {"id": len(self.events) + 1, "event": event, "data": data, "ts": time.time()}
+        self.events.append(record)
+        for queue in self._subscribers:
+            queue.put_nowait(record)
+
+    def subscribe(self) -> tuple[list[dict], asyncio.Queue]:
+        """回傳 (既有事件, 之後新事件的 queue)；兩者之間不會漏接事件。"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return list(self.events), queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def cancel(self) -> bool:
+        """取消執行中的 Job；已結束的 Job 回傳 False。"""
+        if self.done or self.task is None:
+            return False
+        return self.task.cancel()
+
+    def _enter_stage(self, name: str):
+        now = time.perf_counter()
+        self._close_stage(now)
+        self.stages.append(StageTiming(name=name, started_at=time.time()))
+        self._stage_perf = now
+
+    def _close_stage(self, now: float):
+        if self.stages and self._stage_perf is not None:
+            self.stages[-1].duration_ms = round((now - self._stage_perf) * 1000, 1)
+        self._stage_perf = None
+
+    def _finish(self, status: JobStatus):
+        self._close_stage(time.perf_counter())
+        self.status = status
+        self.finished_at = time.time()
+
+    def to_info(self) -> JobInfo:
+        if self.finished_at is not None:
+            elapsed = (self.finished_at - self.created_at) * 1000
+        else:
+            elapsed = (time.perf_counter() - self._created_perf) * 1000
+        filename = self.result.filename if self.result else None
+        return JobInfo(
+            job_id=self.job_id,
+            status=self.status,
+            stage=self.stage,
+            stages=[s.model_copy() for s in self.stages],
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            elapsed_ms=round(elapsed, 1),
+            error=self.error,
+            download_url=f"/api/download/{filename}" if filename else None,
+            result=self.result,
+        )
+
+
+class Batch:
+    """一組共用 LLM 並行上限的 Job。"""
+
+    def __init__(self, jobs: list[Job]):
+        self.batch_id = uuid.uuid4().hex
+        self.jobs = jobs
+        self.created_at = time.time()
+
+    @property
+    def done(self) -> bool:
+        return all(job.done for job in self.jobs)
+
+    def to_info(self) -> BatchInfo:
+        items = []
+        for index, job in enumerate(self.jobs):
+            info = job.to_info()
+            items.append(BatchItemStatus(
+                index=index,
+                job_id=job.job_id,
+                status=info.status,
+                stage=info.stage,
+                filename=job.result.filename if job.result else None,
+                download_url=info.download_url,
+                error=info.error,
+                elapsed_ms=info.elapsed_ms,
+            ))
+
+        succeeded = sum(1 for item in items if item.status == JobStatus.SUCCEEDED)
+        failed = sum(1 for item in items if item.status in (JobStatus.FAILED, JobStatus.CANCELLED))
+        if self.done:
+            status = JobStatus.SUCCEEDED if failed == 0 else JobStatus.FAILED
+            finished_at = max(job.finished_at for job in self.jobs)
+        else:
+            status = JobStatus.RUNNING if any(j.status != JobStatus.QUEUED for j in self.jobs) else JobStatus.QUEUED
+            finished_at = None
+
+        return BatchInfo(
+            batch_id=self.batch_id,
+            status=status,
+            total=len(items),
+            succeeded=succeeded,
+            failed=failed,
+            created_at=self.created_at,
+            finished_at=finished_at,
+            items=items,
+        )
+
+
+class JobStore:
+    """保存所有 Job，並以背景 asyncio task 執行生成流程。"""
+
+    def __init__(self, ttl_seconds: float = JOB_TTL_SECONDS, max_entries: int = JOB_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._batches: "OrderedDict[str, Batch]" = OrderedDict()
+
+    def submit(self, request: GenerateRequest,
+               outline_limiter: Optional[asyncio.Semaphore] = None,
+               reservation: Optional[Reservation] = None) -> Job:
+        """建立 Job 並立即在背景開始執行，回傳 Job 本身。"""
+        self._prune()
+        job = Job(request)
+        self._jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, outline_limiter, reservation))
+        job.task.add_done_callback(lambda task: self._on_task_done(job, task))
+        if reservation is not None:
+            # task 在開始執行前就被取消時 run_generation 不會釋放保留的位置
+            job.task.add_done_callback(lambda _: reservation.release())
+        logger.info(f"📥 Job {job.job_id} queued ({len(request.text)} chars, template={request.template})")
+        return job
+
+    def submit_batch(self, requests: list[GenerateRequest],
+                     llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+                     reservations: Optional[list[Optional[Reservation]]] = None) -> Batch:
+        """批次建立 Job：所有項目共用一個 LLM 並行上限，渲染則各自進入 render pool。"""
+        limiter = asyncio.Semaphore(max(llm_concurrency, 1))
+        reservations = reservations or [None] * len(requests)
+        batch = Batch([self.submit(request, outline_limiter=limiter, reservation=reservation)
+                       for request, reservation in zip(requests, reservations)])
+        self._batches[batch.batch_id] = batch
+        logger.info(f"📦 Batch {batch.batch_id} queued: {len(requests)} items, llm_concurrency={llm_concurrency}")
+        return batch
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Optional[Batch]:
+        return self._batches.get(batch_id)
+
+    async def _run(self, job: Job, outline_limiter: Optional[asyncio.Semaphore] = None,
+                   reservation: Optional[Reservation] = None):
+        try:
+            job.result = await run_generation(
+                job.request, on_event=job.on_event, outline_limiter=outline_limiter, reservation=reservation
+            )
+            job._finish(JobStatus.SUCCEEDED)
+            logger.info(f"✅ Job {job.job_id} finished in {job.to_info().elapsed_ms:.0f} ms")
+            job.on_event("done", job.to_info().model_dump(mode="json"))
+        except asyncio.CancelledError:
+            self._mark_cancelled(job)
+        except Exception as e:
+            job.error = f"生成失敗: {str(e)}"
+            job._finish(JobStatus.FAILED)
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+            job.on_event("failed", {"error": job.error})
+
+    def _on_task_done(self, job: Job, task: asyncio.Task):
+        # task 在開始執行前就被取消時，_run 內的 except 不會執行
+        if task.cancelled() and not job.done:
+            self._mark_cancelled(job)
+
+    @staticmethod
+    def _mark_cancelled(job: Job):
+        job.error = "任務已取消"
+        job._finish(JobStatus.CANCELLED)
+        logger.info(f"🛑 Job {job.job_id} cancelled at stage {job.stage}")
+        job.on_event("cancelled", {"stage": job.stage})
+
+    def _prune(self):
+        """移除過期的已完成 Job，並限制總數。"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_at > self.ttl_seconds:
+                del self._jobs[job_id]
+        # 超過上限時只淘汰已完成的 Job，執行中的 Job 不受影響
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        while len(self._jobs) >= self.max_entries and finished:
+            del self._jobs[finished.pop(0)]
+
+        for batch_id, batch in list(self._batches.items()):
+            if batch.done and now - batch.to_info().finished_at > self.ttl_seconds:
+                del self._batches[batch_id]
+
+
+job_store = JobStore()
@@ -0,0 +1,152 @@
+# txt2pptx/backend/llm_cache.py
+"""Persistent on-disk cache of validated LLM outlines.
+
+result_cache 以整份請求（含模板）為 key 快取成品簡報；這裡快取的是 LLM 這一層：
+同一份講義換模板、伺服器重啟後重跑、或測試腳本反覆執行時，都不必再等數分鐘的 LLM 呼叫。
+
+  - key：llm_service.prompt_fingerprint()，涵蓋模型名稱、PROMPT_VERSION（SYSTEM_PROMPT 與
+    輸出 schema 的 hash）、生成參數與使用者訊息；修改 prompt 或 schema 後舊項目自動失效
+  - 內容：驗證通過的大綱 JSON（含逐頁修補後的結果）；demo fallback 不寫入
+  - 淘汰：總大小超過 LLM_CACHE_MAX_BYTES 時依最近使用時間（LRU，以檔案 mtime 保存）淘汰；
+    超過 LLM_CACHE_TTL 秒的項目視為未命中並刪除
+  - LLM_CACHE=0 可停用；request.force_regenerate 略過讀取（仍會寫入新結果）
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .models import PresentationOutline
+
+logger = logging.getLogger(__name__)
+
+# ── LLM 快取配置 ──
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") == "1"
+LLM_CACHE_DIR = Path(os.environ.get("LLM_CACHE_DIR", Path(__file__).parent.parent / "cache" / "llm"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 0 = 不過期
+
+
+class LLMResponseCache:
+    """以 prompt 指紋為 key 的大綱快取，大小上限 + LRU 淘汰 + TTL。"""
+
+    def __init__(self, directory: Path, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 ttl: float = LLM_CACHE_TTL, enabled: bool = LLM_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index: Optional["OrderedDict[str, int]"] = None  # key → 位元組數，由舊到新
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """第一次使用時掃描目錄，依 mtime（最近使用時間）排序重建 LRU 順序。"""
+        if self._index is None:
+            entries = []
+            if self.directory.exists():
+                for path in self.directory.glob("*.json"):
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._bytes = sum(self._index.values())
+            self._evict()
+        return self._index
+
+    def _remove(self, key: str):
+        self._bytes -= self._index.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            key, _ = next(iter(self._index.items()))
+            self._remove(key)
+            self.evictions += 1
+
+    def contains(self, key: str) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            return key in self._load_index()
+
+    def get(self, key: str) -> Optional[PresentationOutline]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._load_index():
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_bytes())
+                if self.ttl and time.time() - entry["created_at"] > self.ttl:
+                    logger.info(f"LLM cache entry {key[:12]} expired")
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                outline = PresentationOutline.model_validate(entry["outline"])
+            except Exception as e:
+                logger.warning(f"LLM cache entry {key[:12]} unreadable, dropping: {type(e).__name__}: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            # 更新 LRU 順序；mtime 讓重啟後仍保有使用順序
+            self._index.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+            return outline
+
+    def put(self, key: str, outline: PresentationOutline, model: str, prompt_version: str):
+        if not self.enabled:
+            return
+        data = json.dumps({
+            "created_at": time.time(),
+            "model": model,
+            "prompt_version": prompt_version,
+            "outline": outline.model_dump(mode="json"),
+        }, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            index = self._load_index()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._bytes -= index.pop(key, 0)
+            index[key] = len(data)
+            self._bytes += len(data)
+            self._evict()
+
+    def discard(self, key: str):
+        with self._lock:
+            self._load_index()
+            self._remove(key)
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            entries = len(self._index) if self._index is not None else None
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,94 @@
+# txt2pptx/backend/llm_client.py
+"""App-lifetime pooled HTTP client for Ollama calls.
+
+原本每次 LLM 嘗試都建立並關閉一個 httpx.AsyncClient，連線從未重用，每次重試都要
+重新建立 TCP 連線。改為整個 app 共用一個 client：FastAPI 啟動時建立、關閉時釋放。
+
+  - LLM_POOL_MAX_CONNECTIONS / LLM_POOL_MAX_KEEPALIVE：連線池上限與保留的閒置連線數
+  - LLM_KEEPALIVE_EXPIRY：閒置連線保留秒數
+  - LLM_HTTP2：auto（有安裝 h2 時啟用）/ 1 / 0。httpx 只在 TLS（ALPN）上協商 HTTP/2，
+    直連本機 Ollama（http://）時仍使用 HTTP/1.1 keep-alive
+  - LLM_TIMEOUT / LLM_CONNECT_TIMEOUT：讀取與連線逾時（秒）
+
+httpx 的連線綁定於建立它的 event loop；在 lifespan 之外（CLI、測試中的 asyncio.run）
+呼叫時會在目前的 loop 上自動建立 client，loop 改變時重建。
+"""
+import os
+import asyncio
+import logging
+import importlib.util
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# ── Client pool 配置 ──
+LLM_POOL_MAX_CONNECTIONS = int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", "10"))
+LLM_POOL_MAX_KEEPALIVE = int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.environ.get("LLM_HTTP2", "auto").lower()
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "600"))
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "10"))
+
+
+def http2_enabled() -> bool:
+    if LLM_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return LLM_HTTP2 in ("1", "true", "yes")
+
+
+class LLMClientPool:
+    """持有共用的 httpx.AsyncClient。"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clients_created = 0
+
+    def _build(self) -> httpx.AsyncClient:
+        self.clients_created += 1
+        http2 = http2_enabled()
+        logger.info(
+            f"🔌 LLM HTTP client created: max_connections={LLM_POOL_MAX_CONNECTIONS}, "
+            f"keepalive={LLM_POOL_MAX_KEEPALIVE}/{LLM_KEEPALIVE_EXPIRY}s, http2={http2}"
+        )
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            http2=http2,
+        )
+
+    def get(self) -> httpx.AsyncClient:
+        """回傳目前 event loop 上的共用 client（必要時建立）。"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # 舊 loop 上的 client 無法在此關閉，直接丟棄
+            self._client = self._build()
+            self._loop = loop
+        return self._client
+
+    async def start(self):
+        self.get()
+
+    async def close(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    def snapshot(self) -> dict:
+        return {
+            "clients_created": self.clients_created,
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": http2_enabled(),
+            "max_connections": LLM_POOL_MAX_CONNECTIONS,
+            "max_keepalive": LLM_POOL_MAX_KEEPALIVE,
+        }
+
+
+llm_client_pool = LLMClientPool()
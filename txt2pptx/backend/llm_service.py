@@ -2,22 +2,43 @@
 """LLM service for content expansion and slide outline generation."""
 import json
 import os
+import time
+import hashlib
 import asyncio
 import httpx
 import logging
+from typing import Optional
+from pydantic import ValidationError
 from .models import (
-    PresentationOutline, SlideData, SlideLayout, StatItem, GenerateRequest
+    PresentationOutline, SlideData, SlideLayout, StatItem, GenerateRequest,
+    EventCallback,
+)
+from .events import emit_event
+from .admission import llm_admission
+from .llm_client import llm_client_pool
+from .backends import backend_pool, LLM_HEDGE, LLM_HEDGE_PERCENTILE
+from .outline_stream import SlideStreamParser
+from .map_reduce import needs_chunking, condense_long_text
+from .outline_repair import repair_json_text, fix_slide_locally, validate_and_repair
+from .llm_cache import LLMResponseCache, LLM_CACHE_DIR
+from .retry_policy import MAX_RETRIES, RETRY_DELAY, ErrorClass, classify_error, llm_retry_policy
+from .deadline import current_deadline
+from .tracing import span, annotate
+from .metrics import (
+    LLM_CALL_SECONDS, OUTLINE_VALIDATION_SECONDS, LLM_RESPONSE_CHARS,
+    LLM_ATTEMPT_FAILURES, LLM_RETRIES, LLM_RETRY_SUCCESSES, LLM_ALL_RETRIES_FAILED,
+    DEMO_FALLBACKS, LLM_COALESCED, OUTLINE_REPAIRS, LLM_CACHE_LOOKUPS, LLM_CANCELLED,
 )
 
 logger = logging.getLogger(__name__)
 
 # ── 重試機制配置 ──
-# 可通過環境變數配置，提供靈活性和可測試性
-MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
-RETRY_DELAY = float(os.environ.get("LLM_RETRY_DELAY", "1.0"))
-
+# MAX_RETRIES / RETRY_DELAY 與各錯誤類別的重試規則見 retry_policy.py
 logger.info(f"🔧 Retry configuration: MAX_RETRIES={MAX_RETRIES}, RETRY_DELAY={RETRY_DELAY}s")
 
+# 串流模式下回報 token 進度的最短間隔（秒）
+TOKEN_EVENT_INTERVAL = float(os.environ.get("LLM_TOKEN_EVENT_INTERVAL", "0.5"))
+
 SYSTEM_PROMPT = """你是一位頂級的簡報內容架構師與提示工程師。你的任務是接收使用者簡短的輸入，在完全基於事實、嚴禁自我幻想與編造的前提下，將其內容極大化擴充，並轉換為結構化的 JSON 格式，供自動化簡報系統使用。
 
 1. 核心任務：內容擴充與事實推演
@@ -94,14 +115,39 @@ conclusion: 最後一頁。
 """
 
 
-async def generate_outline_with_llm(
-    request: GenerateRequest,
-) -> PresentationOutline:
-    """Use Ollama native API with Pydantic schema for structured output."""
-    ollama_url = os.environ.get("OLLAMA_URL", "http://localhost:11434")
-    model = os.environ.get("OLLAMA_MODEL", "gpt-oss:20b")
+# Prompt 版本：SYSTEM_PROMPT 或輸出 schema 變更時自動改變，供各種快取作為 key 的一部分
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + json.dumps(PresentationOutline.model_json_schema(), sort_keys=True)).encode("utf-8")
+).hexdigest()[:12]
+
+
+# 生成參數（影響輸出內容，也是請求指紋的一部分）
+LLM_OPTIONS = {
+    "temperature": 0.5,  # 降低隨機性
+}
+
+
+def current_model() -> str:
+    """目前設定的 Ollama 模型名稱。"""
+    return os.environ.get("OLLAMA_MODEL", "gpt-oss:20b")
 
-    user_message = f"""請將以下文字內容擴充為 {request.num_slides} 頁的簡報大綱。
+
+# Ollama 回應中的耗時欄位（奈秒）與 token 數，記入 trace
+OLLAMA_DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+OLLAMA_COUNT_FIELDS = ("prompt_eval_count", "eval_count")
+
+
+def ollama_timings(data: dict) -> dict:
+    """從 Ollama 回應（或串流最後一個 chunk）取出耗時（ms）與 token 數。"""
+    timings = {f"{field}_ms": round(data[field] / 1e6, 1)
+               for field in OLLAMA_DURATION_FIELDS if field in data}
+    timings.update({field: data[field] for field in OLLAMA_COUNT_FIELDS if field in data})
+    return timings
+
+
+def build_user_message(request: GenerateRequest) -> str:
+    """組出送給 LLM 的使用者訊息。"""
+    return f"""請將以下文字內容擴充為 {request.num_slides} 頁的簡報大綱。
 語言：{request.language}
 風格：{request.style}
 內容要求：深度擴充、盡可能豐富內容，請根據內容選擇最合適的佈局類型。
@@ -109,41 +155,139 @@ async def generate_outline_with_llm(
 {request.text}
 ---"""
 
+
+def prompt_fingerprint(request: GenerateRequest) -> str:
+    """相同指紋的請求送給 LLM 的內容完全一致（模型、prompt 版本、參數、使用者訊息）。"""
+    material = json.dumps({
+        "model": current_model(),
+        "prompt_version": PROMPT_VERSION,
+        "options": LLM_OPTIONS,
+        "user_message": build_user_message(request),
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# 驗證通過的大綱依 prompt 指紋持久快取（見 llm_cache.py）
+llm_cache = LLMResponseCache(LLM_CACHE_DIR)
+
+
+async def generate_outline_with_llm(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback] = None,
+    timeout: Optional[float] = None,
+) -> PresentationOutline:
+    """Use Ollama native API with Pydantic schema for structured output.
+
+    timeout 為整個 Ollama 呼叫（含串流）的上限秒數，預設由 llm_retry_policy 依觀察到的延遲推算；
+    超過時拋出 TimeoutError。
+    """
+    if timeout is None:
+        timeout = llm_retry_policy.timeout_for(request.num_slides)
+    model = current_model()
+
+    user_message = build_user_message(request)
+
     # 使用原生 Ollama API + Pydantic schema 獲得更強的類型約束
-    async with httpx.AsyncClient(timeout=600.0) as client:
-        resp = await client.post(
-            f"{ollama_url}/api/chat",  # 使用原生 API
-            headers={"content-type": "application/json"},
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_message},
-                ],
-                "stream": False,
-                "format": PresentationOutline.model_json_schema(),  # 傳入完整 Pydantic schema
-                "options": {
-                    "temperature": 0.5,  # 降低隨機性
-                }
-            },
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    # 有事件訂閱者時改用串流模式，以便即時回報已接收的 token 數
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_message},
+        ],
+        "stream": on_event is not None,
+        "format": PresentationOutline.model_json_schema(),  # 傳入完整 Pydantic schema
+        "options": LLM_OPTIONS,
+    }
+    # 多個 backend 時由 backend_pool 分派（見 backends.py）；hedge 的副本不串流，
+    # 避免兩份串流的 slide 事件交錯
+    hedge_after = (llm_retry_policy.latency_estimate(request.num_slides, LLM_HEDGE_PERCENTILE)
+                   if LLM_HEDGE else None)
+    call_start = time.perf_counter()
+    try:
+        with span("ollama_chat", model=model, stream=payload["stream"], timeout_s=round(timeout, 1)):
+            text, streamed = await backend_pool.call(
+                model,
+                lambda url: _call_ollama(f"{url}/api/chat", payload, on_event),
+                hedge_after=hedge_after,
+                hedge_fn=lambda url: _call_ollama(f"{url}/api/chat", {**payload, "stream": False}, None),
+                timeout=timeout,
+            )
+    except Exception:
+        LLM_CALL_SECONDS.labels(outcome="error").observe(time.perf_counter() - call_start)
+        raise
+    call_seconds = time.perf_counter() - call_start
+    LLM_CALL_SECONDS.labels(outcome="ok").observe(call_seconds)
+    LLM_RESPONSE_CHARS.observe(len(text))
+    llm_retry_policy.record_latency(call_seconds, request.num_slides)
+
+    emit_event(on_event, "stage", stage="validate")
+    validate_start = time.perf_counter()
+    try:
+        # 無效的頁面只修補該頁，不丟棄整份大綱（見 outline_repair.py）
+        outline = await validate_and_repair(parse_outline_json(text), request, model, on_event)
+    except Exception:
+        OUTLINE_VALIDATION_SECONDS.labels(outcome="error").observe(time.perf_counter() - validate_start)
+        raise
+    OUTLINE_VALIDATION_SECONDS.labels(outcome="ok").observe(time.perf_counter() - validate_start)
+
+    # 串流時已逐頁送出的 slide 事件不重複送出
+    for i, slide in enumerate(outline.slides, 1):
+        if i not in streamed:
+            _emit_slide(on_event, i, slide)
+    return outline
+
+
+async def _call_ollama(
+    url: str,
+    payload: dict,
+    on_event: Optional[EventCallback],
+) -> tuple[str, set[int]]:
+    """送出 /api/chat 請求，回傳 (完整內容, 已送出 slide 事件的頁碼)。"""
+    # 共用 app 層級的連線池（見 llm_client.py），重試時可重用既有連線
+    client = llm_client_pool.get()
+    if on_event is not None:
+        return await _stream_chat(client, url, payload, on_event)
+
+    resp = await client.post(
+        url,  # 使用原生 API
+        headers={"content-type": "application/json"},
+        json=payload,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    annotate(**ollama_timings(data))
+    return data["message"]["content"], set()  # 原生 API 的響應結構不同
+
+
+def _emit_slide(on_event: Optional[EventCallback], index: int, slide: SlideData):
+    emit_event(on_event, "slide", index=index, layout=slide.layout.value, title=slide.title,
+               slide=slide.model_dump(mode="json"))
+
 
-    text = data["message"]["content"].strip()  # 原生 API 的響應結構不同
+def parse_outline_response(text: str) -> PresentationOutline:
+    """解析 LLM 回應：去除 markdown fence、JSON 解析、Pydantic 驗證（不做逐頁修補）。"""
+    outline_data = parse_outline_json(text)
+    with span("validate"):
+        return PresentationOutline(**outline_data)
+
+
+def parse_outline_json(text: str) -> dict:
+    """解析 LLM 回應為 dict：先做不需 LLM 的文字修正（markdown fence、多餘逗號），再 JSON 解析。"""
+    text = text.strip()
 
     # Debug: Log raw LLM response
     logger.info(f"🔍 Raw LLM response (first 500 chars): {text[:500]}")
 
-    # Strip markdown fences if present
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
+    repaired = repair_json_text(text)
+    if repaired != text:
+        logger.info("🩹 Raw LLM response repaired locally (markdown fence / trailing commas)")
+        OUTLINE_REPAIRS.labels(kind="json_local").inc()
+        text = repaired
 
     try:
-        outline_data = json.loads(text)
+        with span("json_parse", chars=len(text)):
+            outline_data = json.loads(text)
     except json.JSONDecodeError as e:
         logger.error(f"❌ JSON parse error: {e}")
         logger.error(f"Raw text causing error:\n{text}")
@@ -157,8 +301,65 @@ async def generate_outline_with_llm(
         logger.error(f"❌ Expected dict, got {type(outline_data)}")
         logger.error(f"Problematic data:\n{json.dumps(outline_data, indent=2, ensure_ascii=False)[:1000]}")
         raise ValueError(f"LLM returned {type(outline_data).__name__} instead of dict")
+    return outline_data
+
 
-    return PresentationOutline(**outline_data)
+async def _stream_chat(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict,
+    on_event: EventCallback,
+) -> tuple[str, set[int]]:
+    """以串流模式呼叫 Ollama /api/chat（NDJSON），邊接收邊回報進度。
+
+    每當 slides 陣列中有一頁完整出現就立即以 SlideData 驗證並送出 slide 事件，
+    讓呼叫端可以在模型仍在生成後續頁面時先開始渲染（見 early_render.py）。
+    回傳 (完整內容, 已送出 slide 事件的頁碼)。
+    """
+    parts: list[str] = []
+    parser = SlideStreamParser()
+    streamed: set[int] = set()
+    tokens = 0
+    chars = 0
+    last_emit = time.monotonic()
+
+    async with client.stream(
+        "POST", url, headers={"content-type": "application/json"}, json=payload
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+
+            content = chunk.get("message", {}).get("content", "")
+            if content:
+                parts.append(content)
+                tokens += 1
+                chars += len(content)
+                for index, slide_data in parser.feed(content):
+                    try:
+                        slide = SlideData.model_validate(fix_slide_locally(slide_data))
+                    except ValidationError as e:
+                        # 交給整份大綱的驗證處理（會觸發重試）
+                        logger.warning(f"⚠️ Streamed slide #{index} failed validation: {e.error_count()} errors")
+                        continue
+                    streamed.add(index)
+                    _emit_slide(on_event, index, slide)
+
+            now = time.monotonic()
+            if chunk.get("done"):
+                annotate(**ollama_timings(chunk))
+                # 最後一個 chunk 帶有 Ollama 統計的實際 token 數
+                tokens = chunk.get("eval_count", tokens)
+                emit_event(on_event, "tokens", tokens=tokens, chars=chars)
+            elif now - last_emit >= TOKEN_EVENT_INTERVAL:
+                emit_event(on_event, "tokens", tokens=tokens, chars=chars)
+                last_emit = now
+
+    return "".join(parts), streamed
 
 
 def generate_outline_demo(request: GenerateRequest) -> PresentationOutline:
@@ -183,7 +384,8 @@ def generate_outline_demo(request: GenerateRequest) -> PresentationOutline:
         layout=SlideLayout.TITLE,
         title=main_title,
         subtitle="自動生成簡報",
-        speaker_notes="開場白：歡迎大家參加今天的簡報。"
+        speaker_notes="開場白：歡迎大家參加今天的簡報。本簡報由系統依據您提供的文字自動整理而成，"
+                      "內容涵蓋主題概述、重點分析與結論，歡迎在過程中隨時提出問題與討論。"
     ))
 
     # Generate content slides
@@ -266,7 +468,8 @@ def generate_outline_demo(request: GenerateRequest) -> PresentationOutline:
             "下一步行動計畫",
             "歡迎提問與討論"
         ],
-        speaker_notes="感謝大家的聆聽，現在開放提問。"
+        speaker_notes="感謝大家的聆聽，現在開放提問。回顧今天的核心要點與未來發展方向，"
+                      "建議大家思考如何將這些概念應用於自己的工作情境，並提出下一步的行動計畫。"
     ))
 
     return PresentationOutline(
@@ -296,45 +499,227 @@ def _split_into_chunks(text: str, max_chars: int = 25) -> list[str]:
     return [text[i:i+max_chars] for i in range(0, len(text), max_chars)][:6]
 
 
-async def generate_outline(request: GenerateRequest) -> PresentationOutline:
+# ── 相同請求合併（single-flight）──
+# 多個同時進行、指紋相同的請求共用同一個 LLM 呼叫（含重試與 fallback），
+# 避免同一份講義被整班學生同時送出時，對單一 Ollama 造成數倍負載。
+
+class _Flight:
+    """一個進行中的共用 LLM 呼叫。"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.listeners: list[EventCallback] = []
+
+    def broadcast(self, event: str, data: dict):
+        """把共用呼叫的進度事件轉發給所有等待者。"""
+        for listener in list(self.listeners):
+            emit_event(listener, event, **data)
+
+
+class CoalescingStats:
+    """實際 LLM 呼叫次數與因合併而省下的次數。"""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.coalesced = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(_inflight),
+        }
+
+
+_inflight: dict[str, _Flight] = {}
+coalescing_stats = CoalescingStats()
+
+
+async def generate_outline(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback] = None,
+) -> PresentationOutline:
     """
-    Main entry: try Ollama LLM with retry mechanism, fallback to demo mode.
+    Main entry: LLM cache, then coalesce identical in-flight requests, then retry / fallback.
 
-    重試機制設計：
+    指紋相同的大綱已在 llm_cache 中時直接回傳（force_regenerate 時略過）。
+    指紋相同的請求若已有進行中的呼叫，直接等待同一個結果（calls saved 計入
+    coalescing_stats）。所有等待者都取消時才取消共用呼叫。共用呼叫一律帶事件回呼
+    （因此以串流模式呼叫 Ollama），讓後加入的等待者也能收到後續進度事件。
+    """
+    key = prompt_fingerprint(request)
+    if not request.force_regenerate:
+        with span("llm_cache_lookup") as lookup_span:
+            cached = await asyncio.to_thread(llm_cache.get, key)
+            if lookup_span is not None:
+                lookup_span.attrs["hit"] = cached is not None
+        LLM_CACHE_LOOKUPS.labels(result="hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            logger.info(f"💾 LLM cache hit ({len(cached.slides)} slides), skipping Ollama")
+            emit_event(on_event, "llm_cache_hit", slides=len(cached.slides))
+            for i, slide in enumerate(cached.slides, 1):
+                _emit_slide(on_event, i, slide)
+            return cached
+
+    flight = _inflight.get(key)
+    leader = flight is None
+    if flight is None:
+        flight = _Flight()
+        _inflight[key] = flight
+        flight.task = asyncio.create_task(_generate_outline_admitted(request, flight.broadcast))
+        flight.task.add_done_callback(
+            lambda _: _inflight.pop(key) if _inflight.get(key) is flight else None
+        )
+        coalescing_stats.llm_calls += 1
+    else:
+        coalescing_stats.coalesced += 1
+        logger.info(f"🔗 Coalescing with in-flight LLM request ({flight.waiters} already waiting)")
+        LLM_COALESCED.inc()
+        annotate(coalesced=True)
+        emit_event(on_event, "coalesced", waiters=flight.waiters + 1)
+
+    if on_event is not None:
+        flight.listeners.append(on_event)
+    flight.waiters += 1
+    deadline = current_deadline()
+    try:
+        # 共用呼叫依發起者的 deadline 執行（重試迴圈自行控制預算）；後加入的等待者只等到自己的預算用完
+        budget = deadline.llm_budget() if deadline and not leader else None
+        outline = await asyncio.wait_for(asyncio.shield(flight.task), budget)
+    except asyncio.TimeoutError:
+        if budget is None or deadline.llm_budget() > 0:
+            raise
+        return _demo_fallback(request, on_event, "deadline budget exhausted")
+    finally:
+        flight.waiters -= 1
+        if on_event in flight.listeners:
+            flight.listeners.remove(on_event)
+        if flight.waiters == 0 and not flight.task.done():
+            logger.info("🛑 All waiters cancelled, cancelling shared LLM request")
+            flight.task.cancel()
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+    # 每個等待者拿到獨立的副本
+    return outline.model_copy(deep=True)
+
+
+async def _generate_outline_admitted(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback] = None,
+) -> PresentationOutline:
+    """在全域 LLM 並行上限內執行（超過上限時排隊），見 admission.py。
+
+    所有等待者都離開（客戶端斷線或 Job 取消）時此 task 被取消：CancelledError 會中斷
+    進行中的 httpx 請求、重試迴圈與退避等待，並釋放 LLM 名額。
+    """
+    try:
+        async with llm_admission.slot(on_event):
+            return await _generate_outline_with_retries(request, on_event)
+    except asyncio.CancelledError:
+        LLM_CANCELLED.inc()
+        logger.info("🛑 LLM work cancelled")
+        raise
+
+
+async def _generate_outline_with_retries(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback] = None,
+) -> PresentationOutline:
+    """
+    Try Ollama LLM with retry mechanism, fallback to demo mode.
+
+    重試機制設計（規則見 retry_policy.py）：
     - 最多嘗試 MAX_RETRIES 次（預設 3 次）
-    - 每次失敗後等待 RETRY_DELAY 秒（預設 1.0 秒）
+    - 失敗時先將錯誤分類；不可重試的類別（預設 HTTP 4xx，如模型不存在）立即放棄
+    - 可重試的類別依類別做指數退避並加上 jitter
+    - 每次嘗試的 timeout 由近期延遲推算，發生 timeout 後下一次嘗試放寬
     - 成功立即返回，無需等待
-    - 所有嘗試失敗後才使用 demo mode
+    - 放棄或所有嘗試失敗後才使用 demo mode
+    - 所有 backend 的 circuit breaker 都 open 時不嘗試，立即使用 demo mode（見 circuit_breaker.py）
+    - 請求有 deadline 時，timeout 與退避都受剩餘預算限制；容不下下一次嘗試就立即使用 demo mode（見 deadline.py）
+    - on_event 用於回報進度事件（階段、嘗試、重試、fallback），見 events.py
+    - 長文先經 map 階段濃縮為各段重點再生成大綱（見 map_reduce.py）；demo mode 仍使用原文
 
     預期效果：
     - 成功率從 66% 提升至 96%
     - Demo fallback 率從 34% 降至 3.9%
     - 平均響應時間增加約 2.2 秒
     """
+    deadline = current_deadline()
+    llm_request = request
+    if needs_chunking(request) and backend_pool.available(current_model()):
+        try:
+            llm_request = await asyncio.wait_for(condense_long_text(request, current_model(), on_event),
+                                                 deadline.llm_budget() if deadline else None)
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ Map stage ran out of deadline budget")
+
+    reason = f"{MAX_RETRIES} attempts failed"
+    timeouts = 0
     for attempt in range(1, MAX_RETRIES + 1):
+        if not backend_pool.available(current_model()):
+            # Ollama 已知無法使用：不必等 timeout 與退避
+            logger.warning("⚡ Circuit open for all Ollama backends, skipping LLM")
+            reason = "circuit open"
+            break
+        if deadline and not deadline.can_attempt():
+            logger.warning(f"⏱️ Only {deadline.remaining():.1f}s of deadline budget left, skipping LLM")
+            reason = "deadline budget exhausted"
+            break
+        timeout = llm_retry_policy.timeout_for(llm_request.num_slides, timeouts)
+        if deadline:
+            timeout = min(timeout, deadline.llm_budget())
         try:
-            logger.info(f"🚀 Attempting Ollama LLM (嘗試 {attempt}/{MAX_RETRIES})")
-            result = await generate_outline_with_llm(request)
+            logger.info(f"🚀 Attempting Ollama LLM (嘗試 {attempt}/{MAX_RETRIES}, timeout {timeout:.0f}s)")
+            if attempt > 1 or llm_request is not request:
+                emit_event(on_event, "stage", stage="outline")
+            emit_event(on_event, "llm_attempt", attempt=attempt, max_attempts=MAX_RETRIES)
+            with span("llm_attempt", attempt=attempt, timeout_s=round(timeout, 1)):
+                result = await generate_outline_with_llm(llm_request, on_event=on_event, timeout=timeout)
             logger.info(f"✅ LLM generation successful on attempt {attempt}")
+            await asyncio.to_thread(
+                llm_cache.put, prompt_fingerprint(request), result, current_model(), PROMPT_VERSION
+            )
 
             # 記錄性能指標
             if attempt > 1:
-                logger.info(f"📊 METRIC: retry_success_on_attempt={attempt}")
+                LLM_RETRY_SUCCESSES.inc()
 
             return result  # ✅ 成功立即返回
 
         except Exception as e:
             # 記錄失敗原因（前 100 字符）
-            error_msg = str(e)[:100]
+            error_msg = str(e)[:100] or type(e).__name__
+            error_class = classify_error(e)
+            LLM_ATTEMPT_FAILURES.labels(error_type=type(e).__name__, error_class=error_class.value).inc()
             logger.warning(
-                f"⚠️ Attempt {attempt}/{MAX_RETRIES} failed: "
+                f"⚠️ Attempt {attempt}/{MAX_RETRIES} failed [{error_class.value}]: "
                 f"{type(e).__name__}: {error_msg}"
             )
+            if error_class is ErrorClass.TIMEOUT:
+                timeouts += 1
+
+            delay = llm_retry_policy.backoff(error_class, attempt)
+            if delay is None:
+                # 不可重試（例如模型不存在），重試只會得到相同的錯誤
+                logger.error(f"❌ {error_class.value} error is not retryable, giving up")
+                reason = f"{error_class.value} error is not retryable"
+                break
+
+            if attempt < MAX_RETRIES and deadline and not deadline.can_attempt(delay):
+                logger.error(f"❌ Not enough deadline budget for another attempt "
+                             f"({deadline.remaining():.1f}s left), giving up")
+                reason = "deadline budget exhausted"
+                break
 
             # 如果不是最後一次嘗試，等待後重試
             if attempt < MAX_RETRIES:
-                logger.info(f"🔄 Retrying in {RETRY_DELAY}s... (next attempt: {attempt + 1}/{MAX_RETRIES})")
-                await asyncio.sleep(RETRY_DELAY)
+                logger.info(f"🔄 Retrying in {delay:.2f}s... (next attempt: {attempt + 1}/{MAX_RETRIES})")
+                emit_event(on_event, "retry", attempt=attempt, error_class=error_class.value,
+                           error=f"{type(e).__name__}: {error_msg}", delay_s=round(delay, 2))
+                LLM_RETRIES.inc()
+                await asyncio.sleep(delay)
             else:
                 # 最後一次失敗，記錄完整錯誤堆疊
                 logger.error(f"❌ All {MAX_RETRIES} attempts failed")
@@ -342,12 +727,16 @@ async def generate_outline(request: GenerateRequest) -> PresentationOutline:
                 logger.error(f"Final error stack trace:\n{traceback.format_exc()}")
 
                 # 記錄性能指標
-                logger.info(f"📊 METRIC: all_retries_failed=true")
+                LLM_ALL_RETRIES_FAILED.inc()
 
-    # 所有重試都失敗，使用 demo mode
-    logger.warning(
-        f"⚠️ Falling back to demo mode after {MAX_RETRIES} failed attempts"
-    )
-    logger.info(f"📊 METRIC: demo_fallback=true")
+    # 放棄或所有重試都失敗，使用 demo mode
+    return _demo_fallback(request, on_event, reason)
+
+
+def _demo_fallback(request: GenerateRequest, on_event: Optional[EventCallback], reason: str) -> PresentationOutline:
+    logger.warning(f"⚠️ Falling back to demo mode: {reason}")
+    DEMO_FALLBACKS.inc()
+    annotate(fallback=True)
+    emit_event(on_event, "fallback", reason=reason)
 
     return generate_outline_demo(request)
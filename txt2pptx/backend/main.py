@@ -1,22 +1,54 @@
 """TXT2PPTX FastAPI Application."""
 import os
-import uuid
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-from .models import GenerateRequest, GenerateResponse
-from .llm_service import generate_outline
-from .pptx_generator import generate_pptx as generate_pptx_code_drawn
-from .pptx_generator_template import generate_pptx as generate_pptx_template
+from .models import (
+    GenerateRequest, GenerateResponse, JobCreateResponse, JobInfo,
+    BatchRequest, BatchCreateResponse, BatchInfo,
+)
+from .pipeline import run_generation, check_admission, result_cache, GENERATED_DIR
+from .jobs import job_store
+from .events import format_sse
+from .render_pool import render_executor
+from .llm_service import coalescing_stats, llm_cache
+from .admission import llm_admission, AdmissionRejected
+from .llm_client import llm_client_pool
+from .backends import backend_pool
+from .retry_policy import llm_retry_policy
+from .map_reduce import chunk_cache
+from .metrics import CANCELLATIONS, render_latest
+from .tracing import Trace, recent_traces, find_trace
+from .deadline import DeadlineExceeded
+from .template_catalog import template_catalog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="TXT2PPTX", version="0.1.0")
+# SSE 連線閒置時送出 keep-alive 註解的間隔（秒），避免 proxy 中斷連線
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """App startup / shutdown hooks."""
+    await asyncio.to_thread(template_catalog.refresh)
+    await llm_client_pool.start()
+    await backend_pool.start()
+    yield
+    await backend_pool.close()
+    await llm_client_pool.close()
+    render_executor.shutdown()
+
+
+app = FastAPI(title="TXT2PPTX", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,53 +59,186 @@ app.add_middleware(
 
 # Directories
 BASE_DIR = Path(__file__).parent.parent
-GENERATED_DIR = BASE_DIR / "generated"
 FRONTEND_DIR = BASE_DIR / "frontend"
-GENERATED_DIR.mkdir(exist_ok=True)
 
 # Serve frontend static files
 app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR)), name="static")
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={
+            "detail": f"系統忙碌中，請於 {exc.retry_after} 秒後再試",
+            "retry_after": exc.retry_after,
+            "queue_depth": exc.queue_depth,
+            "in_flight": exc.in_flight,
+        },
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     index_file = FRONTEND_DIR / "index.html"
     return index_file.read_text(encoding="utf-8")
 
 
+async def _cancel_on_disconnect(http_request: Request, coro):
+    """執行 coro；客戶端在完成前斷線時取消它並拋出 CancelledError。
+
+    取消會一路傳到 generate_outline：所有等待者都離開時共用的 LLM 呼叫（含進行中的
+    httpx 請求與重試迴圈）一併取消，不再渲染、存檔沒人下載的檔案。
+    """
+    task = asyncio.ensure_future(coro)
+
+    async def _wait_disconnect():
+        # request body 已讀完，之後 receive() 只會在連線中斷（或回應送出後）回傳 http.disconnect
+        while (await http_request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(_wait_disconnect())
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task not in done:
+        logger.info("🛑 Client disconnected, generation cancelled")
+        CANCELLATIONS.labels(source="client_disconnect").inc()
+        await asyncio.wait({task})
+        raise asyncio.CancelledError()
+    return task.result()
+
+
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate_presentation(request: GenerateRequest):
-    """Generate a PPTX presentation from text input."""
+async def generate_presentation(request: GenerateRequest, response: Response, http_request: Request,
+                                x_deadline: Optional[float] = Header(default=None, gt=0)):
+    """Generate a PPTX presentation from text input.
+
+    X-Deadline header（秒）與 request.deadline_s 相同，body 未指定時使用。
+    """
+    if request.deadline_s is None and x_deadline is not None:
+        request = request.model_copy(update={"deadline_s": x_deadline})
+    reservation, = await check_admission(request)
+    trace = Trace()
     try:
-        # Step 1: Generate outline
-        logger.info(f"Generating outline for {len(request.text)} chars, {request.num_slides} slides")
-        outline = await generate_outline(request)
-        logger.info(f"Outline generated: {outline.title}, {len(outline.slides)} slides")
-
-        # Step 2: Generate PPTX (根據模板選擇)
-        if request.template == "code_drawn":
-            logger.info("Using code-drawn generator")
-            pptx_bytes = generate_pptx_code_drawn(outline)
-        else:
-            logger.info(f"Using template generator with template: {request.template}")
-            pptx_bytes = generate_pptx_template(outline, template_id=request.template)
-
-        # Step 3: Save file
-        filename = f"{uuid.uuid4().hex[:8]}.pptx"
-        filepath = GENERATED_DIR / filename
-        filepath.write_bytes(pptx_bytes)
-        logger.info(f"PPTX saved: {filepath} ({len(pptx_bytes)} bytes)")
-
-        return GenerateResponse(
-            success=True,
-            filename=filename,
-            message="簡報生成成功",
-            outline=outline
+        result = await _cancel_on_disconnect(
+            http_request, run_generation(request, trace=trace, reservation=reservation)
+        )
+    except asyncio.CancelledError:
+        # 客戶端已斷線，回應不會送達
+        return Response(status_code=499)
+    except DeadlineExceeded as e:
+        logger.warning(f"Generation exceeded its deadline: {e}")
+        raise HTTPException(
+            status_code=504,
+            detail=f"生成逾時: {str(e)}",
+            headers={"Server-Timing": trace.server_timing()},
         )
-
     except Exception as e:
         logger.error(f"Generation failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"生成失敗: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"生成失敗: {str(e)}",
+            headers={"Server-Timing": trace.server_timing()},
+        )
+    finally:
+        # 生成在開始執行前就被取消時 run_generation 不會釋放保留的位置
+        if reservation is not None:
+            reservation.release()
+    response.headers["Server-Timing"] = trace.server_timing()
+    return result
+
+
+@app.post("/api/jobs", response_model=JobCreateResponse, status_code=202)
+async def create_job(request: GenerateRequest):
+    """Submit a generation job; returns immediately with a job id to poll."""
+    reservation, = await check_admission(request)
+    job = job_store.submit(request, reservation=reservation)
+    return JobCreateResponse(
+        job_id=job.job_id,
+        status=job.status,
+        status_url=f"/api/jobs/{job.job_id}",
+    )
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """Report job status, current stage and per-stage timings."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任務不存在")
+    return job.to_info()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events stream of a job's progress (replays past events first)."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任務不存在")
+
+    async def event_stream():
+        past_events, queue = job.subscribe()
+        try:
+            for record in past_events:
+                yield format_sse(record["event"], record["data"], record["id"])
+            if job.done:
+                return
+            while True:
+                try:
+                    record = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(record["event"], record["data"], record["id"])
+                if record["event"] in ("done", "failed", "cancelled"):
+                    return
+        finally:
+            job.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """Cancel a running job (stops the in-flight LLM call)."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任務不存在")
+    if job.cancel():
+        CANCELLATIONS.labels(source="job_cancel").inc()
+        # 等 job task 處理 CancelledError 並更新狀態
+        await asyncio.wait({job.task}, timeout=1.0)
+    return job.to_info()
+
+
+@app.post("/api/batch", response_model=BatchCreateResponse, status_code=202)
+async def create_batch(batch: BatchRequest):
+    """Submit many generation requests at once; LLM calls share a concurrency cap."""
+    reservations = await check_admission(*batch.items)
+    created = job_store.submit_batch(batch.items, reservations=reservations)
+    return BatchCreateResponse(
+        batch_id=created.batch_id,
+        total=len(created.jobs),
+        status_url=f"/api/batch/{created.batch_id}",
+    )
+
+
+@app.get("/api/batch/{batch_id}", response_model=BatchInfo)
+async def get_batch(batch_id: str):
+    """Batch manifest: per-item status, filenames and download links."""
+    batch = job_store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="批次不存在")
+    return batch.to_info()
 
 
 @app.get("/api/download/{filename}")
@@ -90,58 +255,50 @@ async def download_file(filename: str):
 
 
 @app.get("/api/templates")
-async def list_templates():
-    """列出所有可用的簡報模板。"""
-    # 模板中英文名稱對照表
-    TEMPLATE_NAMES = {
-        "College_Elegance": "學院典雅",
-        "Data_Centric": "數據導向",
-        "High_Contrast": "高調對比",
-        "Minimalist_Corporate": "極簡商務",
-        "Modernist": "摩登現代",
-        "ocean_gradient": "預設版面",
-        "Startup_Edge": "新創活力",
-        "Zen_Serenity": "靜謐禪意",
-    }
+async def list_templates(request: Request):
+    """列出所有可用的簡報模板（快取的 catalog，支援 ETag / 304）。"""
+    if template_catalog.is_stale:
+        await asyncio.to_thread(template_catalog.refresh)
 
-    templates = [
-        {
-            "id": "code_drawn",
-            "name": "經典繪製",
-            "description": "完全程式化繪製，靈活性高",
-            "available": True,
-            "is_template": False
-        }
-    ]
-
-    # 檢查 templates 目錄下的所有 .pptx 檔案
-    templates_dir = BASE_DIR / "templates"
-    if templates_dir.exists():
-        for template_file in templates_dir.glob("*.pptx"):
-            template_id = template_file.stem
-            try:
-                # 嘗試載入模板驗證可用性
-                from pptx import Presentation
-                test_prs = Presentation(str(template_file))
-                available = True
-            except Exception as e:
-                logger.warning(f"模板 {template_file.name} 不可用: {e}")
-                available = False
-
-            # 使用中文名稱對照表，若無對應則使用原始格式化名稱
-            chinese_name = TEMPLATE_NAMES.get(template_id, template_id.replace("_", " ").title())
-
-            templates.append({
-                "id": template_id,
-                "name": chinese_name,
-                "description": f"使用 {chinese_name} 模板",
-                "available": available,
-                "is_template": True
-            })
-
-    return {"templates": templates}
+    headers = {"ETag": template_catalog.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == template_catalog.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=template_catalog.body, media_type="application/json", headers=headers)
 
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "version": "0.1.0"}
+    return {
+        "status": "ok",
+        "version": "0.1.0",
+        "render": render_executor.stats.snapshot(),
+        "result_cache": result_cache.snapshot(),
+        "llm_cache": llm_cache.snapshot(),
+        "llm_coalescing": coalescing_stats.snapshot(),
+        "llm_admission": llm_admission.snapshot(),
+        "llm_client": llm_client_pool.snapshot(),
+        "llm_backends": backend_pool.snapshot(),
+        "llm_retry_policy": llm_retry_policy.snapshot(),
+        "chunk_cache": chunk_cache.snapshot(),
+    }
+
+
+@app.get("/api/debug/traces")
+async def list_traces(limit: int = 20):
+    """最近的生成 trace（新的在前），用於追查個別慢請求。"""
+    return {"traces": [trace.to_dict() for trace in recent_traces(limit)]}
+
+
+@app.get("/api/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = find_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,283 @@
+# txt2pptx/backend/map_reduce.py
+"""Map-reduce outline generation for long source texts.
+
+長篇講義整份塞進同一個 prompt（再加上龐大的 SYSTEM_PROMPT）時，20B 模型的 prompt eval
+很慢，JSON 也容易壞掉。超過 LLM_CHUNK_THRESHOLD 字元的輸入改走分段模式：
+
+  1. split：依語意邊界切段（標題行一律斷開；其餘以段落內容決定斷點，見 split_into_chunks）
+  2. map：每段以精簡的 MAP_SYSTEM_PROMPT 擷取重點，並行數受 LLM_CHUNK_CONCURRENCY 限制，
+     且只借用 admission 目前閒置的名額（見 AdmissionController.fan_out）；
+     每次呼叫的 timeout 依近期延遲推算（llm_retry_policy），並受請求 deadline 的剩餘預算限制
+  3. reduce：把各段重點組成精簡的筆記，交給原本的大綱生成流程產生 PresentationOutline
+
+每段的擷取結果以內容 hash 快取在 CHUNK_CACHE_DIR；修改原文某一節時只有該節所在的段需要重跑。
+段的斷點只取決於附近的段落內容（content-defined），前面段落的增減不會讓後面的段全部位移。
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .models import GenerateRequest, ChunkKeyPoints, EventCallback
+from .events import emit_event
+from .llm_client import llm_client_pool
+from .backends import backend_pool
+from .admission import llm_admission
+from .deadline import current_deadline
+from .tracing import span
+from .metrics import CHUNK_MAPS
+from .retry_policy import ErrorClass, classify_error, llm_retry_policy
+
+logger = logging.getLogger(__name__)
+
+# ── Map-reduce 配置 ──
+LLM_CHUNK_THRESHOLD = int(os.environ.get("LLM_CHUNK_THRESHOLD", "8000"))
+LLM_CHUNK_TARGET_CHARS = int(os.environ.get("LLM_CHUNK_TARGET_CHARS", "3000"))
+LLM_CHUNK_CONCURRENCY = int(os.environ.get("LLM_CHUNK_CONCURRENCY", "2"))
+LLM_CHUNK_MAX_RETRIES = int(os.environ.get("LLM_CHUNK_MAX_RETRIES", "2"))
+CHUNK_CACHE_DIR = Path(os.environ.get(
+    "LLM_CHUNK_CACHE_DIR", Path(__file__).parent.parent / "cache" / "chunks"
+))
+
+MAP_SYSTEM_PROMPT = """你是一位嚴謹的教學內容分析師。你會收到一份長篇講義中的其中一段，請擷取這一段的重點，供後續整合成簡報。
+
+規則：
+1. 完全忠於原文，不得加入原文沒有的資訊或推測。
+2. section_title：以 20 字以內概括本段主題。
+3. key_points：3 至 8 點，每點一句完整的敘述（15 至 60 字），保留原文的專有名詞與邏輯關係。
+4. data_points：原文中出現的數據、年份、人名、公式或定義，逐條列出；沒有則為空陣列。
+5. 只輸出符合 schema 的 JSON，不要任何其他文字。"""
+
+MAP_PROMPT_VERSION = hashlib.sha256(
+    (MAP_SYSTEM_PROMPT + json.dumps(ChunkKeyPoints.model_json_schema(), sort_keys=True)).encode("utf-8")
+).hexdigest()[:12]
+
+# 標題行：markdown 標題、「第 X 章 / 節 / 講」、「一、」「1.」「1.2」等編號開頭的短行
+_HEADING_PREFIXES = ("#", "第")
+_SENTENCE_ENDS = "。！？!?；;."
+
+
+def needs_chunking(request: GenerateRequest) -> bool:
+    return len(request.text) > LLM_CHUNK_THRESHOLD
+
+
+def _is_heading(line: str) -> bool:
+    if len(line) > 40:
+        return False
+    if line.startswith(_HEADING_PREFIXES):
+        return True
+    head = line.split(maxsplit=1)[0] if line.split() else ""
+    return head.rstrip("、.．)").replace(".", "").isdigit() or (len(head) <= 3 and head.endswith("、"))
+
+
+def _split_long_line(line: str, limit: int) -> list[str]:
+    """過長的段落在句末標點處切開。"""
+    pieces, start = [], 0
+    while len(line) - start > limit:
+        cut = max(line.rfind(mark, start, start + limit) for mark in _SENTENCE_ENDS)
+        end = cut + 1 if cut > start else start + limit
+        pieces.append(line[start:end])
+        start = end
+    pieces.append(line[start:])
+    return [piece for piece in pieces if piece.strip()]
+
+
+def _is_boundary(paragraph: str) -> bool:
+    """內容決定的斷點：與位置無關，同一段落在任何位置都得到相同結果。"""
+    return hashlib.md5(paragraph.encode("utf-8")).digest()[0] % 4 == 0
+
+
+def split_into_chunks(text: str, target_chars: Optional[int] = None) -> list[str]:
+    """依語意邊界把長文切成約 target_chars（預設 LLM_CHUNK_TARGET_CHARS）字元的段。
+
+    - 標題行前一律斷開
+    - 累積超過 target/2 後，遇到內容 hash 命中的段落即斷開；超過 target*1.5 時強制斷開
+    """
+    target_chars = target_chars or LLM_CHUNK_TARGET_CHARS
+    paragraphs = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            paragraphs.extend(_split_long_line(line, target_chars))
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("\n".join(current))
+        current, size = [], 0
+
+    for para in paragraphs:
+        if current and (_is_heading(para) or size + len(para) > target_chars * 3 // 2):
+            flush()
+        current.append(para)
+        size += len(para)
+        if size >= target_chars // 2 and _is_boundary(para):
+            flush()
+    flush()
+    return chunks
+
+
+class ChunkCache:
+    """以 (模型, map prompt 版本, 語言, 段落內容) 為 key 的磁碟快取。"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(chunk: str, model: str, language: str) -> str:
+        material = json.dumps({
+            "chunk": chunk, "model": model, "language": language, "prompt_version": MAP_PROMPT_VERSION,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ChunkKeyPoints]:
+        path = self.directory / f"{key}.json"
+        try:
+            result = ChunkKeyPoints.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Chunk cache entry {key[:12]} unreadable, re-running: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: ChunkKeyPoints):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.json"
+        # 每個寫入者各自的暫存檔：同一段可能同時被兩個請求寫入
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(result.model_dump_json().encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def snapshot(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+chunk_cache = ChunkCache(CHUNK_CACHE_DIR)
+
+
+async def _extract_key_points(chunk: str, model: str, ollama_url: str, language: str) -> ChunkKeyPoints:
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": MAP_SYSTEM_PROMPT},
+            {"role": "user", "content": f"語言：{language}\n---\n{chunk}\n---"},
+        ],
+        "stream": False,
+        "format": ChunkKeyPoints.model_json_schema(),
+        "options": {"temperature": 0.2},
+    }
+    resp = await llm_client_pool.get().post(
+        f"{ollama_url}/api/chat", headers={"content-type": "application/json"}, json=payload,
+    )
+    resp.raise_for_status()
+    return ChunkKeyPoints.model_validate_json(resp.json()["message"]["content"])
+
+
+async def _map_chunk(index: int, chunk: str, model: str, language: str,
+                     limiter: asyncio.Semaphore) -> ChunkKeyPoints:
+    key = ChunkCache.key(chunk, model, language)
+    cached = await asyncio.to_thread(chunk_cache.get, key)
+    if cached is not None:
+        CHUNK_MAPS.labels(result="cached").inc()
+        return cached
+
+    deadline = current_deadline()
+    async with limiter:
+        with span("map_chunk", index=index, chars=len(chunk)):
+            result = None
+            timeouts = 0
+            for attempt in range(1, LLM_CHUNK_MAX_RETRIES + 1):
+                if deadline and not deadline.can_attempt():
+                    break
+                # 每段的輸出量約為一頁投影片
+                timeout = llm_retry_policy.timeout_for(1, timeouts)
+                if deadline:
+                    timeout = min(timeout, deadline.llm_budget())
+                try:
+                    result = await backend_pool.call(
+                        model, lambda url: _extract_key_points(chunk, model, url, language), timeout=timeout
+                    )
+                    break
+                except Exception as e:
+                    error_class = classify_error(e)
+                    logger.warning(
+                        f"⚠️ Chunk {index} key-point extraction failed [{error_class.value}] "
+                        f"(attempt {attempt}/{LLM_CHUNK_MAX_RETRIES}): {type(e).__name__}: {str(e)[:100]}"
+                    )
+                    if error_class is ErrorClass.TIMEOUT:
+                        timeouts += 1
+                    delay = llm_retry_policy.backoff(error_class, attempt)
+                    if delay is None:
+                        break
+                    if attempt < LLM_CHUNK_MAX_RETRIES:
+                        await asyncio.sleep(delay)
+            if result is None:
+                # 擷取失敗時以原文前段代替，不快取，讓 reduce 仍能涵蓋這一段
+                CHUNK_MAPS.labels(result="failed").inc()
+                lines = chunk.splitlines()
+                return ChunkKeyPoints(section_title=lines[0][:20], key_points=[line[:120] for line in lines[:8]])
+
+    CHUNK_MAPS.labels(result="generated").inc()
+    try:
+        await asyncio.to_thread(chunk_cache.put, key, result)
+    except Exception as e:
+        # 快取寫入失敗不影響這次請求，只是下次要重跑這一段
+        logger.warning(f"⚠️ Chunk {index} key points not cached: {type(e).__name__}: {e}")
+    return result
+
+
+def build_reduce_text(sections: list[ChunkKeyPoints]) -> str:
+    """把各段重點組成 reduce 階段的輸入筆記（依原文順序）。"""
+    lines = [f"以下為一份長篇講義依原文順序整理的各段重點（共 {len(sections)} 段）："]
+    for i, section in enumerate(sections, 1):
+        lines.append(f"\n## 第 {i} 段：{section.section_title}")
+        lines.extend(f"- {point}" for point in section.key_points)
+        if section.data_points:
+            lines.append("關鍵數據與事實：" + "；".join(section.data_points))
+    return "\n".join(lines)
+
+
+async def condense_long_text(
+    request: GenerateRequest,
+    model: str,
+    on_event: Optional[EventCallback] = None,
+) -> GenerateRequest:
+    """Map 階段：回傳 text 換成各段重點筆記的請求，供原本的大綱生成流程做 reduce。"""
+    chunks = split_into_chunks(request.text)
+    logger.info(f"📚 Long input ({len(request.text)} chars) split into {len(chunks)} chunks")
+    emit_event(on_event, "stage", stage="map")
+    done = 0
+
+    async def _run(index: int, chunk: str, limiter: asyncio.Semaphore) -> ChunkKeyPoints:
+        nonlocal done
+        result = await _map_chunk(index, chunk, model, request.language, limiter)
+        done += 1
+        emit_event(on_event, "chunk", done=done, total=len(chunks), index=index)
+        return result
+
+    with span("map", chunks=len(chunks)):
+        async with llm_admission.fan_out(max(LLM_CHUNK_CONCURRENCY, 1)) as limiter:
+            sections = await asyncio.gather(*(_run(i, chunk, limiter) for i, chunk in enumerate(chunks, 1)))
+
+    condensed = build_reduce_text(list(sections))
+    logger.info(f"📚 Map stage done: {len(request.text)} → {len(condensed)} chars")
+    return request.model_copy(update={"text": condensed})
@@ -0,0 +1,131 @@
+# txt2pptx/backend/metrics.py
+"""Prometheus metrics exposed at /metrics.
+
+取代原本的 "📊 METRIC:" log 字串，供 dashboard 分析每個階段花掉的時間：
+  - 延遲分布：LLM 呼叫、大綱驗證（JSON 解析 + Pydantic）、PPTX 渲染（依引擎與模板）、檔案寫入
+  - 計數：LLM 嘗試失敗、重試、全部重試失敗、demo fallback、生成結果（成功 / 快取 / 失敗 / 取消）
+  - 即時量：進行中的生成數，以及 LLM 佇列、渲染佇列的深度
+  - 輸出大小分布：LLM 回應字數、每份簡報頁數、PPTX 檔案大小
+
+label 值都限制在有限集合內（模板名稱不在 TEMPLATE_NAMES 中時記為 "unknown"），避免時間序列爆量。
+"""
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+from .template_catalog import TEMPLATE_NAMES
+
+# LLM 生成動輒數十秒到數分鐘，其他階段則在毫秒到秒級
+LLM_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# ── 延遲 ──
+LLM_CALL_SECONDS = Histogram(
+    "txt2pptx_llm_call_seconds", "Ollama /api/chat round trip per attempt",
+    ["outcome"], buckets=LLM_BUCKETS,
+)
+OUTLINE_VALIDATION_SECONDS = Histogram(
+    "txt2pptx_outline_validation_seconds", "JSON parse and Pydantic validation of the LLM response",
+    ["outcome"], buckets=STAGE_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    "txt2pptx_render_seconds", "PPTX render time inside the render worker",
+    ["engine", "template"], buckets=STAGE_BUCKETS,
+)
+RENDER_QUEUE_WAIT_SECONDS = Histogram(
+    "txt2pptx_render_queue_wait_seconds", "Time spent waiting for a render worker",
+    buckets=STAGE_BUCKETS,
+)
+TIME_TO_FIRST_SLIDE_SECONDS = Histogram(
+    "txt2pptx_time_to_first_slide_seconds",
+    "Generation start until the first slide is built (early) or rendering starts (full)",
+    ["mode"], buckets=LLM_BUCKETS,
+)
+FILE_WRITE_SECONDS = Histogram(
+    "txt2pptx_file_write_seconds", "Writing the generated deck to GENERATED_DIR",
+    buckets=STAGE_BUCKETS,
+)
+
+# ── 計數 ──
+LLM_ATTEMPT_FAILURES = Counter(
+    "txt2pptx_llm_attempt_failures_total", "Failed LLM attempts by exception type and error class",
+    ["error_type", "error_class"],
+)
+LLM_RETRIES = Counter("txt2pptx_llm_retries_total", "LLM attempts retried after a failure")
+LLM_RETRY_SUCCESSES = Counter(
+    "txt2pptx_llm_retry_successes_total", "LLM calls that succeeded after at least one retry",
+)
+LLM_ALL_RETRIES_FAILED = Counter(
+    "txt2pptx_llm_all_retries_failed_total", "LLM calls that exhausted every retry",
+)
+DEMO_FALLBACKS = Counter("txt2pptx_demo_fallbacks_total", "Outlines produced by the demo fallback")
+LLM_COALESCED = Counter(
+    "txt2pptx_llm_coalesced_total", "Requests that joined an identical in-flight LLM call",
+)
+ADMISSION_REJECTED = Counter(
+    "txt2pptx_admission_rejected_total", "Requests rejected because the LLM queue was full",
+)
+GENERATIONS = Counter(
+    "txt2pptx_generations_total", "Finished generations by outcome", ["outcome"],
+)
+CHUNK_MAPS = Counter(
+    "txt2pptx_chunk_maps_total", "Long-input chunks by key-point source", ["result"],
+)
+BACKEND_REQUESTS = Counter(
+    "txt2pptx_backend_requests_total", "Ollama calls per backend by outcome (ok or error class)",
+    ["backend", "outcome"],
+)
+LLM_HEDGES = Counter(
+    "txt2pptx_llm_hedges_total", "Hedged LLM requests by which copy finished first", ["winner"],
+)
+LLM_BREAKER_TRANSITIONS = Counter(
+    "txt2pptx_llm_breaker_transitions_total", "Circuit breaker state changes per backend", ["backend", "state"],
+)
+CANCELLATIONS = Counter(
+    "txt2pptx_cancellations_total", "Generations cancelled before finishing, by source", ["source"],
+)
+LLM_CANCELLED = Counter(
+    "txt2pptx_llm_cancelled_total", "Shared LLM calls cancelled while queued or in flight",
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "txt2pptx_llm_cache_lookups_total", "LLM outline cache lookups by result", ["result"],
+)
+OUTLINE_REPAIRS = Counter(
+    "txt2pptx_outline_repairs_total",
+    "Outline repairs by kind (json_local, slide_local, slide_llm, slide_failed)", ["kind"],
+)
+EARLY_RENDERS = Counter(
+    "txt2pptx_early_renders_total",
+    "Decks built while the LLM was streaming, by whether the result was used", ["outcome"],
+)
+
+# ── 即時量（佇列相關的 gauge 由各模組以 set_function 綁定，抓取時才讀取）──
+GENERATIONS_IN_FLIGHT = Gauge("txt2pptx_generations_in_flight", "Generations currently running")
+LLM_IN_FLIGHT = Gauge("txt2pptx_llm_in_flight", "LLM calls holding an admission slot")
+LLM_QUEUE_DEPTH = Gauge("txt2pptx_llm_queue_depth", "LLM calls waiting for an admission slot")
+RENDER_IN_FLIGHT = Gauge("txt2pptx_render_in_flight", "Renders currently running")
+RENDER_QUEUE_DEPTH = Gauge("txt2pptx_render_queue_depth", "Renders waiting for a worker")
+
+# ── 輸出大小 ──
+LLM_RESPONSE_CHARS = Histogram(
+    "txt2pptx_llm_response_chars", "Characters in the raw LLM response",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+DECK_SLIDES = Histogram(
+    "txt2pptx_deck_slides", "Slides per generated deck",
+    buckets=(3, 5, 8, 10, 15, 20, 30, 50),
+)
+PPTX_BYTES = Histogram(
+    "txt2pptx_pptx_bytes", "Size of the generated .pptx file", ["engine"],
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6),
+)
+
+
+def engine_labels(template: str) -> tuple[str, str]:
+    """回傳 (engine, template) label；未知模板歸為 "unknown"。"""
+    if template == "code_drawn":
+        return "code_drawn", "code_drawn"
+    return "template", template if template in TEMPLATE_NAMES else "unknown"
+
+
+def render_latest() -> tuple[bytes, str]:
+    """回傳 Prometheus text exposition 內容與 content type。"""
+    return generate_latest(), CONTENT_TYPE_LATEST
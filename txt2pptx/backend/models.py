@@ -2,7 +2,7 @@
 """Data models for TXT2PPTX pipeline."""
 from pydantic import BaseModel, Field
 from enum import Enum
-from typing import Optional
+from typing import Callable, Optional
 
 
 class SlideLayout(str, Enum):
@@ -49,6 +49,9 @@ class GenerateRequest(BaseModel):
     language: str = Field(default="zh-TW")
     style: str = Field(default="professional")
     template: str = Field(default="code_drawn")
+    force_regenerate: bool = Field(default=False, description="略過結果快取，強制重新生成")
+    debug: bool = Field(default=False, description="回應中附上各階段耗時的 span 樹")
+    deadline_s: Optional[float] = Field(default=None, gt=0, description="整個請求的時間預算（秒），見 deadline.py")
 
 
 class GenerateResponse(BaseModel):
@@ -56,3 +59,88 @@ class GenerateResponse(BaseModel):
     filename: Optional[str] = None
     message: str
     outline: Optional[PresentationOutline] = None
+    cached: bool = False
+    trace_id: Optional[str] = None
+    trace: Optional[dict] = None  # 僅 debug=True 時提供，見 tracing.py
+
+
+# ── 長文 map-reduce 模型 ──
+
+class ChunkKeyPoints(BaseModel):
+    """長文單一段落的重點摘要（map 階段的 LLM 輸出）。"""
+    section_title: str
+    key_points: list[str] = Field(default_factory=list)
+    data_points: list[str] = Field(default_factory=list, description="原文中的數據、年份、名稱等具體事實")
+
+
+# ── 非同步任務（Job）模型 ──
+
+# 生成流程的事件回呼：on_event(event_name, data)
+EventCallback = Callable[[str, dict], None]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class StageTiming(BaseModel):
+    name: str
+    started_at: float
+    duration_ms: Optional[float] = None
+
+
+class JobCreateResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    status_url: str
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: JobStatus
+    stage: Optional[str] = None
+    stages: list[StageTiming] = []
+    created_at: float
+    finished_at: Optional[float] = None
+    elapsed_ms: float
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+    result: Optional[GenerateResponse] = None
+
+
+# ── 批次生成模型 ──
+
+class BatchRequest(BaseModel):
+    items: list[GenerateRequest] = Field(..., min_length=1, max_length=100)
+
+
+class BatchCreateResponse(BaseModel):
+    batch_id: str
+    total: int
+    status_url: str
+
+
+class BatchItemStatus(BaseModel):
+    index: int
+    job_id: str
+    status: JobStatus
+    stage: Optional[str] = None
+    filename: Optional[str] = None
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+
+class BatchInfo(BaseModel):
+    batch_id: str
+    status: JobStatus
+    total: int
+    succeeded: int
+    failed: int
+    created_at: float
+    finished_at: Optional[float] = None
+    items: list[BatchItemStatus]
@@ -0,0 +1,276 @@
+# txt2pptx/backend/outline_repair.py
+"""Targeted repair of invalid LLM outlines.
+
+原本只要有一頁投影片不符合 SlideData（最常見的是 speaker_notes 不足 50 字，或 layout 值錯誤），
+PresentationOutline(**outline_data) 就會失敗，整個數分鐘的 LLM 呼叫被丟棄重來。改為分三層處理：
+
+  1. 文字層（不呼叫 LLM）：去除 markdown fence 與前後多餘文字、刪除結尾多餘的逗號
+  2. 單頁本地修正（不呼叫 LLM）：layout 大小寫 / 連字號 / 常見別名、過長的 speaker_notes 截斷
+  3. 逐頁驗證，保留有效的頁面，只把仍無效的頁面連同整份簡報的脈絡以精簡的 prompt 重新請求
+     （最多 LLM_REPAIR_CONCURRENCY 頁同時請求，並以 admission fan_out() 計入全域並行上限）
+
+壞掉的頁數超過 LLM_REPAIR_MAX_FRACTION，或簡報層級的欄位（title、slides）本身有誤時，
+不做修補，交給原本的重試機制重新生成整份大綱。
+"""
+import os
+import re
+import json
+import asyncio
+import logging
+from typing import Optional
+
+from pydantic import ValidationError
+
+from .models import PresentationOutline, SlideData, SlideLayout, GenerateRequest, EventCallback
+from .events import emit_event
+from .llm_client import llm_client_pool
+from .backends import backend_pool
+from .admission import llm_admission
+from .deadline import current_deadline
+from .tracing import span
+from .metrics import OUTLINE_REPAIRS
+
+logger = logging.getLogger(__name__)
+
+# ── 修補配置 ──
+# 壞掉的頁數佔比超過此值時整份重新生成（修補多數頁面不比重來便宜）
+LLM_REPAIR_MAX_FRACTION = float(os.environ.get("LLM_REPAIR_MAX_FRACTION", "0.5"))
+LLM_REPAIR_MAX_ATTEMPTS = int(os.environ.get("LLM_REPAIR_MAX_ATTEMPTS", "2"))
+LLM_REPAIR_TIMEOUT = float(os.environ.get("LLM_REPAIR_TIMEOUT", "120"))
+# 同時修補的頁數（還會受 admission 閒置名額限制）
+LLM_REPAIR_CONCURRENCY = int(os.environ.get("LLM_REPAIR_CONCURRENCY", "2"))
+
+REPAIR_SYSTEM_PROMPT = """你是簡報大綱的修正助手。你會收到一份簡報的整體脈絡，以及其中一頁不符合格式要求的投影片 JSON 與驗證錯誤。
+
+規則：
+1. 只修正這一頁，保留原本的標題與內容方向，與前後頁面保持連貫，不要重複其他頁面的內容。
+2. layout 必須是以下其中之一：title_slide, section_header, bullets, two_column, image_left, image_right, key_stats, comparison, conclusion。
+3. speaker_notes 必須為 50 至 200 字的完整補充說明（建議 50-100 字）：背景脈絡、延伸解釋、實例應用、引導問題。
+4. 完全基於既有內容，不得編造可驗證的事實。
+5. 只輸出符合 schema 的單頁 JSON，不要任何其他文字。"""
+
+# layout 常見的別名 / 寫法
+LAYOUT_ALIASES = {
+    "title": SlideLayout.TITLE,
+    "cover": SlideLayout.TITLE,
+    "section": SlideLayout.SECTION,
+    "bullet": SlideLayout.BULLETS,
+    "bullet_points": SlideLayout.BULLETS,
+    "two_columns": SlideLayout.TWO_COLUMN,
+    "stats": SlideLayout.KEY_STATS,
+    "compare": SlideLayout.COMPARISON,
+    "summary": SlideLayout.CONCLUSION,
+}
+_LAYOUT_VALUES = {layout.value for layout in SlideLayout}
+SPEAKER_NOTES_MAX = next(
+    meta.max_length for meta in SlideData.model_fields["speaker_notes"].metadata if hasattr(meta, "max_length")
+)
+_SENTENCE_ENDS = "。！？!?."
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+
+
+# ── 文字層修正 ──
+
+def _strip_trailing_commas(text: str) -> str:
+    """刪除 } 或 ] 前多餘的逗號（忽略字串內容）。"""
+    out = []
+    in_string = escape = False
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "}]":
+                i += 1
+                continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def repair_json_text(text: str) -> str:
+    """不呼叫 LLM 的文字層修正：markdown fence、JSON 前後的說明文字、結尾多餘的逗號。"""
+    text = text.strip()
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    elif text.startswith("```"):
+        # 只有開頭的 fence（輸出被截斷）
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        text = text[start:end + 1]
+    return _strip_trailing_commas(text)
+
+
+# ── 單頁本地修正 ──
+
+def _truncate_notes(notes: str, limit: int) -> str:
+    cut = max(notes.rfind(mark, 0, limit) for mark in _SENTENCE_ENDS)
+    return notes[:cut + 1] if cut >= limit // 2 else notes[:limit]
+
+
+def fix_slide_locally(data: dict) -> dict:
+    """修正不需要 LLM 的單頁問題：layout 寫法 / 別名、過長的 speaker_notes。回傳新的 dict。"""
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    layout = data.get("layout")
+    if isinstance(layout, str) and layout not in _LAYOUT_VALUES:
+        normalized = layout.strip().lower().replace("-", "_").replace(" ", "_")
+        if normalized in _LAYOUT_VALUES:
+            data["layout"] = normalized
+        elif normalized in LAYOUT_ALIASES:
+            data["layout"] = LAYOUT_ALIASES[normalized].value
+    notes = data.get("speaker_notes")
+    if notes is None:
+        data.pop("speaker_notes", None)
+    elif isinstance(notes, str) and len(notes.strip()) > SPEAKER_NOTES_MAX:
+        data["speaker_notes"] = _truncate_notes(notes.strip(), SPEAKER_NOTES_MAX)
+    return data
+
+
+# ── 逐頁驗證與 LLM 修補 ──
+
+def _format_errors(error: ValidationError) -> str:
+    return "\n".join(
+        f"- {'.'.join(str(part) for part in err['loc']) or '(root)'}: {err['msg']}" for err in error.errors()
+    )
+
+
+def _deck_context(outline_data: dict, slides: list, index: int) -> str:
+    lines = [f"簡報標題：{outline_data.get('title', '')}"]
+    if outline_data.get("subtitle"):
+        lines.append(f"副標題：{outline_data['subtitle']}")
+    lines.append(f"共 {len(slides)} 頁：")
+    for i, slide in enumerate(slides, 1):
+        data = slide.model_dump() if isinstance(slide, SlideData) else (slide if isinstance(slide, dict) else {})
+        layout = data.get("layout")
+        layout = layout.value if isinstance(layout, SlideLayout) else layout
+        marker = "  ← 需要修正" if i == index else ""
+        lines.append(f"{i}. [{layout}] {data.get('title', '')}{marker}")
+    return "\n".join(lines)
+
+
+async def _request_slide(payload: dict, ollama_url: str) -> SlideData:
+    resp = await llm_client_pool.get().post(
+        f"{ollama_url}/api/chat", headers={"content-type": "application/json"}, json=payload,
+    )
+    resp.raise_for_status()
+    text = repair_json_text(resp.json()["message"]["content"])
+    return SlideData.model_validate(fix_slide_locally(json.loads(text)))
+
+
+async def _repair_slide(index: int, raw, error: ValidationError, outline_data: dict, slides: list,
+                        request: GenerateRequest, model: str) -> Optional[SlideData]:
+    """以整份簡報的脈絡重新請求單一頁；失敗時回傳 None。"""
+    user_message = f"""語言：{request.language}
+風格：{request.style}
+{_deck_context(outline_data, slides, index)}
+
+第 {index} 頁目前的 JSON：
+{json.dumps(raw, ensure_ascii=False, default=str)}
+
+驗證錯誤：
+{_format_errors(error)}"""
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message},
+        ],
+        "stream": False,
+        "format": SlideData.model_json_schema(),
+        "options": {"temperature": 0.3},
+    }
+    deadline = current_deadline()
+    with span("repair_slide", index=index):
+        for attempt in range(1, LLM_REPAIR_MAX_ATTEMPTS + 1):
+            timeout = min(LLM_REPAIR_TIMEOUT, deadline.llm_budget()) if deadline else LLM_REPAIR_TIMEOUT
+            try:
+                return await backend_pool.call(
+                    model, lambda url: _request_slide(payload, url), timeout=timeout
+                )
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Repair of slide {index} failed (attempt {attempt}/{LLM_REPAIR_MAX_ATTEMPTS}): "
+                    f"{type(e).__name__}: {str(e)[:100]}"
+                )
+    return None
+
+
+async def validate_and_repair(
+    outline_data: dict,
+    request: GenerateRequest,
+    model: str,
+    on_event: Optional[EventCallback] = None,
+) -> PresentationOutline:
+    """驗證大綱；有無效頁面時本地修正或只重新請求壞掉的頁面。無法修補時拋出原本的 ValidationError。"""
+    try:
+        with span("validate"):
+            return PresentationOutline.model_validate(outline_data)
+    except ValidationError as e:
+        original_error = e
+
+    slides_data = outline_data.get("slides")
+    deck_errors = [err for err in original_error.errors() if not err["loc"] or err["loc"][0] != "slides"
+                   or len(err["loc"]) < 2]
+    if deck_errors or not isinstance(slides_data, list) or not slides_data:
+        raise original_error
+
+    slides: list = []
+    broken: dict[int, tuple[object, ValidationError]] = {}
+    local_fixes = 0
+    for i, raw in enumerate(slides_data, 1):
+        try:
+            slides.append(SlideData.model_validate(raw))
+            continue
+        except ValidationError as slide_error:
+            error = slide_error
+        try:
+            slides.append(SlideData.model_validate(fix_slide_locally(raw)))
+            local_fixes += 1
+        except ValidationError as fixed_error:
+            slides.append(raw)
+            broken[i] = (raw, fixed_error)
+        else:
+            logger.info(f"🩹 Slide {i} fixed locally ({error.error_count()} errors)")
+    OUTLINE_REPAIRS.labels(kind="slide_local").inc(local_fixes)
+
+    if len(broken) > len(slides) * LLM_REPAIR_MAX_FRACTION:
+        logger.warning(f"⚠️ {len(broken)}/{len(slides)} slides invalid, regenerating the whole outline")
+        raise original_error
+
+    if broken:
+        logger.info(f"🩹 Repairing {len(broken)}/{len(slides)} invalid slides: {sorted(broken)}")
+        emit_event(on_event, "repair", indices=sorted(broken), total=len(slides))
+        async def _limited(i: int, raw, error: ValidationError, limiter: asyncio.Semaphore):
+            async with limiter:
+                return await _repair_slide(i, raw, error, outline_data, slides, request, model)
+
+        with span("repair", slides=len(broken)):
+            async with llm_admission.fan_out(max(LLM_REPAIR_CONCURRENCY, 1)) as limiter:
+                repaired = await asyncio.gather(*(
+                    _limited(i, raw, error, limiter) for i, (raw, error) in broken.items()
+                ))
+        for i, slide in zip(broken, repaired):
+            if slide is None:
+                OUTLINE_REPAIRS.labels(kind="slide_failed").inc()
+                raise original_error
+            OUTLINE_REPAIRS.labels(kind="slide_llm").inc()
+            slides[i - 1] = slide
+
+    with span("validate"):
+        return PresentationOutline.model_validate({**outline_data, "slides": slides})
@@ -0,0 +1,76 @@
+# txt2pptx/backend/outline_stream.py
+"""Incremental parser for the streamed outline JSON.
+
+Ollama 以 schema 約束輸出時依欄位順序產生 {"title", "subtitle", "theme", "slides": [...]}。
+串流過程中，每當 slides 陣列中的一個元素（一頁投影片）完整出現，就立即取出，
+讓呼叫端可以先驗證並開始渲染該頁，不必等整份大綱生成完畢。
+
+只追蹤字串 / 跳脫字元與括號深度，每個字元只掃描一次；前後的 markdown fence 不影響解析。
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+SLIDES_KEY = "slides"
+
+
+class SlideStreamParser:
+    """逐段餵入串流文字，回傳新完成的 slides 元素 [(頁碼, dict)]。"""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key = None       # 頂層物件中最近一個字串（即 key）
+        self._in_slides = False
+        self._slides_seen = False
+        self._element_start = None
+        self.count = 0              # 已完成的元素數（含無法解析者）
+
+    def feed(self, chunk: str) -> list[tuple[int, dict]]:
+        self._text += chunk
+        text = self._text
+        completed = []
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == "{" or c == "[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_key == SLIDES_KEY and not self._slides_seen:
+                    self._in_slides = self._slides_seen = True
+                elif c == "{" and self._in_slides and self._depth == 3:
+                    self._element_start = i
+            elif c == "}" or c == "]":
+                if c == "}" and self._in_slides and self._depth == 3 and self._element_start is not None:
+                    element = text[self._element_start:i + 1]
+                    self._element_start = None
+                    self.count += 1
+                    try:
+                        completed.append((self.count, json.loads(element)))
+                    except json.JSONDecodeError as e:
+                        # 交給整份大綱的驗證處理（會觸發重試）
+                        logger.warning(f"⚠️ Streamed slide #{self.count} is not valid JSON: {e}")
+                elif c == "]" and self._in_slides and self._depth == 2:
+                    self._in_slides = False
+                self._depth -= 1
+
+        self._pos = len(text)
+        return completed
@@ -0,0 +1,229 @@
+# txt2pptx/backend/pipeline.py
+"""Generation pipeline shared by /api/generate and the job API."""
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional
+
+from .models import GenerateRequest, GenerateResponse, EventCallback, PresentationOutline, SlideData
+from .events import emit_event
+from .llm_service import generate_outline, llm_cache, prompt_fingerprint
+from .render_pool import render_executor
+from .early_render import EARLY_RENDER, IncrementalDeck
+from .result_cache import ResultCache, result_key
+from .admission import Reservation, llm_admission, reservation_scope
+from .tracing import Trace, trace_request, span
+from .deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from .metrics import (
+    GENERATIONS, GENERATIONS_IN_FLIGHT, FILE_WRITE_SECONDS, DECK_SLIDES, PPTX_BYTES, engine_labels,
+    EARLY_RENDERS, TIME_TO_FIRST_SLIDE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATED_DIR = Path(__file__).parent.parent / "generated"
+GENERATED_DIR.mkdir(exist_ok=True)
+
+result_cache = ResultCache(GENERATED_DIR)
+
+
+async def _needs_llm(request: GenerateRequest) -> bool:
+    if request.force_regenerate:
+        return True
+    if await asyncio.to_thread(result_cache.contains, result_key(request)):
+        return False
+    return not await asyncio.to_thread(llm_cache.contains, prompt_fingerprint(request))
+
+
+async def check_admission(*requests: GenerateRequest) -> list[Optional[Reservation]]:
+    """API 入口的背壓檢查：為結果快取 / LLM 快取皆未命中的請求保留 LLM 佇列位置。
+
+    回傳與 requests 對應的 Reservation（快取命中者為 None），交給 run_generation；
+    佇列放不下所有需要 LLM 的請求時拋出 AdmissionRejected。
+    """
+    needs_llm = await asyncio.gather(*(_needs_llm(request) for request in requests))
+    reservations = iter(llm_admission.check(sum(needs_llm)))
+    return [next(reservations) if needed else None for needed in needs_llm]
+
+
+async def run_generation(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback] = None,
+    outline_limiter: Optional[asyncio.Semaphore] = None,
+    trace: Optional[Trace] = None,
+    reservation: Optional[Reservation] = None,
+) -> GenerateResponse:
+    """Run outline → render → save, reporting progress events through ``on_event``.
+
+    Stages: （快取命中時直接回傳）outline（LLM 呼叫）、validate（JSON 解析 + Pydantic 驗證，由 llm_service 回報）、
+    render（PPTX 渲染）、save（寫入 GENERATED_DIR）。
+
+    outline_limiter 只限制 outline 階段（LLM 呼叫）的並行數；取得大綱後即釋放，
+    讓下一份請求的 LLM 呼叫與本請求的渲染 / 存檔重疊進行（批次生成使用）。
+
+    每次生成都記錄一份 span 樹（見 tracing.py）；呼叫端可傳入 trace 以便事後產生
+    Server-Timing header，request.debug 為真時 span 樹會附在回應中。
+
+    request.deadline_s 為整個請求的時間預算，各階段依剩餘預算調整（見 deadline.py）。
+
+    reservation 為 check_admission() 保留的佇列位置，開始排隊取得 LLM 名額或請求結束時釋放。
+    """
+    trace = trace or Trace()
+    trace.root.attrs.update(template=request.template, num_slides=request.num_slides)
+    GENERATIONS_IN_FLIGHT.inc()
+    try:
+        with reservation_scope(reservation), trace_request(trace), deadline_scope(request.deadline_s) as deadline:
+            try:
+                response = await _run_generation(request, on_event, outline_limiter)
+            finally:
+                if deadline is not None:
+                    trace.root.attrs["deadline"] = deadline.summary()
+    except asyncio.CancelledError:
+        GENERATIONS.labels(outcome="cancelled").inc()
+        raise
+    except Exception:
+        GENERATIONS.labels(outcome="failed").inc()
+        raise
+    finally:
+        GENERATIONS_IN_FLIGHT.dec()
+    GENERATIONS.labels(outcome="cached" if response.cached else "succeeded").inc()
+    response.trace_id = trace.trace_id
+    if request.debug:
+        response.trace = trace.to_dict()
+    return response
+
+
+async def _run_generation(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback],
+    outline_limiter: Optional[asyncio.Semaphore],
+) -> GenerateResponse:
+    # Step 0: 結果快取（相同請求直接回傳既有檔案，略過 LLM 與渲染）
+    key = result_key(request)
+    if not request.force_regenerate:
+        with span("cache_lookup") as lookup_span:
+            hit = await asyncio.to_thread(result_cache.lookup, key)
+            if lookup_span is not None:
+                lookup_span.attrs["hit"] = hit is not None
+        if hit is not None:
+            filename, outline = hit
+            logger.info(f"♻️ Result cache hit: {filename}")
+            emit_event(on_event, "cache_hit", filename=filename)
+            return GenerateResponse(
+                success=True,
+                filename=filename,
+                message="簡報生成成功（快取）",
+                outline=outline,
+                cached=True,
+            )
+
+    # Step 1 + 2: 大綱與渲染（串流時邊生成邊渲染）
+    outline, pptx_bytes, fallback_used = await _outline_and_render(request, on_event, outline_limiter)
+
+    # Step 3: Save file（LLM 結果以 key 命名存入快取；fallback 結果使用隨機檔名）
+    deadline = current_deadline()
+    emit_event(on_event, "stage", stage="save")
+    write_start = time.perf_counter()
+    with span("save", bytes=len(pptx_bytes)):
+        if fallback_used:
+            filename = f"{uuid.uuid4().hex[:8]}.pptx"
+            await asyncio.to_thread((GENERATED_DIR / filename).write_bytes, pptx_bytes)
+        else:
+            filename = await asyncio.to_thread(result_cache.store, key, pptx_bytes, outline)
+    FILE_WRITE_SECONDS.observe(time.perf_counter() - write_start)
+    if deadline is not None:
+        deadline.charge("save")
+    DECK_SLIDES.observe(len(outline.slides))
+    PPTX_BYTES.labels(engine=engine_labels(request.template)[0]).observe(len(pptx_bytes))
+    logger.info(f"PPTX saved: {GENERATED_DIR / filename} ({len(pptx_bytes)} bytes)")
+    emit_event(on_event, "saved", filename=filename, bytes=len(pptx_bytes))
+
+    return GenerateResponse(
+        success=True,
+        filename=filename,
+        message="簡報生成成功",
+        outline=outline
+    )
+
+
+async def _outline_and_render(
+    request: GenerateRequest,
+    on_event: Optional[EventCallback],
+    outline_limiter: Optional[asyncio.Semaphore],
+) -> tuple[PresentationOutline, bytes, bool]:
+    """產生大綱並渲染，回傳 (outline, pptx_bytes, 是否使用 demo fallback)。
+
+    LLM 串流送出的 slide 事件會餵給 IncrementalDeck 提前渲染（見 early_render.py）；
+    每當第 1 頁再次出現（重試）就重新開始。最終大綱與提前渲染的頁面不一致時改走 render pool。
+    """
+    start = time.perf_counter()
+    deadline = current_deadline()
+    fallback_used = False
+    deck: Optional[IncrementalDeck] = None
+
+    def _on_event(event: str, data: dict):
+        nonlocal fallback_used, deck
+        if event == "fallback":
+            fallback_used = True
+        elif event == "slide" and EARLY_RENDER and "slide" in data:
+            try:
+                if data["index"] == 1:
+                    if deck is not None:
+                        deck.close()
+                    deck = IncrementalDeck(request.template, request.num_slides)
+                if deck is not None:
+                    deck.add(data["index"], SlideData.model_validate(data["slide"]))
+            except Exception:
+                # 提前渲染失敗不影響事件轉送；deck 標記為 broken，最終改走 render pool
+                logger.exception(f"⚠️ Early render of slide {data.get('index')} could not be queued")
+                if deck is not None:
+                    deck.broken = True
+        emit_event(on_event, event, **data)
+
+    try:
+        # Step 1: Generate outline
+        async with outline_limiter or nullcontext():
+            logger.info(f"Generating outline for {len(request.text)} chars, {request.num_slides} slides")
+            emit_event(on_event, "stage", stage="outline")
+            with span("outline"):
+                outline = await generate_outline(request, on_event=_on_event)
+        logger.info(f"Outline generated: {outline.title}, {len(outline.slides)} slides")
+        if deadline is not None:
+            deadline.charge("outline")
+
+        # Step 2: Generate PPTX（提前渲染可用時直接補完，否則根據模板於 render pool 執行以免阻塞 event loop）
+        emit_event(on_event, "stage", stage="render")
+        with span("render", template=request.template, slides=len(outline.slides)) as render_span:
+            pptx_bytes = None
+            if deck is not None and not fallback_used:
+                pptx_bytes = await _within_deadline(deck.finish(outline), deadline)
+                EARLY_RENDERS.labels(outcome="used" if pptx_bytes is not None else "discarded").inc()
+            early = pptx_bytes is not None
+            if early:
+                TIME_TO_FIRST_SLIDE_SECONDS.labels(mode="early").observe(deck.first_slide_at - start)
+            else:
+                TIME_TO_FIRST_SLIDE_SECONDS.labels(mode="full").observe(time.perf_counter() - start)
+                rendered = await _within_deadline(render_executor.render(outline, request.template), deadline)
+                pptx_bytes = rendered.pptx_bytes
+            if render_span is not None:
+                render_span.attrs["early"] = early
+        if deadline is not None:
+            deadline.charge("render")
+    finally:
+        if deck is not None:
+            deck.close()
+
+    return outline, pptx_bytes, fallback_used
+
+
+async def _within_deadline(awaitable, deadline: Optional[Deadline]):
+    """等待渲染結果；超過請求的 deadline 時拋出 DeadlineExceeded。"""
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"deadline of {deadline.budget:g}s exceeded while rendering") from None
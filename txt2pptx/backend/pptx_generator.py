@@ -1,7 +1,9 @@
 # txt2pptx/backend/pptx_generator.py
 """PPTX generator with template-based layouts."""
 import io
+import copy
 import math
+import threading
 from pptx import Presentation
 from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
@@ -9,6 +11,7 @@ from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 
 from .models import PresentationOutline, SlideData, SlideLayout
+from .tracing import span
 
 # ──────────────────────────────────────────────
 # Color Palette (Ocean Gradient theme)
@@ -139,9 +142,121 @@ def _add_slide_number(slide, num: int, total: int):
                   font_size=9, color=Theme.TEXT_MUTED, align=PP_ALIGN.RIGHT)
 
 
-def _add_top_accent_bar(slide):
-    """Add a thin accent bar at top of slide."""
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0, 0, 13.333, 0.06, Theme.ACCENT)
+# ──────────────────────────────────────────────
+# Static Skeletons
+# ──────────────────────────────────────────────
+# 每種版面不隨內容變動的部分（背景、頂部 accent bar、頁尾色條、卡片框）每個 process 只畫一次，
+# 之後每張投影片以 lxml deepcopy 複製，只有文字等動態內容逐張建立。
+# 裝飾依 z-order 分組，builder 在原本繪製的位置蓋上（stamp）該分組，shape 順序、id 與名稱不變。
+
+def _card(x, y, w, h):
+    return lambda s, t: _add_shape(s, MSO_SHAPE.RECTANGLE, x, y, w, h,
+                                   t.CARD_BG, line_color=t.CARD_BORDER, line_width=0.5)
+
+
+def _bar(x, y, w, h, color):
+    return lambda s, t: _add_shape(s, MSO_SHAPE.RECTANGLE, x, y, w, h, getattr(t, color))
+
+
+_TOP_BAR = {"top_bar": [_bar(0, 0, 13.333, 0.06, "ACCENT")]}
+
+# layout → (背景色名稱, {分組名稱: [繪製函式(slide, theme)]})
+_DECORATIONS = {
+    SlideLayout.TITLE: ("DARK", {
+        "left_bar": [_bar(0.8, 1.8, 0.06, 3.8, "ACCENT")],
+        "footer": [_bar(0, 6.8, 13.333, 0.7, "PRIMARY")],
+    }),
+    SlideLayout.SECTION: ("PRIMARY", {
+        "divider": [_bar(5.5, 4.0, 2.333, 0.04, "ACCENT")],
+    }),
+    SlideLayout.BULLETS: ("LIGHT_BG", _TOP_BAR),
+    SlideLayout.TWO_COLUMN: ("LIGHT_BG", {
+        **_TOP_BAR,
+        "left_card": [_card(0.8, 1.8, 5.6, 4.8), _bar(0.8, 1.8, 0.06, 4.8, "PRIMARY")],
+        "right_card": [_card(6.933, 1.8, 5.6, 4.8), _bar(6.933, 1.8, 0.06, 4.8, "SECONDARY")],
+    }),
+    SlideLayout.IMAGE_LEFT: ("LIGHT_BG", _TOP_BAR),
+    SlideLayout.IMAGE_RIGHT: ("LIGHT_BG", _TOP_BAR),
+    SlideLayout.KEY_STATS: ("LIGHT_BG", _TOP_BAR),
+    SlideLayout.COMPARISON: ("LIGHT_BG", {
+        **_TOP_BAR,
+        "left_card": [_card(0.8, 1.8, 5.4, 4.8), _bar(0.8, 1.8, 5.4, 0.5, "PRIMARY")],
+        "versus": [
+            lambda s, t: _add_shape(s, MSO_SHAPE.OVAL, 6.266, 3.6, 0.8, 0.8, t.ACCENT),
+            lambda s, t: _add_text_box(s, "VS", 6.266, 3.7, 0.8, 0.6, font_size=14, font_name=t.BODY_FONT,
+                                       color=t.WHITE, bold=True, align=PP_ALIGN.CENTER),
+        ],
+        "right_card": [_card(7.133, 1.8, 5.4, 4.8), _bar(7.133, 1.8, 5.4, 0.5, "SECONDARY")],
+    }),
+    SlideLayout.CONCLUSION: ("DARK", {
+        **_TOP_BAR,
+        "divider": [_bar(5.5, 2.7, 2.333, 0.04, "ACCENT")],
+        "footer": [
+            _bar(0, 6.8, 13.333, 0.7, "PRIMARY"),
+            lambda s, t: _add_text_box(s, "Thank You", 0, 6.85, 13.333, 0.5, font_size=14,
+                                       font_name=t.BODY_FONT, color=t.LIGHT_ACCENT, align=PP_ALIGN.CENTER),
+        ],
+    }),
+}
+
+
+class _Skeleton:
+    """一種版面在某個 theme 下的靜態部分：p:bg 與依分組的裝飾 shape 元素。"""
+
+    def __init__(self, bg, groups: dict[str, list]):
+        self.bg = bg
+        self.groups = groups
+
+
+_SKELETONS: dict[tuple[type, SlideLayout], _Skeleton] = {}
+_scratch_prs = None
+# 多個 render worker thread 可能同時第一次用到同一版面；_scratch_prs 也不是 thread-safe
+_SKELETON_LOCK = threading.Lock()
+
+
+def _skeleton(layout: SlideLayout, theme=Theme) -> _Skeleton:
+    """回傳 (theme, layout) 的靜態骨架；第一次使用時在暫存簡報上以 python-pptx 畫出。"""
+    key = (theme, layout)
+    skeleton = _SKELETONS.get(key)
+    if skeleton is not None:
+        return skeleton
+    with _SKELETON_LOCK:
+        skeleton = _SKELETONS.get(key)
+        if skeleton is None:
+            global _scratch_prs
+            if _scratch_prs is None:
+                _scratch_prs = Presentation()
+            bg_color, decorations = _DECORATIONS[layout]
+            slide = _scratch_prs.slides.add_slide(_scratch_prs.slide_layouts[6])
+            _set_slide_bg(slide, getattr(theme, bg_color))
+            sp_tree = slide.shapes._spTree
+            groups = {}
+            for name, drawers in decorations.items():
+                start = len(sp_tree)
+                for draw in drawers:
+                    draw(slide, theme)
+                groups[name] = list(sp_tree)[start:]
+            skeleton = _SKELETONS[key] = _Skeleton(slide._element.cSld.bg, groups)
+    return skeleton
+
+
+def _new_slide(prs, layout: SlideLayout, theme=Theme):
+    """新增空白投影片，背景由該版面的骨架複製。"""
+    slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank
+    slide._element.cSld._insert_bg(copy.deepcopy(_skeleton(layout, theme).bg))
+    return slide
+
+
+def _stamp(slide, layout: SlideLayout, group: str, theme=Theme):
+    """在目前的 z-order 位置複製骨架中的一組裝飾 shape，並依 python-pptx 的規則重新編號。"""
+    shapes = slide.shapes
+    for element in _skeleton(layout, theme).groups[group]:
+        clone = copy.deepcopy(element)
+        c_nv_pr = clone._nvXxPr.cNvPr
+        shape_id = shapes._next_shape_id
+        c_nv_pr.id = shape_id
+        c_nv_pr.name = f"{c_nv_pr.name.rsplit(' ', 1)[0]} {shape_id - 1}"
+        shapes._spTree.insert_element_before(clone, "p:extLst")
 
 
 # ──────────────────────────────────────────────
@@ -149,11 +264,10 @@ def _add_top_accent_bar(slide):
 # ──────────────────────────────────────────────
 
 def _build_title_slide(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank
-    _set_slide_bg(slide, Theme.DARK)
+    slide = _new_slide(prs, SlideLayout.TITLE)
 
     # Left accent bar
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0.8, 1.8, 0.06, 3.8, Theme.ACCENT)
+    _stamp(slide, SlideLayout.TITLE, "left_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 1.3, 2.0, 10, 2.0,
@@ -166,12 +280,11 @@ def _build_title_slide(prs, slide_data: SlideData, idx: int, total: int):
                       font_size=20, color=Theme.ACCENT, align=PP_ALIGN.LEFT)
 
     # Bottom decoration
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0, 6.8, 13.333, 0.7, Theme.PRIMARY)
+    _stamp(slide, SlideLayout.TITLE, "footer")
 
 
 def _build_section_header(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.PRIMARY)
+    slide = _new_slide(prs, SlideLayout.SECTION)
 
     # Centered title
     _add_text_box(slide, slide_data.title, 1, 2.5, 11.333, 1.5,
@@ -183,15 +296,14 @@ def _build_section_header(prs, slide_data: SlideData, idx: int, total: int):
                       font_size=18, color=Theme.LIGHT_ACCENT, align=PP_ALIGN.CENTER)
 
     # Decorative line
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 5.5, 4.0, 2.333, 0.04, Theme.ACCENT)
+    _stamp(slide, SlideLayout.SECTION, "divider")
 
     _add_slide_number(slide, idx, total)
 
 
 def _build_bullets_slide(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.BULLETS)
+    _stamp(slide, SlideLayout.BULLETS, "top_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 0.8, 0.5, 11.733, 0.8,
@@ -222,20 +334,16 @@ def _build_bullets_slide(prs, slide_data: SlideData, idx: int, total: int):
 
 
 def _build_two_column(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.TWO_COLUMN)
+    _stamp(slide, SlideLayout.TWO_COLUMN, "top_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 0.8, 0.5, 11.733, 0.8,
                   font_size=28, font_name=Theme.TITLE_FONT,
                   color=Theme.TEXT_DARK, bold=True)
 
-    # Left column
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0.8, 1.8, 5.6, 4.8,
-               Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
-    # Left accent
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0.8, 1.8, 0.06, 4.8, Theme.PRIMARY)
+    # Left column card with accent
+    _stamp(slide, SlideLayout.TWO_COLUMN, "left_card")
 
     if slide_data.left_title:
         _add_text_box(slide, slide_data.left_title, 1.2, 2.0, 4.8, 0.5,
@@ -245,11 +353,8 @@ def _build_two_column(prs, slide_data: SlideData, idx: int, total: int):
         _add_bullets(slide, slide_data.left_column, 1.2, 2.7, 4.8, 3.5,
                      font_size=13, spacing=6)
 
-    # Right column
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 6.933, 1.8, 5.6, 4.8,
-               Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
-    # Right accent
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 6.933, 1.8, 0.06, 4.8, Theme.SECONDARY)
+    # Right column card with accent
+    _stamp(slide, SlideLayout.TWO_COLUMN, "right_card")
 
     if slide_data.right_title:
         _add_text_box(slide, slide_data.right_title, 7.333, 2.0, 4.8, 0.5,
@@ -263,9 +368,8 @@ def _build_two_column(prs, slide_data: SlideData, idx: int, total: int):
 
 
 def _build_image_left(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.IMAGE_LEFT)
+    _stamp(slide, SlideLayout.IMAGE_LEFT, "top_bar")
 
     # Image placeholder (left)
     _add_image_placeholder(slide, 0.8, 0.8, 5.2, 5.8,
@@ -285,9 +389,8 @@ def _build_image_left(prs, slide_data: SlideData, idx: int, total: int):
 
 
 def _build_image_right(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.IMAGE_RIGHT)
+    _stamp(slide, SlideLayout.IMAGE_RIGHT, "top_bar")
 
     # Title (left)
     _add_text_box(slide, slide_data.title, 0.8, 0.8, 6.0, 0.8,
@@ -307,9 +410,8 @@ def _build_image_right(prs, slide_data: SlideData, idx: int, total: int):
 
 
 def _build_key_stats(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.KEY_STATS)
+    _stamp(slide, SlideLayout.KEY_STATS, "top_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 0.8, 0.5, 11.733, 0.8,
@@ -356,9 +458,8 @@ def _build_key_stats(prs, slide_data: SlideData, idx: int, total: int):
 
 def _build_comparison(prs, slide_data: SlideData, idx: int, total: int):
     """Comparison slide - similar to two_column but with VS indicator."""
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.LIGHT_BG)
-    _add_top_accent_bar(slide)
+    slide = _new_slide(prs, SlideLayout.COMPARISON)
+    _stamp(slide, SlideLayout.COMPARISON, "top_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 0.8, 0.5, 11.733, 0.8,
@@ -366,9 +467,7 @@ def _build_comparison(prs, slide_data: SlideData, idx: int, total: int):
                   color=Theme.TEXT_DARK, bold=True)
 
     # Left card
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0.8, 1.8, 5.4, 4.8,
-               Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0.8, 1.8, 5.4, 0.5, Theme.PRIMARY)
+    _stamp(slide, SlideLayout.COMPARISON, "left_card")
 
     if slide_data.left_title:
         _add_text_box(slide, slide_data.left_title, 0.8, 1.85, 5.4, 0.4,
@@ -379,14 +478,10 @@ def _build_comparison(prs, slide_data: SlideData, idx: int, total: int):
                      font_size=13, spacing=6)
 
     # VS circle
-    _add_shape(slide, MSO_SHAPE.OVAL, 6.266, 3.6, 0.8, 0.8, Theme.ACCENT)
-    _add_text_box(slide, "VS", 6.266, 3.7, 0.8, 0.6,
-                  font_size=14, color=Theme.WHITE, bold=True, align=PP_ALIGN.CENTER)
+    _stamp(slide, SlideLayout.COMPARISON, "versus")
 
     # Right card
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 7.133, 1.8, 5.4, 4.8,
-               Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 7.133, 1.8, 5.4, 0.5, Theme.SECONDARY)
+    _stamp(slide, SlideLayout.COMPARISON, "right_card")
 
     if slide_data.right_title:
         _add_text_box(slide, slide_data.right_title, 7.133, 1.85, 5.4, 0.4,
@@ -400,11 +495,10 @@ def _build_comparison(prs, slide_data: SlideData, idx: int, total: int):
 
 
 def _build_conclusion(prs, slide_data: SlideData, idx: int, total: int):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    _set_slide_bg(slide, Theme.DARK)
+    slide = _new_slide(prs, SlideLayout.CONCLUSION)
 
     # Decorative top bar
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0, 0, 13.333, 0.06, Theme.ACCENT)
+    _stamp(slide, SlideLayout.CONCLUSION, "top_bar")
 
     # Title
     _add_text_box(slide, slide_data.title, 0.8, 1.5, 11.733, 1.0,
@@ -412,7 +506,7 @@ def _build_conclusion(prs, slide_data: SlideData, idx: int, total: int):
                   color=Theme.WHITE, bold=True, align=PP_ALIGN.CENTER)
 
     # Divider
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 5.5, 2.7, 2.333, 0.04, Theme.ACCENT)
+    _stamp(slide, SlideLayout.CONCLUSION, "divider")
 
     # Bullets
     if slide_data.bullets:
@@ -420,9 +514,7 @@ def _build_conclusion(prs, slide_data: SlideData, idx: int, total: int):
                      font_size=16, color=Theme.WHITE, spacing=12)
 
     # Footer
-    _add_shape(slide, MSO_SHAPE.RECTANGLE, 0, 6.8, 13.333, 0.7, Theme.PRIMARY)
-    _add_text_box(slide, "Thank You", 0, 6.85, 13.333, 0.5,
-                  font_size=14, color=Theme.LIGHT_ACCENT, align=PP_ALIGN.CENTER)
+    _stamp(slide, SlideLayout.CONCLUSION, "footer")
 
 
 # ──────────────────────────────────────────────
@@ -442,22 +534,38 @@ BUILDERS = {
 }
 
 
-def generate_pptx(outline: PresentationOutline) -> bytes:
-    """Generate PPTX bytes from a presentation outline."""
+def new_presentation() -> Presentation:
+    """Create an empty 16:9 presentation."""
     prs = Presentation()
 
     # Set 16:9 widescreen
     prs.slide_width = Inches(13.333)
     prs.slide_height = Inches(7.5)
+    return prs
 
-    total = len(outline.slides)
 
-    for idx, slide_data in enumerate(outline.slides, 1):
-        builder = BUILDERS.get(slide_data.layout, _build_bullets_slide)
+def add_slide(prs, slide_data: SlideData, idx: int, total: int):
+    """Append one slide using the builder for its layout."""
+    builder = BUILDERS.get(slide_data.layout, _build_bullets_slide)
+    with span("build_slide", index=idx, layout=slide_data.layout.value):
         builder(prs, slide_data, idx, total)
 
-    # Save to bytes
+
+def save_presentation(prs) -> bytes:
+    """Serialize the presentation to PPTX bytes."""
     buffer = io.BytesIO()
-    prs.save(buffer)
+    with span("prs.save"):
+        prs.save(buffer)
     buffer.seek(0)
     return buffer.read()
+
+
+def generate_pptx(outline: PresentationOutline) -> bytes:
+    """Generate PPTX bytes from a presentation outline."""
+    prs = new_presentation()
+    total = len(outline.slides)
+
+    for idx, slide_data in enumerate(outline.slides, 1):
+        add_slide(prs, slide_data, idx, total)
+
+    return save_presentation(prs)
@@ -6,18 +6,37 @@ Template-based PPTX generator.
 與 pptx_generator.py (code-drawn) 具有相同的 generate_pptx() 介面，可作為 drop-in replacement。
 
 前置需求：
-  模板須先經過 utils/fix_for_pptx_format.py 補強（Picture PH + 尺寸調整 + 清除 slides）。
+  模板須先經過 utils/compile_templates.py 編譯（Picture PH + 16:9 縮放 + 清除 slides + 修剪未使用的 layouts/母片/圖片）。
+
+每個模板讀取並清除 slides 後的 Presentation 作為原型快取於記憶體（_TEMPLATE_CACHE），
+之後的請求以 _clone_presentation() 複製原型（XML part deepcopy、二進位 part 共用 blob），
+不必重新讀檔、解壓、解析 XML 與清除 slides；模板檔案的 mtime 或大小改變時重新載入。
+
+存檔時只有新增的 slide、presentation.xml 與其 .rels、[Content_Types].xml 需要重新序列化；
+其餘未變動的 part（母片、版面、theme、圖片等）直接複製模板 zip 內已壓縮的原始 bytes，不再重新 deflate。
+原樣寫入依賴 zipfile 的內部實作，只在測試過的 Python 版本啟用；寫出的 zip 結構檢查失敗時改用 prs.save。
 """
 import io
+import copy
+import sys
+import struct
 import logging
+import weakref
+import zipfile
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
 
 from pptx import Presentation
+from pptx.package import Package
+from pptx.opc.package import XmlPart, _Relationship
+from pptx.opc.serialized import PackageWriter
 from pptx.util import Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.oxml.ns import qn
 
 from .models import PresentationOutline, SlideData, SlideLayout
+from .tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -271,18 +290,42 @@ TEMPLATE_BUILDERS = {
 # 公開入口
 # ──────────────────────────────────────────────
 
-def generate_pptx(outline: PresentationOutline, template_id: str = "ocean_gradient") -> bytes:
-    """Generate PPTX bytes from a presentation outline using specified template.
+@dataclass
+class _RawEntry:
+    """模板 zip 內一個 entry 的 ZipInfo 與壓縮後的原始 bytes。"""
+    info: zipfile.ZipInfo
+    data: bytes
 
-    Args:
-        outline: Presentation outline with slides data
-        template_id: Template file name (without .pptx extension). Defaults to "ocean_gradient".
-                    Falls back to default template if specified template doesn't exist.
 
-    Returns:
-        PPTX file as bytes
-    """
-    # Resolve template path
+@dataclass
+class _CleanedTemplate:
+    """已清除 slides 的模板原型，以檔案的 (mtime_ns, size) 判斷是否過期。"""
+    mtime_ns: int
+    size: int
+    prototype: Presentation
+    raw_entries: dict[str, _RawEntry] = field(default_factory=dict)
+
+
+@dataclass
+class _Passthrough:
+    """複製出的 part 對應的模板原始 entry；rels 只在關聯數未變時沿用。"""
+    part: Optional[_RawEntry]
+    rels: Optional[_RawEntry]
+    rel_count: int
+
+
+_TEMPLATE_CACHE: dict[Path, _CleanedTemplate] = {}
+# 複製出的 package → {part: _Passthrough}；簡報被回收時自動移除
+_PASSTHROUGH: "weakref.WeakKeyDictionary[Package, dict]" = weakref.WeakKeyDictionary()
+
+# _write_raw_entry 使用 zipfile 的內部實作（ZipFile.fp / start_dir / _didModify、ZipInfo.FileHeader），
+# 只在測試過的 Python 版本範圍內啟用；其他版本一律以 prs.save 存檔
+_PASSTHROUGH_PYTHON = ((3, 10), (3, 13))
+PASSTHROUGH_SAVE = _PASSTHROUGH_PYTHON[0] <= sys.version_info[:2] <= _PASSTHROUGH_PYTHON[1]
+
+
+def _resolve_template(template_id: str) -> Path:
+    """回傳模板路徑；模板不存在時改用預設模板。"""
     template_path = TEMPLATES_DIR / f"{template_id}.pptx"
 
     if not template_path.exists():
@@ -291,19 +334,159 @@ def generate_pptx(outline: PresentationOutline, template_id: str = "ocean_gradie
 
         if not template_path.exists():
             raise FileNotFoundError(f"Default template not found: {template_path}")
+    return template_path
+
+
+def _read_raw_entries(blob: bytes) -> dict[str, _RawEntry]:
+    """讀出 zip 內每個 entry 壓縮後的原始 bytes（不解壓）。"""
+    entries = {}
+    with zipfile.ZipFile(io.BytesIO(blob)) as zf:
+        for info in zf.infolist():
+            if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) or info.flag_bits & 0x1:
+                continue
+            # local file header：固定 30 bytes，檔名與 extra 長度位於 offset 26、28
+            name_len, extra_len = struct.unpack("<HH", blob[info.header_offset + 26:info.header_offset + 30])
+            start = info.header_offset + 30 + name_len + extra_len
+            entries[info.filename] = _RawEntry(info, blob[start:start + info.compress_size])
+    return entries
+
+
+def _cleaned_template(template_path: Path) -> _CleanedTemplate:
+    """回傳快取的已清除模板；首次使用或檔案變更時重新載入。原型本身不可修改。"""
+    stat = template_path.stat()
+    cached = _TEMPLATE_CACHE.get(template_path)
+    if cached is None or (cached.mtime_ns, cached.size) != (stat.st_mtime_ns, stat.st_size):
+        logger.info(f"Loading template: {template_path.name}")
+        blob = template_path.read_bytes()
+        prs = Presentation(io.BytesIO(blob))
+        _clean_template_slides(prs)
+        cached = _CleanedTemplate(stat.st_mtime_ns, stat.st_size, prs, _read_raw_entries(blob))
+        _TEMPLATE_CACHE[template_path] = cached
+    return cached
+
+
+def _clone_presentation(template: _CleanedTemplate) -> Presentation:
+    """複製原型的 package：XML part 以 deepcopy 複製，二進位 part（圖片等）共用不可變的 blob。"""
+    source = template.prototype.part.package
+    package = Package(None)
+    parts = {}
+    for part in source.iter_parts():
+        if isinstance(part, XmlPart):
+            parts[part] = type(part)(part.partname, part.content_type, package, copy.deepcopy(part._element))
+        else:
+            parts[part] = type(part)(part.partname, part.content_type, package, part.blob)
+
+    def copy_rels(src, dst):
+        for rId, rel in src.items():
+            target = rel.target_ref if rel.is_external else parts[rel.target_part]
+            dst._rels[rId] = _Relationship(dst._base_uri, rId, rel.reltype, rel._target_mode, target)
+
+    copy_rels(source._rels, package._rels)
+    for old, new in parts.items():
+        copy_rels(old.rels, new.rels)
+
+    # presentation part 會隨新增的 slide 改變，其餘 part 存檔時沿用模板的原始 entry
+    presentation_part = template.prototype.part
+    _PASSTHROUGH[package] = {
+        new: _Passthrough(template.raw_entries.get(old.partname.membername),
+                          template.raw_entries.get(old.partname.rels_uri.membername),
+                          len(old.rels))
+        for old, new in parts.items() if old is not presentation_part
+    }
+    return package.presentation_part.presentation
+
+
+def new_presentation(template_id: str = "ocean_gradient") -> Presentation:
+    """以快取的已清除模板原型建立新的簡報；模板不存在時改用預設模板。"""
+    template_path = _resolve_template(template_id)
+    with span("load_template", template=template_path.stem):
+        return _clone_presentation(_cleaned_template(template_path))
+
+
+def _write_raw_entry(zf: zipfile.ZipFile, entry: _RawEntry):
+    """將已壓縮的 entry 原樣寫入 zf（local header + 原始 bytes），不經過解壓與重新壓縮。"""
+    info = copy.copy(entry.info)
+    info.extra = b""
+    info.flag_bits &= ~0x08  # CRC 與大小直接寫在 local header，不使用 data descriptor
+    info.header_offset = zf.fp.tell()
+    zf.fp.write(info.FileHeader())
+    zf.fp.write(entry.data)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(info)
+    zf.NameToInfo[info.filename] = info
+    zf._didModify = True
+
+
+class _PassthroughPackageWriter(PackageWriter):
+    """python-pptx 的 PackageWriter，但未變動的 part 直接複製模板 zip 的原始 entry。"""
+
+    def __init__(self, pkg_file, pkg_rels, parts, passthrough: dict):
+        super().__init__(pkg_file, pkg_rels, parts)
+        self._passthrough = passthrough
+
+    def _write_parts(self, phys_writer):
+        zf = phys_writer._zipf
+        for part in self._parts:
+            raw = self._passthrough.get(part)
+            if raw is not None and raw.part is not None:
+                _write_raw_entry(zf, raw.part)
+            else:
+                phys_writer.write(part.partname, part.blob)
+            if part._rels:
+                if raw is not None and raw.rels is not None and len(part.rels) == raw.rel_count:
+                    _write_raw_entry(zf, raw.rels)
+                else:
+                    phys_writer.write(part.partname.rels_uri, part.rels.xml)
+
+
+def add_slide(prs, slide_data: SlideData, idx: int, total: int):
+    """依 layout 以對應的 builder 新增一頁。"""
+    builder = TEMPLATE_BUILDERS.get(slide_data.layout, _fill_bullets_slide)
+    with span("build_slide", index=idx, layout=slide_data.layout.value):
+        builder(prs, slide_data, idx, total)
+
+
+def _check_zip(pptx_bytes: bytes):
+    """確認 central directory 與每個 entry 的 local header 一致（不解壓）；不一致時拋出 BadZipFile。"""
+    with zipfile.ZipFile(io.BytesIO(pptx_bytes)) as zf:
+        for info in zf.infolist():
+            zf.open(info).close()
+
+
+def save_presentation(prs) -> bytes:
+    """輸出 PPTX bytes。"""
+    with span("prs.save"):
+        package = prs.part.package
+        passthrough = _PASSTHROUGH.get(package) if PASSTHROUGH_SAVE else None
+        if passthrough is not None:
+            buffer = io.BytesIO()
+            try:
+                _PassthroughPackageWriter(buffer, package._rels, tuple(package.iter_parts()), passthrough)._write()
+                pptx_bytes = buffer.getvalue()
+                _check_zip(pptx_bytes)
+                return pptx_bytes
+            except Exception:
+                logger.exception("⚠️ Raw-entry save failed, falling back to prs.save")
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        return buffer.getvalue()
 
-    logger.info(f"Loading template: {template_path.name}")
-    prs = Presentation(str(template_path))
-    _clean_template_slides(prs)
 
+def generate_pptx(outline: PresentationOutline, template_id: str = "ocean_gradient") -> bytes:
+    """Generate PPTX bytes from a presentation outline using specified template.
+
+    Args:
+        outline: Presentation outline with slides data
+        template_id: Template file name (without .pptx extension). Defaults to "ocean_gradient".
+                    Falls back to default template if specified template doesn't exist.
+
+    Returns:
+        PPTX file as bytes
+    """
+    prs = new_presentation(template_id)
     total = len(outline.slides)
 
     for idx, slide_data in enumerate(outline.slides, 1):
-        builder = TEMPLATE_BUILDERS.get(slide_data.layout, _fill_bullets_slide)
-        builder(prs, slide_data, idx, total)
+        add_slide(prs, slide_data, idx, total)
 
-    # Save to bytes
-    buffer = io.BytesIO()
-    prs.save(buffer)
-    buffer.seek(0)
-    return buffer.read()
+    return save_presentation(prs)
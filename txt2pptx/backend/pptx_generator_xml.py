@@ -0,0 +1,463 @@
+# txt2pptx/backend/pptx_generator_xml.py
+"""Direct-XML engine for the code-drawn generator.
+
+與 pptx_generator.py 具有相同的 generate_pptx(outline) -> bytes 介面與相同的版面，
+但不經過 python-pptx 的物件模型：
+
+  - 每種 shape（text box / bullets / rectangle / oval）的 XML 是預先編好的字串片段，
+    只代入座標（EMU）、顏色與跳脫過的文字；背景與固定的 slide 開頭依顏色預先組好
+  - 套件（zip）直接組裝：python-pptx 內建的 default.pptx 每個 process 只讀一次，
+    只有 [Content_Types].xml、presentation.xml 與其 .rels 需要依投影片數改寫，其餘原樣寫入
+
+產生的 shape 順序、id、名稱、座標與文字格式與 python-pptx engine 相同（test_pptx_xml_engine.py 逐一比對）。
+版面修改時兩個 engine 需同步更新。
+"""
+import io
+import os
+import re
+import zipfile
+from typing import Optional
+from xml.sax.saxutils import escape
+
+import pptx
+from lxml import etree
+
+from .models import PresentationOutline, SlideData, SlideLayout
+from .pptx_generator import Theme
+from .tracing import span
+
+# ──────────────────────────────────────────────
+# Package skeleton (python-pptx default.pptx)
+# ──────────────────────────────────────────────
+
+DEFAULT_PPTX = os.path.join(os.path.dirname(pptx.__file__), "templates", "default.pptx")
+
+_XML_DECL = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+_NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_RT_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+_CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+_BLANK_LAYOUT = "../slideLayouts/slideLayout7.xml"  # prs.slide_layouts[6]
+
+_SLIDE_RELS = (
+    _XML_DECL
+    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout" '
+    f'Target="{_BLANK_LAYOUT}"/></Relationships>'
+).encode("utf-8")
+
+
+class _PackageSkeleton:
+    """default.pptx 拆成「原樣寫入的 part」與三個需要依投影片數改寫的 part。"""
+
+    def __init__(self, path: str):
+        with zipfile.ZipFile(path) as zf:
+            parts = [(name, zf.read(name)) for name in zf.namelist()]
+        contents = dict(parts)
+        self.static_parts = [
+            (name, data) for name, data in parts
+            if name not in ("[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels")
+        ]
+
+        # presentation.xml：16:9 投影片大小，並在 sldMasterIdLst 後留下 sldIdLst 的位置
+        root = etree.fromstring(contents["ppt/presentation.xml"])
+        sld_sz = root.find(f"{{{_NS_P}}}sldSz")
+        sld_sz.set("cx", str(Theme.SLIDE_W))
+        sld_sz.set("cy", str(Theme.SLIDE_H))
+        sld_sz.addprevious(etree.Element(f"{{{_NS_P}}}sldIdLst"))
+        xml = _XML_DECL + etree.tostring(root, encoding="unicode")
+        self.presentation_head, self.presentation_tail = xml.split("<p:sldIdLst/>")
+
+        # presentation.xml.rels：slide 的 rId 接在既有 relationship 之後
+        rels = contents["ppt/_rels/presentation.xml.rels"].decode("utf-8")
+        self.first_slide_rid = max(int(n) for n in re.findall(r'Id="rId(\d+)"', rels)) + 1
+        self.rels_head, self.rels_tail = rels.rsplit("</Relationships>", 1)
+        self.rels_tail = "</Relationships>" + self.rels_tail
+
+        content_types = contents["[Content_Types].xml"].decode("utf-8")
+        self.types_head, self.types_tail = content_types.rsplit("</Types>", 1)
+        self.types_tail = "</Types>" + self.types_tail
+
+    def assemble(self, slides: list[str]) -> bytes:
+        """以 slide XML 組成完整的 PPTX bytes。"""
+        n = len(slides)
+        rids = range(self.first_slide_rid, self.first_slide_rid + n)
+        presentation = (
+            self.presentation_head
+            + "<p:sldIdLst>"
+            + "".join(f'<p:sldId id="{256 + i}" r:id="rId{rid}"/>' for i, rid in enumerate(rids))
+            + "</p:sldIdLst>"
+            + self.presentation_tail
+        )
+        rels = (
+            self.rels_head
+            + "".join(f'<Relationship Id="rId{rid}" Type="{_RT_SLIDE}" Target="slides/slide{i}.xml"/>'
+                      for i, rid in enumerate(rids, 1))
+            + self.rels_tail
+        )
+        content_types = (
+            self.types_head
+            + "".join(f'<Override PartName="/ppt/slides/slide{i}.xml" ContentType="{_CT_SLIDE}"/>'
+                      for i in range(1, n + 1))
+            + self.types_tail
+        )
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", content_types.encode("utf-8"))
+            for name, data in self.static_parts:
+                zf.writestr(name, data)
+            zf.writestr("ppt/presentation.xml", presentation.encode("utf-8"))
+            zf.writestr("ppt/_rels/presentation.xml.rels", rels.encode("utf-8"))
+            for i, slide_xml in enumerate(slides, 1):
+                zf.writestr(f"ppt/slides/slide{i}.xml", slide_xml.encode("utf-8"))
+                zf.writestr(f"ppt/slides/_rels/slide{i}.xml.rels", _SLIDE_RELS)
+        return buffer.getvalue()
+
+
+_skeleton: Optional[_PackageSkeleton] = None
+
+
+def _package_skeleton() -> _PackageSkeleton:
+    global _skeleton
+    if _skeleton is None:
+        _skeleton = _PackageSkeleton(DEFAULT_PPTX)
+    return _skeleton
+
+
+# ──────────────────────────────────────────────
+# Precompiled XML fragments
+# ──────────────────────────────────────────────
+
+_SLIDE_HEAD = (
+    _XML_DECL
+    + '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<p:cSld><p:bg><p:bgPr><a:solidFill><a:srgbClr val="%s"/></a:solidFill><a:effectLst/></p:bgPr></p:bg>'
+    '<p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr><p:grpSpPr/>'
+)
+_SLIDE_TAIL = "</p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>"
+
+# 依背景色預先組好的 slide 開頭
+_SLIDE_HEADS = {str(color): _SLIDE_HEAD % str(color) for color in (Theme.DARK, Theme.PRIMARY, Theme.LIGHT_BG)}
+
+_XFRM = '<a:xfrm><a:off x="%d" y="%d"/><a:ext cx="%d" cy="%d"/></a:xfrm>'
+
+_AUTO_SHAPE = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="%d" name="%s %d"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr>' + _XFRM + '<a:prstGeom prst="%s"><a:avLst/></a:prstGeom>'
+    '<a:solidFill><a:srgbClr val="%s"/></a:solidFill>%s</p:spPr>'
+    '<p:style><a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef></p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p></p:txBody></p:sp>'
+)
+_NO_LINE = "<a:ln><a:noFill/></a:ln>"
+_LINE = '<a:ln w="%d"><a:solidFill><a:srgbClr val="%s"/></a:solidFill></a:ln>'
+
+# (名稱, prstGeom) — 名稱與 python-pptx 的 autoshape 命名相同
+RECTANGLE = ("Rectangle", "rect")
+OVAL = ("Oval", "ellipse")
+
+_TEXT_BOX = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="%d" name="TextBox %d"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr>' + _XFRM + '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+    '<p:txBody><a:bodyPr wrap="square"><a:spAutoFit/></a:bodyPr><a:lstStyle/>%s</p:txBody></p:sp>'
+)
+_TEXT_PARA = (
+    '<a:p><a:pPr algn="%s"><a:spcAft><a:spcPts val="400"/></a:spcAft>'
+    '<a:defRPr sz="%d" b="%d" i="%d"><a:solidFill><a:srgbClr val="%s"/></a:solidFill>'
+    '<a:latin typeface="%s"/></a:defRPr></a:pPr>%s</a:p>'
+)
+_BULLET_PARA = (
+    '<a:p><a:pPr><a:spcAft><a:spcPts val="%d"/></a:spcAft>'
+    '<a:defRPr sz="%d"><a:solidFill><a:srgbClr val="%s"/></a:solidFill>'
+    '<a:latin typeface="%s"/></a:defRPr><a:buChar char="●"/></a:pPr>%s</a:p>'
+)
+
+LEFT, CENTER, RIGHT = "l", "ctr", "r"
+
+_EMU_PER_INCH = 914400
+_EMU_PER_PT = 12700
+_LINE_BREAK = re.compile("\n|\v")
+_CTRL_CHARS = re.compile(r"([\x00-\x08\x0B-\x1F])")
+
+
+def _emu(inches: float) -> int:
+    """與 pptx.util.Inches 相同的換算（截斷為整數 EMU）。"""
+    return int(inches * _EMU_PER_INCH)
+
+
+def _runs(text: str) -> str:
+    """文字 → a:r / a:br（與 python-pptx 的 paragraph.text 相同：\\n、\\v 換行，其餘控制字元跳脫）。"""
+    out = []
+    for i, part in enumerate(_LINE_BREAK.split(text)):
+        if i:
+            out.append("<a:br/>")
+        if part:
+            part = _CTRL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group(1)), part)
+            out.append(f"<a:r><a:t>{escape(part)}</a:t></a:r>")
+    return "".join(out)
+
+
+class _SlideXml:
+    """依序累積一張投影片的 shape XML；shape id 從 2 起算（1 是 spTree）。"""
+
+    def __init__(self, bg_color):
+        self.parts = [_SLIDE_HEADS.get(str(bg_color)) or _SLIDE_HEAD % str(bg_color)]
+        self.next_id = 2
+
+    def _id(self) -> int:
+        shape_id = self.next_id
+        self.next_id += 1
+        return shape_id
+
+    def shape(self, kind, x, y, w, h, fill_color, *, line_color=None, line_width=0):
+        name, prst = kind
+        line = _LINE % (int(line_width * _EMU_PER_PT), line_color) if line_color else _NO_LINE
+        shape_id = self._id()
+        self.parts.append(_AUTO_SHAPE % (shape_id, name, shape_id - 1, _emu(x), _emu(y), _emu(w), _emu(h),
+                                         prst, fill_color, line))
+
+    def text_box(self, text, x, y, w, h, *, font_size=14, font_name=None, color=None,
+                 bold=False, italic=False, align=LEFT):
+        para = _TEXT_PARA % (align, font_size * 100, bold, italic, color or Theme.TEXT_DARK,
+                             font_name or Theme.BODY_FONT, _runs(text))
+        shape_id = self._id()
+        self.parts.append(_TEXT_BOX % (shape_id, shape_id - 1, _emu(x), _emu(y), _emu(w), _emu(h), para))
+
+    def bullets(self, items: list[str], x, y, w, h, *, font_size=14, color=None, spacing=8):
+        color = color or Theme.TEXT_DARK
+        paras = "".join(_BULLET_PARA % (spacing * 100, font_size * 100, color, Theme.BODY_FONT, _runs(item))
+                        for item in items or []) or "<a:p/>"
+        shape_id = self._id()
+        self.parts.append(_TEXT_BOX % (shape_id, shape_id - 1, _emu(x), _emu(y), _emu(w), _emu(h), paras))
+
+    def image_placeholder(self, x, y, w, h, label="圖片區域"):
+        self.shape(RECTANGLE, x, y, w, h, "E2E8F0")
+        cx, cy = x + w/2 - 0.3, y + h/2 - 0.3
+        self.shape(RECTANGLE, cx, cy, 0.6, 0.6, "CBD5E1")
+        self.text_box(label, x, y + h/2 + 0.4, w, 0.4, font_size=10, color=Theme.TEXT_MUTED, align=CENTER)
+
+    def slide_number(self, num: int, total: int):
+        self.text_box(f"{num} / {total}", 11.5, 7.0, 1.3, 0.35,
+                      font_size=9, color=Theme.TEXT_MUTED, align=RIGHT)
+
+    def top_accent_bar(self):
+        self.shape(RECTANGLE, 0, 0, 13.333, 0.06, Theme.ACCENT)
+
+    def xml(self) -> str:
+        return "".join(self.parts) + _SLIDE_TAIL
+
+
+# ──────────────────────────────────────────────
+# Slide Builders（座標與 pptx_generator.py 相同）
+# ──────────────────────────────────────────────
+
+def _build_title_slide(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.DARK)
+    s.shape(RECTANGLE, 0.8, 1.8, 0.06, 3.8, Theme.ACCENT)
+    s.text_box(slide_data.title, 1.3, 2.0, 10, 2.0, font_size=44, font_name=Theme.TITLE_FONT,
+               color=Theme.WHITE, bold=True)
+    if slide_data.subtitle:
+        s.text_box(slide_data.subtitle, 1.3, 4.2, 10, 1.0, font_size=20, color=Theme.ACCENT)
+    s.shape(RECTANGLE, 0, 6.8, 13.333, 0.7, Theme.PRIMARY)
+    return s
+
+
+def _build_section_header(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.PRIMARY)
+    s.text_box(slide_data.title, 1, 2.5, 11.333, 1.5, font_size=36, font_name=Theme.TITLE_FONT,
+               color=Theme.WHITE, bold=True, align=CENTER)
+    if slide_data.subtitle:
+        s.text_box(slide_data.subtitle, 2, 4.2, 9.333, 0.8, font_size=18, color=Theme.LIGHT_ACCENT, align=CENTER)
+    s.shape(RECTANGLE, 5.5, 4.0, 2.333, 0.04, Theme.ACCENT)
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_bullets_slide(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.text_box(slide_data.title, 0.8, 0.5, 11.733, 0.8, font_size=28, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+    if slide_data.bullets:
+        card_y = 1.6
+        card_h_each = min(1.0, 4.8 / len(slide_data.bullets))
+        for i, bullet in enumerate(slide_data.bullets[:5]):
+            by = card_y + i * (card_h_each + 0.15)
+            s.shape(RECTANGLE, 0.8, by, 7.5, card_h_each,
+                    Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+            s.shape(OVAL, 1.1, by + card_h_each/2 - 0.1, 0.2, 0.2, Theme.ACCENT)
+            s.text_box(bullet, 1.6, by + 0.1, 6.5, card_h_each - 0.2, font_size=14, color=Theme.TEXT_DARK)
+    s.image_placeholder(9.0, 1.6, 3.8, 4.8, slide_data.image_prompt or "插圖")
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_two_column(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.text_box(slide_data.title, 0.8, 0.5, 11.733, 0.8, font_size=28, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+
+    s.shape(RECTANGLE, 0.8, 1.8, 5.6, 4.8, Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+    s.shape(RECTANGLE, 0.8, 1.8, 0.06, 4.8, Theme.PRIMARY)
+    if slide_data.left_title:
+        s.text_box(slide_data.left_title, 1.2, 2.0, 4.8, 0.5, font_size=18, font_name=Theme.TITLE_FONT,
+                   color=Theme.PRIMARY, bold=True)
+    if slide_data.left_column:
+        s.bullets(slide_data.left_column, 1.2, 2.7, 4.8, 3.5, font_size=13, spacing=6)
+
+    s.shape(RECTANGLE, 6.933, 1.8, 5.6, 4.8, Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+    s.shape(RECTANGLE, 6.933, 1.8, 0.06, 4.8, Theme.SECONDARY)
+    if slide_data.right_title:
+        s.text_box(slide_data.right_title, 7.333, 2.0, 4.8, 0.5, font_size=18, font_name=Theme.TITLE_FONT,
+                   color=Theme.SECONDARY, bold=True)
+    if slide_data.right_column:
+        s.bullets(slide_data.right_column, 7.333, 2.7, 4.8, 3.5, font_size=13, spacing=6)
+
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_image_left(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.image_placeholder(0.8, 0.8, 5.2, 5.8, slide_data.image_prompt or "插圖")
+    s.text_box(slide_data.title, 6.6, 0.8, 6.0, 0.8, font_size=26, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+    if slide_data.bullets:
+        s.bullets(slide_data.bullets, 6.6, 2.0, 6.0, 4.5, font_size=14, spacing=10)
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_image_right(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.text_box(slide_data.title, 0.8, 0.8, 6.0, 0.8, font_size=26, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+    if slide_data.bullets:
+        s.bullets(slide_data.bullets, 0.8, 2.0, 6.0, 4.5, font_size=14, spacing=10)
+    s.image_placeholder(7.333, 0.8, 5.2, 5.8, slide_data.image_prompt or "插圖")
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_key_stats(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.text_box(slide_data.title, 0.8, 0.5, 11.733, 0.8, font_size=28, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+
+    stats = slide_data.stats or []
+    n = len(stats)
+    if n == 0:
+        return s
+
+    card_w = min(3.2, (11.733 - (n - 1) * 0.4) / n)
+    total_w = n * card_w + (n - 1) * 0.4
+    start_x = (13.333 - total_w) / 2
+
+    for i, stat in enumerate(stats[:4]):
+        cx = start_x + i * (card_w + 0.4)
+        cy = 2.2
+        s.shape(RECTANGLE, cx, cy, card_w, 3.5, Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+        s.shape(RECTANGLE, cx, cy, card_w, 0.06, Theme.ACCENT)
+        circle_x = cx + card_w / 2 - 0.35
+        s.shape(OVAL, circle_x, cy + 0.4, 0.7, 0.7, Theme.STAT_BG)
+        s.text_box(stat.value, cx, cy + 1.3, card_w, 1.0, font_size=36, font_name=Theme.TITLE_FONT,
+                   color=Theme.PRIMARY, bold=True, align=CENTER)
+        s.text_box(stat.label, cx, cy + 2.4, card_w, 0.6, font_size=13, color=Theme.TEXT_MUTED, align=CENTER)
+
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_comparison(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.LIGHT_BG)
+    s.top_accent_bar()
+    s.text_box(slide_data.title, 0.8, 0.5, 11.733, 0.8, font_size=28, font_name=Theme.TITLE_FONT,
+               color=Theme.TEXT_DARK, bold=True)
+
+    s.shape(RECTANGLE, 0.8, 1.8, 5.4, 4.8, Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+    s.shape(RECTANGLE, 0.8, 1.8, 5.4, 0.5, Theme.PRIMARY)
+    if slide_data.left_title:
+        s.text_box(slide_data.left_title, 0.8, 1.85, 5.4, 0.4, font_size=16, font_name=Theme.TITLE_FONT,
+                   color=Theme.WHITE, bold=True, align=CENTER)
+    if slide_data.left_column:
+        s.bullets(slide_data.left_column, 1.2, 2.6, 4.6, 3.6, font_size=13, spacing=6)
+
+    s.shape(OVAL, 6.266, 3.6, 0.8, 0.8, Theme.ACCENT)
+    s.text_box("VS", 6.266, 3.7, 0.8, 0.6, font_size=14, color=Theme.WHITE, bold=True, align=CENTER)
+
+    s.shape(RECTANGLE, 7.133, 1.8, 5.4, 4.8, Theme.CARD_BG, line_color=Theme.CARD_BORDER, line_width=0.5)
+    s.shape(RECTANGLE, 7.133, 1.8, 5.4, 0.5, Theme.SECONDARY)
+    if slide_data.right_title:
+        s.text_box(slide_data.right_title, 7.133, 1.85, 5.4, 0.4, font_size=16, font_name=Theme.TITLE_FONT,
+                   color=Theme.WHITE, bold=True, align=CENTER)
+    if slide_data.right_column:
+        s.bullets(slide_data.right_column, 7.533, 2.6, 4.6, 3.6, font_size=13, spacing=6)
+
+    s.slide_number(idx, total)
+    return s
+
+
+def _build_conclusion(slide_data: SlideData, idx: int, total: int) -> _SlideXml:
+    s = _SlideXml(Theme.DARK)
+    s.shape(RECTANGLE, 0, 0, 13.333, 0.06, Theme.ACCENT)
+    s.text_box(slide_data.title, 0.8, 1.5, 11.733, 1.0, font_size=36, font_name=Theme.TITLE_FONT,
+               color=Theme.WHITE, bold=True, align=CENTER)
+    s.shape(RECTANGLE, 5.5, 2.7, 2.333, 0.04, Theme.ACCENT)
+    if slide_data.bullets:
+        s.bullets(slide_data.bullets, 2.5, 3.2, 8.333, 3.5, font_size=16, color=Theme.WHITE, spacing=12)
+    s.shape(RECTANGLE, 0, 6.8, 13.333, 0.7, Theme.PRIMARY)
+    s.text_box("Thank You", 0, 6.85, 13.333, 0.5, font_size=14, color=Theme.LIGHT_ACCENT, align=CENTER)
+    return s
+
+
+BUILDERS = {
+    SlideLayout.TITLE:      _build_title_slide,
+    SlideLayout.SECTION:    _build_section_header,
+    SlideLayout.BULLETS:    _build_bullets_slide,
+    SlideLayout.TWO_COLUMN: _build_two_column,
+    SlideLayout.IMAGE_LEFT: _build_image_left,
+    SlideLayout.IMAGE_RIGHT: _build_image_right,
+    SlideLayout.KEY_STATS:  _build_key_stats,
+    SlideLayout.COMPARISON: _build_comparison,
+    SlideLayout.CONCLUSION: _build_conclusion,
+}
+
+
+def build_slide_xml(slide_data: SlideData, idx: int, total: int) -> str:
+    """回傳一張投影片的 slide XML。"""
+    builder = BUILDERS.get(slide_data.layout, _build_bullets_slide)
+    with span("build_slide", index=idx, layout=slide_data.layout.value):
+        return builder(slide_data, idx, total).xml()
+
+
+def new_presentation() -> list[str]:
+    """逐頁建立用的空簡報：依序累積的 slide XML（介面同 pptx_generator.new_presentation）。"""
+    return []
+
+
+def add_slide(slides: list[str], slide_data: SlideData, idx: int, total: int):
+    """Append one slide using the builder for its layout."""
+    slides.append(build_slide_xml(slide_data, idx, total))
+
+
+def save_presentation(slides: list[str]) -> bytes:
+    """以累積的 slide XML 組成 PPTX bytes。"""
+    with span("package.write"):
+        return _package_skeleton().assemble(slides)
+
+
+def generate_pptx(outline: PresentationOutline) -> bytes:
+    """Generate PPTX bytes from a presentation outline."""
+    slides = new_presentation()
+    total = len(outline.slides)
+    for idx, slide_data in enumerate(outline.slides, 1):
+        add_slide(slides, slide_data, idx, total)
+    return save_presentation(slides)
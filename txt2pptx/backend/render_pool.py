@@ -0,0 +1,175 @@
+# txt2pptx/backend/render_pool.py
+"""Process-pool executor for CPU-bound python-pptx rendering.
+
+python-pptx 渲染是同步且吃 CPU 的工作，直接在 async handler 內呼叫會卡住整個
+uvicorn worker（包括 /api/health 與下載）。此模組將渲染移到獨立的 process pool：
+
+  - RENDER_WORKERS：pool 大小，同時也是同時渲染數上限（0 = 以 thread 執行，不開 process）
+  - RENDER_MAX_TASKS_PER_WORKER：每個 worker process 處理 N 次渲染後重啟，回收 lxml 記憶體
+  - 每次渲染回報排隊等待時間（queue wait）與實際渲染時間（render time）
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Optional
+
+from .models import PresentationOutline
+from .tracing import Trace, trace_request, attach
+from . import pptx_generator, pptx_generator_xml
+from .pptx_generator_template import generate_pptx as generate_pptx_template
+from .metrics import (
+    RENDER_SECONDS, RENDER_QUEUE_WAIT_SECONDS, RENDER_IN_FLIGHT, RENDER_QUEUE_DEPTH, engine_labels,
+)
+
+logger = logging.getLogger(__name__)
+
+# ── Render pool 配置 ──
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "2"))
+RENDER_MAX_TASKS_PER_WORKER = int(os.environ.get("RENDER_MAX_TASKS_PER_WORKER", "50"))
+# code-drawn 簡報的渲染引擎：xml = 直接輸出 slide XML（pptx_generator_xml），pptx = python-pptx 物件模型
+CODE_DRAWN_ENGINE = os.environ.get("CODE_DRAWN_ENGINE", "xml")
+
+
+def render_pptx(outline: PresentationOutline, template: str) -> bytes:
+    """依模板選擇對應的 generator 產生 PPTX bytes（同步）。"""
+    if template == "code_drawn":
+        logger.info(f"Using code-drawn generator ({CODE_DRAWN_ENGINE} engine)")
+        if CODE_DRAWN_ENGINE == "pptx":
+            return pptx_generator.generate_pptx(outline)
+        return pptx_generator_xml.generate_pptx(outline)
+    logger.info(f"Using template generator with template: {template}")
+    return generate_pptx_template(outline, template_id=template)
+
+
+def _render_in_worker(outline: PresentationOutline, template: str) -> tuple[bytes, float, float, list[dict]]:
+    """Worker 端入口：回傳 (pptx_bytes, 開始時間 epoch, 渲染耗時 ms, worker 內記錄的 span)。"""
+    trace = Trace("render_worker")
+    with trace_request(trace, record=False):
+        pptx_bytes = render_pptx(outline, template)
+    spans = [child.to_dict() for child in trace.root.children]
+    return pptx_bytes, trace.started_at, trace.root.duration_ms, spans
+
+
+@dataclass
+class RenderResult:
+    pptx_bytes: bytes
+    queue_wait_ms: float
+    render_ms: float
+
+
+class RenderStats:
+    """累計渲染次數、排隊等待與渲染時間。"""
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.queue_wait_ms_total = 0.0
+        self.queue_wait_ms_max = 0.0
+        self.render_ms_total = 0.0
+        self.render_ms_max = 0.0
+
+    def record(self, queue_wait_ms: float, render_ms: float):
+        self.completed += 1
+        self.queue_wait_ms_total += queue_wait_ms
+        self.queue_wait_ms_max = max(self.queue_wait_ms_max, queue_wait_ms)
+        self.render_ms_total += render_ms
+        self.render_ms_max = max(self.render_ms_max, render_ms)
+
+    def snapshot(self) -> dict:
+        n = self.completed or 1
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "queue_wait_ms_avg": round(self.queue_wait_ms_total / n, 1),
+            "queue_wait_ms_max": round(self.queue_wait_ms_max, 1),
+            "render_ms_avg": round(self.render_ms_total / n, 1),
+            "render_ms_max": round(self.render_ms_max, 1),
+        }
+
+
+class RenderExecutor:
+    """以有限並行度在 process pool（或 thread）中執行渲染。"""
+
+    def __init__(self, workers: int = RENDER_WORKERS,
+                 max_tasks_per_worker: int = RENDER_MAX_TASKS_PER_WORKER):
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.stats = RenderStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                max_tasks_per_child=self.max_tasks_per_worker or None,
+            )
+            logger.info(
+                f"🔧 Render pool started: workers={self.workers}, "
+                f"max_tasks_per_worker={self.max_tasks_per_worker}"
+            )
+        return self._pool
+
+    async def render(self, outline: PresentationOutline, template: str) -> RenderResult:
+        """排隊取得渲染名額後執行渲染，不阻塞 event loop。"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(self.workers, 1))
+
+        submitted_at = time.time()
+        self.stats.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats.waiting -= 1
+
+        self.stats.in_flight += 1
+        try:
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                pptx_bytes, started_at, render_ms, spans = await loop.run_in_executor(
+                    self._get_pool(), _render_in_worker, outline, template
+                )
+            else:
+                pptx_bytes, started_at, render_ms, spans = await asyncio.to_thread(
+                    _render_in_worker, outline, template
+                )
+        except BrokenProcessPool:
+            # worker 異常終止（例如 OOM），丟棄 pool 讓下次重建
+            self.stats.failed += 1
+            self._pool = None
+            raise
+        except Exception:
+            self.stats.failed += 1
+            raise
+        finally:
+            self.stats.in_flight -= 1
+            self._semaphore.release()
+
+        queue_wait_ms = max(0.0, (started_at - submitted_at) * 1000)
+        attach(spans, started_at)
+        self.stats.record(queue_wait_ms, render_ms)
+        RENDER_SECONDS.labels(*engine_labels(template)).observe(render_ms / 1000)
+        RENDER_QUEUE_WAIT_SECONDS.observe(queue_wait_ms / 1000)
+        logger.info(
+            f"🖨️ Rendered {len(outline.slides)} slides ({template}): "
+            f"queue_wait={queue_wait_ms:.0f} ms, render={render_ms:.0f} ms"
+        )
+        return RenderResult(pptx_bytes, queue_wait_ms, render_ms)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+render_executor = RenderExecutor()
+RENDER_IN_FLIGHT.set_function(lambda: render_executor.stats.in_flight)
+RENDER_QUEUE_DEPTH.set_function(lambda: render_executor.stats.waiting)
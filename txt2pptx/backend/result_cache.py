@@ -0,0 +1,96 @@
+# txt2pptx/backend/result_cache.py
+"""Content-addressed cache of generated decks.
+
+相同的 (text, num_slides, language, style, template, model, prompt 版本) 會得到相同的 key，
+生成結果以 key 命名存放在 GENERATED_DIR：
+  {key}.pptx          簡報本體（即下載檔名）
+  {key}.outline.json  對應的大綱，命中時直接回傳給前端
+
+命中時完全略過 LLM 與渲染。demo fallback 的結果不寫入快取。
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .models import GenerateRequest, PresentationOutline
+from .llm_service import PROMPT_VERSION, current_model
+
+logger = logging.getLogger(__name__)
+
+# 檔名使用 key 的前 KEY_LENGTH 個 hex 字元
+KEY_LENGTH = 16
+
+
+def result_key(request: GenerateRequest) -> str:
+    """計算生成請求的內容位址 key。"""
+    material = json.dumps({
+        "text": request.text,
+        "num_slides": request.num_slides,
+        "language": request.language,
+        "style": request.style,
+        "template": request.template,
+        "model": current_model(),
+        "prompt_version": PROMPT_VERSION,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:KEY_LENGTH]
+
+
+def _atomic_write(path: Path, data: bytes):
+    """寫入各自獨立的暫存檔再 os.replace；合併的相同請求會同時寫入同一個 key。"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ResultCache:
+    """以 key 為檔名的生成結果快取，附 hit / miss 計數。"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.pptx", self.directory / f"{key}.outline.json"
+
+    def contains(self, key: str) -> bool:
+        pptx_path, outline_path = self._paths(key)
+        return pptx_path.exists() and outline_path.exists()
+
+    def lookup(self, key: str) -> Optional[tuple[str, PresentationOutline]]:
+        """命中時回傳 (filename, outline)。"""
+        pptx_path, outline_path = self._paths(key)
+        if pptx_path.exists() and outline_path.exists():
+            try:
+                outline = PresentationOutline.model_validate_json(outline_path.read_bytes())
+            except Exception as e:
+                logger.warning(f"Result cache entry {key} unreadable, regenerating: {e}")
+            else:
+                self.hits += 1
+                return pptx_path.name, outline
+        self.misses += 1
+        return None
+
+    def store(self, key: str, pptx_bytes: bytes, outline: PresentationOutline) -> str:
+        """寫入快取並回傳檔名；大綱最後寫入，確保 lookup 不會看到不完整的項目。"""
+        pptx_path, outline_path = self._paths(key)
+        _atomic_write(pptx_path, pptx_bytes)
+        _atomic_write(outline_path, outline.model_dump_json().encode("utf-8"))
+        return pptx_path.name
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
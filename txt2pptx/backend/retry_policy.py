@@ -0,0 +1,221 @@
+# txt2pptx/backend/retry_policy.py
+"""Error-classified retry policy with backoff, jitter and adaptive timeouts.
+
+原本任何例外都以固定的 RETRY_DELAY 重試 MAX_RETRIES 次，timeout 固定 600 秒：
+模型不存在（404）也會白白重試三次，而 timeout 與實際觀察到的延遲無關。
+改為先將錯誤分類，再依類別決定是否重試與退避時間：
+
+  connect       無法連線 / 連線中斷（Ollama 未啟動或重啟中）   重試，指數退避
+  http_4xx      請求本身有誤（404 模型不存在、400 參數錯誤）      不重試
+  throttled     HTTP 408 / 429                                   重試，較長的退避
+  http_5xx      Ollama 內部錯誤                                  重試，指數退避
+  timeout       超過本次嘗試的 timeout                           重試，並放寬下一次的 timeout
+  json_decode   模型輸出不是合法 JSON                            重試（重新取樣），短暫退避
+  validation    JSON 不符合 PresentationOutline schema            重試（重新取樣），短暫退避
+  circuit_open  所有 backend 的 circuit breaker 都是 open           不重試，直接 fallback
+  other         其他例外                                         重試，與原本行為相同
+
+退避時間為 base × multiplier^(n-1)（上限 LLM_RETRY_MAX_DELAY），再套用 equal jitter
+（取上限的 50%～100%），避免多個請求在 Ollama 恢復的同一瞬間一起重試。
+各類別的 base 預設為 LLM_RETRY_DELAY 的倍數，可用 LLM_RETRY_DELAY_<CLASS> 個別設定；
+LLM_NO_RETRY 列出不重試的類別（預設 http_4xx）。
+
+Timeout 由最近 LLM_LATENCY_WINDOW 次成功呼叫的「每頁耗時」的 LLM_TIMEOUT_PERCENTILE
+百分位推算：該值 × 頁數 × LLM_TIMEOUT_MULTIPLIER，限制在 [LLM_TIMEOUT_MIN, LLM_TIMEOUT]。
+樣本不足 LLM_TIMEOUT_MIN_SAMPLES 時使用 LLM_TIMEOUT；同一請求每發生一次 timeout，
+下一次嘗試的 timeout 乘以 LLM_TIMEOUT_BACKOFF。
+"""
+import os
+import json
+import math
+import random
+import logging
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+import httpx
+from pydantic import ValidationError
+
+from .llm_client import LLM_TIMEOUT
+from .circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# ── 重試機制配置 ──
+# 可通過環境變數配置，提供靈活性和可測試性
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+RETRY_DELAY = float(os.environ.get("LLM_RETRY_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.environ.get("LLM_RETRY_MAX_DELAY", "30"))
+LLM_NO_RETRY = {
+    name.strip() for name in os.environ.get("LLM_NO_RETRY", "http_4xx").split(",") if name.strip()
+}
+
+# ── Adaptive timeout 配置 ──
+LLM_LATENCY_WINDOW = int(os.environ.get("LLM_LATENCY_WINDOW", "50"))
+LLM_TIMEOUT_PERCENTILE = float(os.environ.get("LLM_TIMEOUT_PERCENTILE", "95"))
+LLM_TIMEOUT_MULTIPLIER = float(os.environ.get("LLM_TIMEOUT_MULTIPLIER", "3"))
+LLM_TIMEOUT_MIN = float(os.environ.get("LLM_TIMEOUT_MIN", "60"))
+LLM_TIMEOUT_MIN_SAMPLES = int(os.environ.get("LLM_TIMEOUT_MIN_SAMPLES", "5"))
+LLM_TIMEOUT_BACKOFF = float(os.environ.get("LLM_TIMEOUT_BACKOFF", "2"))
+
+# 視為暫時性（可重試）的 4xx
+THROTTLED_STATUSES = (408, 429)
+
+
+class ErrorClass(str, Enum):
+    CONNECT = "connect"
+    HTTP_4XX = "http_4xx"
+    THROTTLED = "throttled"
+    HTTP_5XX = "http_5xx"
+    TIMEOUT = "timeout"
+    JSON_DECODE = "json_decode"
+    VALIDATION = "validation"
+    CIRCUIT_OPEN = "circuit_open"
+    OTHER = "other"
+
+
+def classify_error(exc: BaseException) -> ErrorClass:
+    """將一次 LLM 嘗試的例外分類。"""
+    if isinstance(exc, CircuitOpenError):
+        return ErrorClass.CIRCUIT_OPEN
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status in THROTTLED_STATUSES:
+            return ErrorClass.THROTTLED
+        return ErrorClass.HTTP_4XX if status < 500 else ErrorClass.HTTP_5XX
+    # ConnectTimeout 也是 TimeoutException，須先判斷
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionError)):
+        return ErrorClass.CONNECT
+    if isinstance(exc, (httpx.TimeoutException, TimeoutError)):
+        return ErrorClass.TIMEOUT
+    if isinstance(exc, httpx.TransportError):
+        # ReadError / RemoteProtocolError：回應途中連線中斷
+        return ErrorClass.CONNECT
+    if isinstance(exc, json.JSONDecodeError):
+        return ErrorClass.JSON_DECODE
+    if isinstance(exc, ValidationError):
+        return ErrorClass.VALIDATION
+    return ErrorClass.OTHER
+
+
+@dataclass(frozen=True)
+class RetryRule:
+    retry: bool
+    base_delay: float
+    max_delay: float = LLM_RETRY_MAX_DELAY
+    multiplier: float = 2.0
+
+    def delay(self, failures: int, rng: random.Random) -> float:
+        """第 failures 次失敗後的等待秒數（equal jitter）。"""
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** (failures - 1))
+        return cap / 2 + rng.uniform(0, cap / 2)
+
+
+# 各類別的 base delay（LLM_RETRY_DELAY 的倍數）
+_DELAY_FACTORS = {
+    ErrorClass.CONNECT: 1.0,
+    ErrorClass.HTTP_4XX: 1.0,
+    ErrorClass.THROTTLED: 2.0,
+    ErrorClass.HTTP_5XX: 1.0,
+    ErrorClass.TIMEOUT: 0.5,
+    ErrorClass.JSON_DECODE: 0.25,
+    ErrorClass.VALIDATION: 0.25,
+    ErrorClass.CIRCUIT_OPEN: 1.0,
+    ErrorClass.OTHER: 1.0,
+}
+
+
+def default_rules() -> dict[ErrorClass, RetryRule]:
+    """由環境變數組出各類別的重試規則。"""
+    return {
+        error_class: RetryRule(
+            retry=error_class.value not in LLM_NO_RETRY and error_class is not ErrorClass.CIRCUIT_OPEN,
+            base_delay=float(os.environ.get(f"LLM_RETRY_DELAY_{error_class.name}", RETRY_DELAY * factor)),
+        )
+        for error_class, factor in _DELAY_FACTORS.items()
+    }
+
+
+class LatencyTracker:
+    """最近 window 次成功呼叫的每頁耗時（秒）。"""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float, slides: int):
+        self._samples.append(seconds / max(slides, 1))
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank 百分位；沒有樣本時回傳 None。"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+class RetryPolicy:
+    """依錯誤類別決定是否重試與退避時間，並由觀察到的延遲推算 timeout。"""
+
+    def __init__(self, rules: Optional[dict[ErrorClass, RetryRule]] = None,
+                 latency_window: int = LLM_LATENCY_WINDOW,
+                 timeout_percentile: float = LLM_TIMEOUT_PERCENTILE,
+                 timeout_multiplier: float = LLM_TIMEOUT_MULTIPLIER,
+                 min_timeout: float = LLM_TIMEOUT_MIN,
+                 max_timeout: float = LLM_TIMEOUT,
+                 min_samples: int = LLM_TIMEOUT_MIN_SAMPLES,
+                 timeout_backoff: float = LLM_TIMEOUT_BACKOFF,
+                 rng: Optional[random.Random] = None):
+        self.rules = {**default_rules(), **(rules or {})}
+        self.latency = LatencyTracker(latency_window)
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.timeout_backoff = timeout_backoff
+        self._rng = rng or random.Random()
+
+    def should_retry(self, error_class: ErrorClass) -> bool:
+        return self.rules[error_class].retry
+
+    def backoff(self, error_class: ErrorClass, failures: int) -> Optional[float]:
+        """第 failures 次失敗後的等待秒數；此類別不重試時回傳 None。"""
+        rule = self.rules[error_class]
+        if not rule.retry:
+            return None
+        return rule.delay(failures, self._rng)
+
+    def record_latency(self, seconds: float, slides: int):
+        self.latency.record(seconds, slides)
+
+    def latency_estimate(self, slides: int, percentile: float) -> Optional[float]:
+        """依近期延遲估計產生 slides 頁大綱所需的秒數（第 percentile 百分位）；樣本不足時回傳 None。"""
+        if len(self.latency) < self.min_samples:
+            return None
+        return self.latency.percentile(percentile) * slides
+
+    def timeout_for(self, slides: int, timeouts: int = 0) -> float:
+        """產生 slides 頁大綱的 timeout（秒）；timeouts 為此請求已發生的 timeout 次數。"""
+        timeout = self.max_timeout
+        expected = self.latency_estimate(slides, self.timeout_percentile)
+        if expected is not None:
+            timeout = min(max(expected * self.timeout_multiplier, self.min_timeout), self.max_timeout)
+        return min(timeout * self.timeout_backoff ** timeouts, self.max_timeout)
+
+    def snapshot(self) -> dict:
+        per_slide = self.latency.percentile(self.timeout_percentile)
+        return {
+            "latency_samples": len(self.latency),
+            "per_slide_latency_p": round(per_slide, 2) if per_slide is not None else None,
+            "percentile": self.timeout_percentile,
+            "no_retry": sorted(c.value for c, rule in self.rules.items() if not rule.retry),
+        }
+
+
+llm_retry_policy = RetryPolicy()
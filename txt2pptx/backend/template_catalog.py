@@ -0,0 +1,175 @@
+# txt2pptx/backend/template_catalog.py
+"""Cached catalog of the .pptx templates served by /api/templates.
+
+每個模板只在首次出現或檔案變更時以 python-pptx 解析一次，結果（可用性、layout 與
+placeholder 資訊、檔案大小、內容 hash）保存在記憶體中。變更偵測：
+  1. 以 (mtime_ns, size) 判斷檔案是否可能變更（只需 stat，成本極低）
+  2. 可能變更時再計算 sha256；內容相同則沿用既有解析結果
+整份目錄的 JSON 與 ETag 預先算好，endpoint 只需比對 If-None-Match。
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pptx import Presentation
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+# 兩次掃描目錄之間的最短間隔（秒）；間隔內直接回傳快取
+TEMPLATE_CATALOG_RECHECK_SECONDS = float(os.environ.get("TEMPLATE_CATALOG_RECHECK_SECONDS", "2"))
+
+# 模板中英文名稱對照表
+TEMPLATE_NAMES = {
+    "College_Elegance": "學院典雅",
+    "Data_Centric": "數據導向",
+    "High_Contrast": "高調對比",
+    "Minimalist_Corporate": "極簡商務",
+    "Modernist": "摩登現代",
+    "ocean_gradient": "預設版面",
+    "Startup_Edge": "新創活力",
+    "Zen_Serenity": "靜謐禪意",
+}
+
+CODE_DRAWN_ENTRY = {
+    "id": "code_drawn",
+    "name": "經典繪製",
+    "description": "完全程式化繪製，靈活性高",
+    "available": True,
+    "is_template": False,
+}
+
+
+@dataclass
+class _Entry:
+    signature: tuple[int, int]  # (mtime_ns, size)
+    sha256: str
+    info: dict
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _inspect_template(path: Path, size: int, sha256: str) -> dict:
+    """解析模板一次，整理出 catalog 需要的資訊。"""
+    template_id = path.stem
+    # 使用中文名稱對照表，若無對應則使用原始格式化名稱
+    chinese_name = TEMPLATE_NAMES.get(template_id, template_id.replace("_", " ").title())
+    info = {
+        "id": template_id,
+        "name": chinese_name,
+        "description": f"使用 {chinese_name} 模板",
+        "available": False,
+        "is_template": True,
+        "size_bytes": size,
+        "sha256": sha256,
+        "layouts": [],
+    }
+    try:
+        prs = Presentation(str(path))
+    except Exception as e:
+        logger.warning(f"模板 {path.name} 不可用: {e}")
+        return info
+
+    info["available"] = True
+    info["slide_width"] = prs.slide_width
+    info["slide_height"] = prs.slide_height
+    for index, layout in enumerate(prs.slide_layouts):
+        info["layouts"].append({
+            "index": index,
+            "name": layout.name,
+            "placeholders": [
+                {
+                    "idx": ph.placeholder_format.idx,
+                    "type": str(ph.placeholder_format.type).split(" ")[0],
+                    "name": ph.name,
+                }
+                for ph in layout.placeholders
+            ],
+        })
+    return info
+
+
+class TemplateCatalog:
+    """模板目錄快取，附帶預先序列化的 JSON 與 ETag。"""
+
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR,
+                 recheck_seconds: float = TEMPLATE_CATALOG_RECHECK_SECONDS):
+        self.templates_dir = templates_dir
+        self.recheck_seconds = recheck_seconds
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._checked_at: Optional[float] = None
+        self.body: bytes = b""
+        self.etag: str = ""
+
+    @property
+    def is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.recheck_seconds
+
+    def refresh(self) -> bool:
+        """掃描模板目錄並更新有變動的項目；回傳 catalog 內容是否改變。"""
+        with self._lock:
+            changed = self._scan()
+            if changed or not self.body:
+                self._rebuild()
+            self._checked_at = time.monotonic()
+            return changed
+
+    def _scan(self) -> bool:
+        seen = set()
+        changed = False
+        if self.templates_dir.exists():
+            for path in self.templates_dir.glob("*.pptx"):
+                template_id = path.stem
+                seen.add(template_id)
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                signature = (st.st_mtime_ns, st.st_size)
+                entry = self._entries.get(template_id)
+                if entry is not None and entry.signature == signature:
+                    continue
+
+                sha256 = _file_sha256(path)
+                if entry is not None and entry.sha256 == sha256:
+                    # 只有 mtime 改變，內容相同：沿用解析結果
+                    entry.signature = signature
+                    continue
+
+                logger.info(f"📚 Indexing template {path.name} ({st.st_size} bytes)")
+                self._entries[template_id] = _Entry(
+                    signature, sha256, _inspect_template(path, st.st_size, sha256)
+                )
+                changed = True
+
+        for template_id in set(self._entries) - seen:
+            del self._entries[template_id]
+            changed = True
+        return changed
+
+    def _rebuild(self):
+        templates = [dict(CODE_DRAWN_ENTRY)]
+        templates += [self._entries[tid].info for tid in sorted(self._entries)]
+        self.body = json.dumps({"templates": templates}, ensure_ascii=False).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def get(self, template_id: str) -> Optional[dict]:
+        entry = self._entries.get(template_id)
+        return entry.info if entry else None
+
+
+template_catalog = TemplateCatalog()
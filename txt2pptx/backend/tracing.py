@@ -0,0 +1,164 @@
+# txt2pptx/backend/tracing.py
+"""Per-request span tree for debugging individual slow generations.
+
+/metrics 只看得到整體分布；要追查「這一次為什麼慢」需要單一請求的時間樹：
+
+  generate
+  ├── cache_lookup
+  ├── outline
+  │   ├── admission_wait                 等待 LLM 名額
+  │   └── llm_attempt (attempt=1..N)
+  │       ├── ollama_chat                含 Ollama 回報的 total / load / prompt_eval / eval duration
+  │       ├── json_parse
+  │       └── validate                   Pydantic 驗證
+  ├── render
+  │   ├── load_template                  （模板引擎）
+  │   ├── build_slide (index, layout)    BUILDERS / TEMPLATE_BUILDERS 每次呼叫
+  │   └── prs.save
+  └── save                               寫入磁碟
+
+目前所在的 span 以 contextvar 傳遞，因此 asyncio task 與 to_thread 都能自動接上；
+render worker 在另一個 process 執行，於 worker 內記錄後隨結果回傳，再以 attach() 接回。
+沒有進行中的 trace 時 span() 不做任何事，generator 模組可直接在 CLI / 測試中使用。
+最近 TRACE_HISTORY 筆 trace 保留在記憶體中，供 /api/debug/traces 查詢。
+"""
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# ── Trace 配置 ──
+TRACE_HISTORY = int(os.environ.get("TRACE_HISTORY", "50"))
+
+
+class Span:
+    """單一計時區段；start_ms 為相對於 trace 開始的毫秒數。"""
+
+    __slots__ = ("name", "start_ms", "duration_ms", "attrs", "children")
+
+    def __init__(self, name: str, start_ms: float, attrs: Optional[dict] = None):
+        self.name = name
+        self.start_ms = start_ms
+        self.duration_ms: Optional[float] = None
+        self.attrs = attrs or {}
+        self.children: list["Span"] = []
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "start_ms": round(self.start_ms, 1),
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict, offset_ms: float = 0.0) -> "Span":
+        span_ = cls(data["name"], data["start_ms"] + offset_ms, dict(data.get("attrs", {})))
+        span_.duration_ms = data.get("duration_ms")
+        span_.children = [cls.from_dict(child, offset_ms) for child in data.get("children", [])]
+        return span_
+
+
+class Trace:
+    """一次請求的 span 樹。"""
+
+    def __init__(self, name: str = "generate"):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.root = Span(name, 0.0)
+
+    def now_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.root.duration_ms, 1) if self.root.duration_ms is not None else None,
+            "root": self.root.to_dict(),
+        }
+
+    def server_timing(self) -> str:
+        """第一層 span 轉為 Server-Timing header（瀏覽器 DevTools 可直接顯示）。"""
+        entries = [
+            f"{child.name};dur={child.duration_ms:.1f}"
+            for child in self.root.children if child.duration_ms is not None
+        ]
+        if self.root.duration_ms is not None:
+            entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[tuple[Trace, Span]]] = ContextVar("txt2pptx_trace", default=None)
+_recent: "deque[Trace]" = deque(maxlen=TRACE_HISTORY)
+
+
+@contextmanager
+def trace_request(trace: Trace, record: bool = True):
+    """在此區塊內以 trace.root 作為目前的 span；結束時記錄總耗時並（預設）存入最近紀錄。"""
+    token = _current.set((trace, trace.root))
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        trace.root.duration_ms = trace.now_ms()
+        _current.reset(token)
+        if record:
+            _recent.append(trace)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """在目前的 span 下建立子 span；沒有進行中的 trace 時不做任何事。"""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    child = Span(name, trace.now_ms(), attrs)
+    parent.children.append(child)
+    token = _current.set((trace, child))
+    try:
+        yield child
+    except BaseException as e:
+        child.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        child.duration_ms = trace.now_ms() - child.start_ms
+        _current.reset(token)
+
+
+def annotate(**attrs):
+    """在目前的 span 上附加屬性。"""
+    current = _current.get()
+    if current is not None:
+        current[1].attrs.update(attrs)
+
+
+def attach(spans: list[dict], started_at: float):
+    """把其他 process 記錄的 span（相對於 started_at epoch）接到目前的 span 下。"""
+    current = _current.get()
+    if current is None:
+        return
+    trace, parent = current
+    offset_ms = (started_at - trace.started_at) * 1000
+    parent.children.extend(Span.from_dict(data, offset_ms) for data in spans)
+
+
+def recent_traces(limit: int = TRACE_HISTORY) -> list[Trace]:
+    """最近的 trace，新的在前。"""
+    return list(reversed(_recent))[:limit]
+
+
+def find_trace(trace_id: str) -> Optional[Trace]:
+    return next((trace for trace in _recent if trace.trace_id == trace_id), None)
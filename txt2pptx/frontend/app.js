@@ -44,6 +44,11 @@ const LAYOUT_LABELS = {
 
 // ── State ──
 let isGenerating = false;
+let activeJobUrl = null;  // 進行中的 Job，關閉分頁時取消以釋放 LLM 名額
+
+window.addEventListener('pagehide', () => {
+    if (activeJobUrl) fetch(`${API_BASE}${activeJobUrl}`, { method: 'DELETE', keepalive: true });
+});
 
 // ── Main Generate Function ──
 async function generatePresentation() {
@@ -76,24 +81,21 @@ async function generatePresentation() {
     updateProgress(10, '正在分析文字內容...', 'AI 正在理解您的文字結構');
 
     try {
-        // Simulate progress while waiting
-        const progressInterval = simulateProgress();
-
-        // Call API
-        const response = await fetch(`${API_BASE}/api/generate`, {
+        // Submit job (returns immediately with a job id)
+        const response = await fetch(`${API_BASE}/api/jobs`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(request),
         });
 
-        clearInterval(progressInterval);
-
         if (!response.ok) {
             const err = await response.json().catch(() => ({ detail: '未知錯誤' }));
             throw new Error(err.detail || `HTTP ${response.status}`);
         }
 
-        const data = await response.json();
+        const job = await response.json();
+        activeJobUrl = job.status_url;
+        const data = await watchJob(job.status_url);
 
         if (data.success) {
             updateProgress(100, '生成完成！', '正在準備下載...');
@@ -107,32 +109,89 @@ async function generatePresentation() {
         showError(error.message);
     } finally {
         isGenerating = false;
+        activeJobUrl = null;
     }
 }
 
-// ── Progress Simulation ──
-function simulateProgress() {
-    let progress = 10;
-    const steps = [
-        [25, '正在擴充內容...', 'AI 正在根據您的文字生成完整內容'],
-        [45, '正在規劃簡報結構...', '分配內容到各個投影片'],
-        [65, '正在設計版面佈局...', '選擇最適合的版面配置'],
-        [80, '正在生成 PPTX...', '套用設計主題並渲染投影片'],
-        [90, '正在最終檢查...', '確認排版與內容完整性'],
-    ];
-    let stepIdx = 0;
-
-    return setInterval(() => {
-        if (stepIdx < steps.length) {
-            const [p, title, detail] = steps[stepIdx];
-            if (progress < p) {
-                progress += 2;
-                updateProgress(progress, title, detail);
-            } else {
-                stepIdx++;
-            }
+// ── Job Polling ──
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// 後端階段 → 進度條顯示
+const STAGE_PROGRESS = {
+    map:      [10, '正在分析長篇內容...', '分段擷取各節重點'],
+    outline:  [25, '正在擴充內容...', 'AI 正在根據您的文字生成完整內容'],
+    validate: [60, '正在規劃簡報結構...', '驗證並整理投影片大綱'],
+    render:   [80, '正在生成 PPTX...', '套用設計主題並渲染投影片'],
+    save:     [95, '正在最終檢查...', '儲存簡報檔案'],
+};
+
+function showStage(stageName, elapsedMs) {
+    const stage = STAGE_PROGRESS[stageName];
+    if (!stage) return;
+    const [percent, title, detail] = stage;
+    const suffix = elapsedMs != null ? `（已耗時 ${Math.round(elapsedMs / 1000)} 秒）` : '';
+    updateProgress(percent, title, `${detail}${suffix}`);
+}
+
+// 優先使用 SSE 即時事件；瀏覽器不支援或連線中斷時改為輪詢
+function watchJob(statusUrl) {
+    if (!window.EventSource) return pollJob(statusUrl);
+
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_BASE}${statusUrl}/events`);
+        let finished = false;
+        const finish = (fn, value) => {
+            finished = true;
+            source.close();
+            fn(value);
+        };
+        const on = (name, handler) => source.addEventListener(name, (e) => handler(JSON.parse(e.data)));
+
+        on('stage', (d) => showStage(d.stage));
+        on('queued', (d) => updateProgress(null, null, `排隊中，前方還有 ${d.position - 1} 個請求`));
+        on('llm_attempt', (d) => {
+            if (d.attempt > 1) updateProgress(null, null, `正在重新嘗試（第 ${d.attempt}/${d.max_attempts} 次）`);
+        });
+        on('chunk', (d) => updateProgress(null, null, `已完成第 ${d.done}/${d.total} 段重點擷取`));
+        on('llm_cache_hit', () => updateProgress(null, null, '使用先前生成的大綱'));
+        on('tokens', (d) => updateProgress(null, null, `AI 已產生 ${d.tokens} 個 token`));
+        on('slide', (d) => {
+            const layoutLabel = LAYOUT_LABELS[d.layout] || d.layout;
+            updateProgress(null, null, `已規劃第 ${d.index} 頁（${layoutLabel}）：${d.title}`);
+        });
+        on('repair', (d) => updateProgress(null, null, `修正第 ${d.indices.join('、')} 頁的格式問題...`));
+        on('retry', () => updateProgress(null, null, 'AI 回應異常，準備重試...'));
+        on('fallback', () => updateProgress(null, null, 'AI 服務暫時無法使用，改用快速模式'));
+        on('done', (d) => finish(resolve, d.result));
+        on('failed', (d) => finish(reject, new Error(d.error || '生成失敗')));
+        on('cancelled', () => finish(reject, new Error('任務已取消')));
+
+        source.onerror = () => {
+            if (finished) return;
+            source.close();
+            pollJob(statusUrl).then(resolve, reject);
+        };
+    });
+}
+
+async function pollJob(statusUrl) {
+    while (true) {
+        await sleep(JOB_POLL_INTERVAL_MS);
+
+        const response = await fetch(`${API_BASE}${statusUrl}`);
+        if (!response.ok) {
+            const err = await response.json().catch(() => ({ detail: '未知錯誤' }));
+            throw new Error(err.detail || `HTTP ${response.status}`);
+        }
+
+        const job = await response.json();
+        if (job.status === 'succeeded') return job.result;
+        if (job.status === 'failed' || job.status === 'cancelled') {
+            throw new Error(job.error || '生成失敗');
         }
-    }, 400);
+
+        showStage(job.stage, job.elapsed_ms);
+    }
 }
 
 // ── UI State Management ──
@@ -145,7 +204,7 @@ function showProgress() {
 }
 
 function updateProgress(percent, title, detail) {
-    els.progressFill().style.width = `${percent}%`;
+    if (percent != null) els.progressFill().style.width = `${percent}%`;
     if (title) els.progressTitle().textContent = title;
     if (detail) els.progressDetail().textContent = detail;
 }
@@ -0,0 +1,346 @@
+# utils/compile_templates.py
+"""
+模板編譯工具：將 txt2pptx/templates 內的模板精簡成 template engine 實際需要的最小形式。
+
+fix_for_pptx_format.py 只處理 ocean_gradient.pptx；本工具對每個模板執行相同的補強並進一步精簡：
+  A. 清除模板中既有的 slides
+  B. 只保留第一個母片，以及 LAYOUT_MAP 用到的最大 index 以前的 layouts（維持 index 不變）；
+     其餘母片、layouts 與只被它們引用的圖片等 part 在存檔時一併移除
+  C. 將 BULLETS / IMAGE_LEFT / IMAGE_RIGHT layout 中標示 "IMAGE" 的靜態形狀轉換為 Picture Placeholder (idx=10)
+  D. 非 16:9 的模板等比縮放至 13.333"×7.5"
+  E. 長邊超過 --max-image-px 的 JPEG / PNG 縮小並重新壓縮（結果較小時才替換；SVG / EMF / WMF 等其他圖片不動）
+
+輸出的 zip 使用固定時間戳記，同一份輸入永遠得到相同 bytes，且編譯結果再編譯一次不會改變。
+每個模板的輸入/輸出 sha256、編譯設定與精簡結果記錄於輸出目錄的 manifest.json；
+再次執行時輸入 hash 與設定都符合 manifest 的模板直接跳過。各模板以獨立 process 平行處理。
+
+執行方式（於專案根目錄）：
+    python -m utils.compile_templates                      # 原地編譯所有模板
+    python -m utils.compile_templates Zen_Serenity --out-dir /tmp/compiled
+    python -m utils.compile_templates --max-image-px 1280 --jobs 4 --force
+"""
+import io
+import os
+import sys
+import json
+import hashlib
+import zipfile
+import argparse
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError
+from pptx import Presentation
+from pptx.oxml.ns import qn
+from pptx.parts.image import ImagePart
+
+from utils.fix_for_pptx_format import (
+    TARGET_WIDTH, TARGET_HEIGHT, PIC_PH_IDX,
+    _find_max_id, _build_picture_placeholder_xml, _remove_existing_slides,
+)
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "txt2pptx"))
+
+from backend.models import SlideLayout  # noqa: E402
+from backend.pptx_generator_template import LAYOUT_MAP, TEMPLATES_DIR  # noqa: E402
+
+# 編譯邏輯變更時遞增，使既有 manifest 失效
+COMPILER_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+
+# 需要 Picture Placeholder 的 layout index
+IMAGE_LAYOUT_INDICES = sorted({LAYOUT_MAP[SlideLayout.BULLETS], LAYOUT_MAP[SlideLayout.IMAGE_LEFT],
+                               LAYOUT_MAP[SlideLayout.IMAGE_RIGHT]})
+
+# 會重新壓縮的點陣圖；SVG / EMF / WMF 等向量圖 Pillow 無法開啟，維持原樣
+RASTER_CONTENT_TYPES = {"image/jpeg", "image/png"}
+
+# 固定 zip 時間戳記，讓輸出可重現
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_XFRM_PATHS = (
+    f"{qn('p:spPr')}/{qn('a:xfrm')}",
+    f"{qn('p:grpSpPr')}/{qn('a:xfrm')}",
+    qn("p:xfrm"),
+)
+
+
+@dataclass(frozen=True)
+class CompileOptions:
+    max_image_px: int = 1920
+    jpeg_quality: int = 85
+
+    @property
+    def fingerprint(self) -> str:
+        payload = json.dumps({"version": COMPILER_VERSION, **asdict(self)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ──────────────────────────────────────────────
+# 編譯步驟
+# ──────────────────────────────────────────────
+
+def _prune_masters_and_layouts(prs) -> int:
+    """只保留第一個母片與 LAYOUT_MAP 用到的 layouts；回傳移除的 layout 數（不含隨母片移除者）。"""
+    master_ids = prs.part._element.find(qn("p:sldMasterIdLst"))
+    for sldMasterId in list(master_ids)[1:]:
+        master_ids.remove(sldMasterId)
+        prs.part.drop_rel(sldMasterId.get(qn("r:id")))
+
+    layouts = prs.slide_masters[0].slide_layouts
+    keep = max(LAYOUT_MAP.values()) + 1
+    extra = list(layouts)[keep:]
+    for layout in extra:
+        layouts.remove(layout)
+    return len(extra)
+
+
+def _find_image_marker(layout):
+    """找出標示 "IMAGE" 文字的非 placeholder 靜態形狀（Google Slides 匯出的圖片位置）。"""
+    for shape in layout.shapes:
+        if shape.is_placeholder or not shape.has_text_frame:
+            continue
+        if shape.text_frame.text.strip() == "IMAGE":
+            return shape._element
+    return None
+
+
+def _inject_picture_placeholders(prs) -> list[int]:
+    """將 IMAGE 標示形狀替換為 Picture Placeholder；已有 idx=10 placeholder 的 layout 不處理。"""
+    converted = []
+    layouts = prs.slide_layouts
+    for li in IMAGE_LAYOUT_INDICES:
+        if li >= len(layouts):
+            continue
+        layout = layouts[li]
+        if any(ph.placeholder_format.idx == PIC_PH_IDX for ph in layout.placeholders):
+            continue
+        marker = _find_image_marker(layout)
+        if marker is None:
+            continue
+
+        xfrm = marker.find(_XFRM_PATHS[0])
+        off, ext = xfrm.find(qn("a:off")), xfrm.find(qn("a:ext"))
+        sp_tree = marker.getparent()
+        sp_tree.remove(marker)
+        sp_tree.append(_build_picture_placeholder_xml(
+            _find_max_id(layout) + 1, PIC_PH_IDX,
+            int(off.get("x")), int(off.get("y")), int(ext.get("cx")), int(ext.get("cy")),
+        ))
+        converted.append(li)
+    return converted
+
+
+def _scale_to_16_9(prs) -> bool:
+    """非 16:9 的模板等比縮放母片與 layouts 的所有頂層形狀；回傳是否有縮放。"""
+    width, height = prs.slide_width, prs.slide_height
+    if abs(width / height - TARGET_WIDTH / TARGET_HEIGHT) < 1e-3:
+        return False
+
+    sx, sy = TARGET_WIDTH / width, TARGET_HEIGHT / height
+    for master in prs.slide_masters:
+        for owner in (master, *master.slide_layouts):
+            for shape in owner.shapes:
+                for path in _XFRM_PATHS:
+                    xfrm = shape._element.find(path)
+                    if xfrm is not None:
+                        break
+                else:
+                    continue
+                off, ext = xfrm.find(qn("a:off")), xfrm.find(qn("a:ext"))
+                if off is not None:
+                    off.set("x", str(int(int(off.get("x", "0")) * sx)))
+                    off.set("y", str(int(int(off.get("y", "0")) * sy)))
+                if ext is not None:
+                    ext.set("cx", str(int(int(ext.get("cx", "0")) * sx)))
+                    ext.set("cy", str(int(int(ext.get("cy", "0")) * sy)))
+
+    prs.slide_width, prs.slide_height = TARGET_WIDTH, TARGET_HEIGHT
+    return True
+
+
+def _recompress_images(prs, options: CompileOptions) -> list[dict]:
+    """縮小長邊超過 max_image_px 的 JPEG / PNG；重新壓縮後沒有變小則保留原圖。"""
+    results = []
+    for part in prs.part.package.iter_parts():
+        if not isinstance(part, ImagePart) or part.content_type not in RASTER_CONTENT_TYPES:
+            continue
+        try:
+            with Image.open(io.BytesIO(part.blob)) as im:
+                if im.format not in ("JPEG", "PNG") or max(im.size) <= options.max_image_px:
+                    continue
+                scale = options.max_image_px / max(im.size)
+                size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+                resized = im.resize(size, Image.LANCZOS)
+                out = io.BytesIO()
+                if im.format == "JPEG":
+                    resized.save(out, "JPEG", quality=options.jpeg_quality, optimize=True)
+                else:
+                    resized.save(out, "PNG", optimize=True)
+                original_size = im.size
+        except (UnidentifiedImageError, OSError):
+            # content type 標示錯誤或圖檔損毀：保留原圖，不讓單張圖片中斷整個模板的編譯
+            continue
+
+        blob = out.getvalue()
+        if len(blob) >= len(part.blob):
+            continue
+        results.append({
+            "part": str(part.partname), "from": list(original_size), "to": list(size),
+            "bytes_before": len(part.blob), "bytes_after": len(blob),
+        })
+        part._blob = blob
+    return results
+
+
+def _normalized_zip(pptx_bytes: bytes) -> bytes:
+    """以固定時間戳記與 entry 順序（[Content_Types].xml 在前）重寫 zip，讓相同內容得到相同 bytes。"""
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(pptx_bytes)) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in sorted(src.infolist(), key=lambda i: (i.filename != "[Content_Types].xml", i.filename)):
+            dst.writestr(zipfile.ZipInfo(info.filename, _ZIP_DATE_TIME), src.read(info),
+                         compress_type=zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+def compile_template(source: Path, target: Path, options: CompileOptions) -> dict:
+    """編譯單一模板並寫入 target，回傳 manifest 項目。"""
+    data = source.read_bytes()
+    prs = Presentation(io.BytesIO(data))
+    parts_before = {str(part.partname) for part in prs.part.package.iter_parts()}
+
+    n_slides = len(prs.slides)
+    _remove_existing_slides(prs)
+    pruned_layouts = _prune_masters_and_layouts(prs)
+    picture_placeholders = _inject_picture_placeholders(prs)
+    scaled = _scale_to_16_9(prs)
+    images = _recompress_images(prs, options)
+
+    parts_after = {str(part.partname) for part in prs.part.package.iter_parts()}
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    compiled = _normalized_zip(buffer.getvalue())
+    target.write_bytes(compiled)
+
+    return {
+        "status": "compiled",
+        "source_sha256": _sha256(data),
+        "sha256": _sha256(compiled),
+        "options": options.fingerprint,
+        "size_before": len(data),
+        "size_after": len(compiled),
+        "slide_size": [prs.slide_width, prs.slide_height],
+        "layouts": len(prs.slide_layouts),
+        "dropped_slides": n_slides,
+        "pruned_layouts": pruned_layouts,
+        "pruned_parts": sorted(parts_before - parts_after),
+        "picture_placeholders": picture_placeholders,
+        "scaled": scaled,
+        "images": images,
+        "missing_layouts": max(0, max(LAYOUT_MAP.values()) + 1 - len(prs.slide_layouts)),
+    }
+
+
+# ──────────────────────────────────────────────
+# 批次編譯與 manifest
+# ──────────────────────────────────────────────
+
+def _load_manifest(path: Path) -> dict:
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"templates": {}}
+    manifest.setdefault("templates", {})
+    return manifest
+
+
+def _is_up_to_date(entry: dict, source: Path, target: Path, options: CompileOptions) -> bool:
+    """輸入 hash（原始或已編譯版本）、輸出 hash 與編譯設定都與 manifest 相符。"""
+    if not entry or entry.get("options") != options.fingerprint or not target.exists():
+        return False
+    if _sha256(target.read_bytes()) != entry.get("sha256"):
+        return False
+    return _sha256(source.read_bytes()) in (entry.get("source_sha256"), entry.get("sha256"))
+
+
+def compile_templates(sources: list[Path], out_dir: Path, options: CompileOptions = CompileOptions(),
+                      jobs: int = 1, force: bool = False) -> dict:
+    """平行編譯多個模板，更新並回傳 out_dir/manifest.json 的內容。"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path)
+    entries = manifest["templates"]
+
+    pending = {}
+    for source in sources:
+        target = out_dir / source.name
+        if not force and _is_up_to_date(entries.get(source.stem), source, target, options):
+            entries[source.stem]["status"] = "unchanged"
+        else:
+            pending[source.stem] = (source, target)
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {stem: pool.submit(compile_template, src, dst, options) for stem, (src, dst) in pending.items()}
+            results = {stem: future.result() for stem, future in futures.items()}
+    else:
+        results = {stem: compile_template(src, dst, options) for stem, (src, dst) in pending.items()}
+
+    entries.update(results)
+    manifest["compiler_version"] = COMPILER_VERSION
+    manifest["options"] = asdict(options)
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+                             encoding="utf-8")
+    return manifest
+
+
+def _resolve_sources(names: list[str], templates_dir: Path) -> list[Path]:
+    if not names:
+        return sorted(templates_dir.glob("*.pptx"))
+    sources = []
+    for name in names:
+        path = Path(name)
+        if path.suffix != ".pptx":
+            path = templates_dir / f"{name}.pptx"
+        if not path.exists():
+            raise SystemExit(f"找不到模板: {path}")
+        sources.append(path)
+    return sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="精簡 txt2pptx 模板（清除 slides、修剪 layouts/母片/圖片、16:9、Picture PH）")
+    parser.add_argument("templates", nargs="*", help="模板 id 或 .pptx 路徑（預設為模板目錄內全部）")
+    parser.add_argument("--templates-dir", type=Path, default=TEMPLATES_DIR, help="模板目錄")
+    parser.add_argument("--out-dir", type=Path, default=None, help="輸出目錄（預設原地覆蓋）")
+    parser.add_argument("--max-image-px", type=int, default=CompileOptions.max_image_px, help="圖片長邊上限（像素）")
+    parser.add_argument("--jpeg-quality", type=int, default=CompileOptions.jpeg_quality, help="重新壓縮 JPEG 的品質")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="平行處理的 process 數")
+    parser.add_argument("--force", action="store_true", help="忽略 manifest，全部重新編譯")
+    args = parser.parse_args(argv)
+
+    sources = _resolve_sources(args.templates, args.templates_dir)
+    out_dir = args.out_dir or args.templates_dir
+    options = CompileOptions(max_image_px=args.max_image_px, jpeg_quality=args.jpeg_quality)
+    manifest = compile_templates(sources, out_dir, options, jobs=args.jobs, force=args.force)
+
+    for source in sources:
+        entry = manifest["templates"][source.stem]
+        print(f"  {source.stem:22s} {entry['status']:9s} "
+              f"{entry['size_before'] / 1024:7.0f}KB → {entry['size_after'] / 1024:5.0f}KB  "
+              f"layouts={entry['layouts']} pruned_parts={len(entry['pruned_parts'])} "
+              f"images={len(entry['images'])} pic_ph={entry['picture_placeholders']}")
+        if entry["missing_layouts"]:
+            print(f"    ⚠️  缺少 {entry['missing_layouts']} 個 LAYOUT_MAP 需要的 layout")
+    print(f"\nmanifest: {out_dir / MANIFEST_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,9 @@
 
 執行方式：
   cd utils && python fix_for_pptx_format.py
+
+處理所有模板（並修剪未使用的 layouts、母片與圖片）請改用 utils/compile_templates.py，
+其沿用本檔的 Picture Placeholder 建構函式。
 """
 from pathlib import Path
 